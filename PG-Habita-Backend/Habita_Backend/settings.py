@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
     'corsheaders',
     'rest_framework',
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
     'apps.reservas',
     'apps.servicios',
     'apps.notificaciones',
+    'apps.dashboard',
     'apps.favoritos',
     'apps.backup',
     'apps.reportes',
@@ -236,3 +238,69 @@ SIMPLE_JWT = {
 #  CONFIGURACIÓN DE STRIPE
 STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', 'pk_test_51SCRdLIaylyQlFPb6KTL67pwkELRwFVlsGAeCBTewpnZcK9vJ6GN8FsUSwWmRxb8DvpWMCMz0KDkaOFWMICmH5be00nFuxpq7K')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', 'pk_test_51SCRdLIaylyQlFPb6KTL67pwkELRwFVlsGAeCBTewpnZcK9vJ6GN8FsUSwWmRxb8DvpWMCMz0KDkaOFWMICmH5be00nFuxpq7K')
+
+# REPORTES EN SEGUNDO PLANO (procesar_reportes)
+REPORTES_MAX_INTENTOS = int(os.getenv('REPORTES_MAX_INTENTOS', '3'))
+REPORTES_TIMEOUT_TRABAJO = int(os.getenv('REPORTES_TIMEOUT_TRABAJO', '1800'))  # segundos sin latido
+REPORTES_LATIDO_TRABAJO = int(os.getenv('REPORTES_LATIDO_TRABAJO', '60'))  # segundos
+# Cache LRU de reportes dinámicos (por proceso)
+REPORTES_CACHE_MAX_ENTRADAS = int(os.getenv('REPORTES_CACHE_MAX_ENTRADAS', '256'))
+REPORTES_CACHE_TTL = int(os.getenv('REPORTES_CACHE_TTL', '600'))  # segundos
+# Traducción prompt -> reporte: proveedor (ruta a la clase) y similitud mínima
+# para reutilizar traducciones parecidas (0 = solo coincidencia exacta)
+REPORTES_IA_PROVEEDOR = os.getenv('REPORTES_IA_PROVEEDOR', 'apps.reportes.ia.ProveedorOpenAI')
+REPORTES_IA_SIMILITUD_MINIMA = float(os.getenv('REPORTES_IA_SIMILITUD_MINIMA', '0'))
+
+# GEOCODIFICACIÓN (Nominatim)
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org')
+NOMINATIM_TIMEOUT = float(os.getenv('NOMINATIM_TIMEOUT', '10'))
+GEOCODIFICACION_TASA = float(os.getenv('GEOCODIFICACION_TASA', '1'))  # solicitudes por segundo
+GEOCODIFICACION_MAX_INTENTOS = int(os.getenv('GEOCODIFICACION_MAX_INTENTOS', '5'))
+GEOCODIFICACION_BACKOFF_BASE = int(os.getenv('GEOCODIFICACION_BACKOFF_BASE', '30'))  # segundos
+# TTL del cache de geocodificación en segundos (claves: <tipo>_ok / <tipo>_negativo)
+GEOCODIFICACION_CACHE_TTL = {
+    'coordenadas_ok': 60 * 60 * 24 * 30,
+    'coordenadas_negativo': 60 * 60 * 24,
+    'sugerencias_ok': 60 * 60 * 24 * 7,
+    'sugerencias_negativo': 60 * 60 * 24,
+}
+
+# BITÁCORA: escritura en lotes desde un hilo en segundo plano (por proceso)
+BITACORA_ASINCRONA = os.getenv('BITACORA_ASINCRONA', 'True').lower() == 'true'
+BITACORA_BUFFER_MAX = int(os.getenv('BITACORA_BUFFER_MAX', '10000'))  # registros pendientes antes de descartar
+BITACORA_LOTE = int(os.getenv('BITACORA_LOTE', '200'))
+BITACORA_FLUSH_SEGUNDOS = float(os.getenv('BITACORA_FLUSH_SEGUNDOS', '2'))
+# Retención (archivar_bitacora): días que quedan en la tabla y carpeta de los .ndjson.gz
+BITACORA_RETENCION_DIAS = int(os.getenv('BITACORA_RETENCION_DIAS', '90'))
+BITACORA_DIR_ARCHIVO = os.getenv('BITACORA_DIR_ARCHIVO', os.path.join(BASE_DIR, 'archivo', 'bitacora'))
+
+# BACKUPS (apps.backup.motor): NDJSON comprimido con gzip y manifiesto
+BACKUP_DIR = os.getenv('BACKUP_DIR', os.path.join(BASE_DIR, 'backups'))
+BACKUP_NIVEL_COMPRESION = int(os.getenv('BACKUP_NIVEL_COMPRESION', '6'))
+# Apps o modelos (app_label / app_label.modelo) que no se respaldan
+BACKUP_EXCLUIR = ['sessions', 'backup']
+# Margen hacia atrás de la marca de agua para no perder transacciones largas
+BACKUP_MARGEN_SEGUNDOS = int(os.getenv('BACKUP_MARGEN_SEGUNDOS', '60'))
+
+# OUTBOX DE RESERVAS (despachar_eventos_reserva): notificaciones fuera de la petición
+RESERVAS_EVENTOS_MAX_INTENTOS = int(os.getenv('RESERVAS_EVENTOS_MAX_INTENTOS', '5'))
+RESERVAS_EVENTOS_RETENCION_DIAS = int(os.getenv('RESERVAS_EVENTOS_RETENCION_DIAS', '7'))  # eventos ya procesados
+# Enviar también por correo las notificaciones de reservas (requiere EMAIL_* configurado)
+NOTIFICACIONES_EMAIL = os.getenv('NOTIFICACIONES_EMAIL', 'False').lower() == 'true'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# PUSH DE NOTIFICACIONES (stream SSE / esperar long-poll)
+# Broker pub/sub (ruta a la clase); BrokerMemoria reparte solo dentro del proceso
+NOTIFICACIONES_BROKER = os.getenv('NOTIFICACIONES_BROKER', 'apps.notificaciones.tiempo_real.BrokerMemoria')
+NOTIFICACIONES_STREAM_SEGUNDOS = int(os.getenv('NOTIFICACIONES_STREAM_SEGUNDOS', '300'))  # luego el cliente reconecta
+NOTIFICACIONES_STREAM_TICKET_SEGUNDOS = int(os.getenv('NOTIFICACIONES_STREAM_TICKET_SEGUNDOS', '60'))  # ticket de stream/?ticket=
+NOTIFICACIONES_STREAM_LATIDO = int(os.getenv('NOTIFICACIONES_STREAM_LATIDO', '15'))  # segundos entre pings (sin consultas)
+# Segundos entre consultas de respaldo (notificaciones creadas en otros procesos)
+NOTIFICACIONES_STREAM_RESPALDO = int(os.getenv('NOTIFICACIONES_STREAM_RESPALDO', '60'))
+# Streams/long-polls abiertos por proceso: debe quedar por debajo de los hilos de gunicorn
+NOTIFICACIONES_STREAM_MAX_CONEXIONES = int(os.getenv('NOTIFICACIONES_STREAM_MAX_CONEXIONES', '8'))
+NOTIFICACIONES_STREAM_REINTENTO = int(os.getenv('NOTIFICACIONES_STREAM_REINTENTO', '30'))  # segundos, respuesta 503
+NOTIFICACIONES_STREAM_MAX_PENDIENTES = int(os.getenv('NOTIFICACIONES_STREAM_MAX_PENDIENTES', '100'))
+
+# DASHBOARD: fragmentos del contador global (menos esperas por el mismo bloqueo)
+DASHBOARD_FRAGMENTOS_GLOBAL = int(os.getenv('DASHBOARD_FRAGMENTOS_GLOBAL', '8'))
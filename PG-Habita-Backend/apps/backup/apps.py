@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class BackupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.backup'
-    verbose_name = 'Sistema de Backup'
\ No newline at end of file
+    verbose_name = 'Sistema de Backup'
+
+    def ready(self):
+        from apps.backup.signals import conectar
+        conectar()
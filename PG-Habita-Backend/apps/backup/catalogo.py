@@ -0,0 +1,154 @@
+"""
+Catálogo de backups (BackupCatalogo). Listar, elegir el padre de un incremental
+o verificar un backup consulta la tabla en vez de abrir los archivos; la
+verificación solo recalcula el sha256 del archivo comprimido.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import motor
+from .models import BackupCatalogo
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoBackups:
+
+    @staticmethod
+    def registrar(manifiesto: Dict, usuario=None) -> BackupCatalogo:
+        """Alta (o actualización) de un backup NDJSON a partir de su manifiesto"""
+        padre = None
+        if manifiesto.get('padre'):
+            padre = BackupCatalogo.objects.filter(nombre=manifiesto['padre']).first()
+            if padre is None:
+                manifiesto_padre = motor.leer_manifiesto(manifiesto['padre'])
+                if manifiesto_padre:
+                    padre = CatalogoBackups.registrar(manifiesto_padre)
+
+        valores = {
+            'tipo': manifiesto['tipo'],
+            'padre': padre,
+            'creado_en': parse_datetime(manifiesto['creado_en']),
+            'marca': parse_datetime(manifiesto['marca']),
+            'tamano': manifiesto['tamano'],
+            'sha256': manifiesto['sha256'],
+            'filas': manifiesto['filas'],
+            'secciones': manifiesto['secciones'],
+            'duracion': manifiesto.get('duracion'),
+        }
+        if usuario is not None:
+            valores['creado_por'] = usuario
+        try:
+            with transaction.atomic():
+                entrada, _ = BackupCatalogo.objects.update_or_create(nombre=manifiesto['nombre'], defaults=valores)
+        except IntegrityError:
+            # Otro proceso lo registró a la vez
+            entrada = BackupCatalogo.objects.get(nombre=manifiesto['nombre'])
+        return entrada
+
+    @staticmethod
+    def _registrar_legado(nombre: str) -> Optional[BackupCatalogo]:
+        """Los .json antiguos se leen una sola vez, al catalogarlos"""
+        ruta = motor.ruta_backup(nombre)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Error leyendo backup {nombre}: {e}")
+            return None
+
+        modelos = data.get('models', {})
+        creado_en = datetime.fromtimestamp(os.stat(ruta).st_mtime, tz=timezone.get_current_timezone())
+        return BackupCatalogo.objects.update_or_create(nombre=nombre, defaults={
+            'tipo': 'legado',
+            'creado_en': creado_en,
+            'tamano': os.path.getsize(ruta),
+            'sha256': motor.sha256_archivo(ruta),
+            'filas': sum(len(modelos.get(clave, [])) for clave in modelos),
+            'secciones': {clave: {'filas': len(filas)} for clave, filas in modelos.items()},
+        })[0]
+
+    @staticmethod
+    def sincronizar() -> Dict[str, int]:
+        """
+        Ajusta el catálogo al directorio: cataloga archivos nuevos (copiados a
+        mano o anteriores al catálogo) y quita los que ya no existen. Solo abre
+        los archivos que faltan en la tabla.
+        """
+        archivos = {
+            f for f in os.listdir(motor.directorio())
+            if f.startswith(motor.PREFIJO) and (
+                f.endswith(motor.EXTENSION) or (f.endswith('.json') and not f.endswith(motor.EXTENSION_MANIFIESTO))
+            )
+        }
+        catalogados = set(BackupCatalogo.objects.values_list('nombre', flat=True))
+
+        agregados = 0
+        # Orden por nombre (= fecha): los padres se catalogan antes que sus incrementales
+        for nombre in sorted(archivos - catalogados):
+            if nombre.endswith(motor.EXTENSION):
+                manifiesto = motor.leer_manifiesto(nombre)
+                if manifiesto is None:
+                    logger.warning(f"⚠️ Backup {nombre} sin manifiesto, no se cataloga")
+                    continue
+                CatalogoBackups.registrar(manifiesto)
+            elif CatalogoBackups._registrar_legado(nombre) is None:
+                continue
+            agregados += 1
+
+        quitados, _ = BackupCatalogo.objects.filter(nombre__in=catalogados - archivos).delete()
+        return {'agregados': agregados, 'quitados': quitados}
+
+    @staticmethod
+    def padre_incremental() -> Optional[BackupCatalogo]:
+        """Último backup NDJSON, si no hubo una restauración después de crearlo"""
+        ultimo = BackupCatalogo.objects.exclude(tipo='legado').order_by('-creado_en').first()
+        if ultimo is None:
+            return None
+        ultima_restauracion = BackupCatalogo.objects.filter(
+            restaurado_en__isnull=False
+        ).order_by('-restaurado_en').values_list('restaurado_en', flat=True).first()
+        if ultima_restauracion and ultimo.creado_en < ultima_restauracion:
+            return None
+        return ultimo
+
+    @staticmethod
+    def verificar(entrada: BackupCatalogo) -> Tuple[bool, str]:
+        """Compara tamaño y sha256 del archivo con el catálogo, sin descomprimirlo"""
+        ruta = motor.ruta_backup(entrada.nombre)
+        if not os.path.exists(ruta):
+            estado, detalle = 'faltante', 'El archivo no existe'
+        elif os.path.getsize(ruta) != entrada.tamano:
+            estado, detalle = 'danado', f'Tamaño {os.path.getsize(ruta)} bytes, se esperaban {entrada.tamano}'
+        elif entrada.sha256 and motor.sha256_archivo(ruta) != entrada.sha256:
+            estado, detalle = 'danado', 'El sha256 no coincide'
+        else:
+            estado, detalle = 'ok', 'Tamaño y sha256 coinciden'
+
+        entrada.verificacion = estado
+        entrada.verificado_en = timezone.now()
+        entrada.save(update_fields=['verificacion', 'verificado_en'])
+        return estado == 'ok', detalle
+
+    @staticmethod
+    def a_dict(entrada: BackupCatalogo) -> Dict:
+        return {
+            'name': entrada.nombre,
+            'size': f"{entrada.tamano / 1024:.1f} KB",
+            'created': timezone.localtime(entrada.creado_en).strftime("%Y-%m-%d %H:%M:%S"),
+            'timestamp': entrada.creado_en.isoformat(),
+            'records': entrada.filas,
+            'tipo': entrada.tipo,
+            'padre': entrada.padre.nombre if entrada.padre_id else None,
+            'sha256': entrada.sha256,
+            'verificacion': entrada.verificacion,
+            'verificado_en': entrada.verificado_en.isoformat() if entrada.verificado_en else None,
+            'restaurado_en': entrada.restaurado_en.isoformat() if entrada.restaurado_en else None,
+        }
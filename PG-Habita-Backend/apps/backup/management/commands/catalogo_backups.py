@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.backup.catalogo import CatalogoBackups
+from apps.backup.models import BackupCatalogo
+
+
+class Command(BaseCommand):
+    help = (
+        'Sincroniza el catálogo de backups con el directorio y lo lista. '
+        'Con --verificar recalcula el sha256 de cada archivo y lo compara con el catálogo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Verificar tamaño y sha256 de todos los backups catalogados')
+
+    def handle(self, *args, **options):
+        cambios = CatalogoBackups.sincronizar()
+        if cambios['agregados'] or cambios['quitados']:
+            self.stdout.write(f"📁 Catalogados {cambios['agregados']}, quitados {cambios['quitados']}")
+
+        danados = 0
+        for entrada in BackupCatalogo.objects.select_related('padre').order_by('creado_en'):
+            padre = f" <- {entrada.padre.nombre}" if entrada.padre_id else ''
+            linea = f"   {entrada.nombre} [{entrada.tipo}] {entrada.filas} filas, {entrada.tamano / 1024:.1f} KB{padre}"
+            if options['verificar']:
+                ok, detalle = CatalogoBackups.verificar(entrada)
+                if not ok:
+                    danados += 1
+                    self.stdout.write(self.style.ERROR(f"❌{linea}: {detalle}"))
+                    continue
+            self.stdout.write(linea)
+
+        if danados:
+            self.stdout.write(self.style.ERROR(f'❌ {danados} backups dañados o faltantes'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Catálogo al día'))
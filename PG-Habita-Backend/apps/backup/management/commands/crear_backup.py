@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.backup.motor import MotorBackup, ruta_backup
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea un backup de la base en NDJSON comprimido con su manifiesto. '
+        'Con --incremental exporta solo lo modificado desde el último backup '
+        '(si no hay cadena vigente, crea uno completo).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Encadenar al último backup en vez de hacer uno completo')
+
+    def handle(self, *args, **options):
+        tipo = 'incremental' if options['incremental'] else 'completo'
+        self.stdout.write(f'🔧 Creando backup {tipo}...')
+        manifiesto = MotorBackup.crear(tipo)
+
+        for etiqueta, seccion in manifiesto['secciones'].items():
+            if seccion['filas'] or seccion['eliminados']:
+                detalle = f" (+{seccion['eliminados']} eliminados)" if seccion['eliminados'] else ''
+                self.stdout.write(f"   {etiqueta}: {seccion['filas']}{detalle}")
+
+        if manifiesto['tipo'] != tipo:
+            self.stdout.write(self.style.WARNING('⚠️ No había backup base vigente: se creó uno completo'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {ruta_backup(manifiesto['nombre'])}: {manifiesto['filas']} filas, "
+            f"{manifiesto['tamano'] / 1024:.1f} KB en {manifiesto['duracion']}s"
+        ))
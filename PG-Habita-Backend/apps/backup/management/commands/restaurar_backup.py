@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.backup.motor import cadena, es_nombre_valido
+from apps.backup.restauracion import RestauradorBackup
+
+
+class Command(BaseCommand):
+    help = (
+        'Restaura un backup NDJSON reproduciendo su cadena (completo base + incrementales). '
+        'Reemplaza los datos actuales: requiere --confirmar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombre', help='Archivo backup_habita_*.ndjson.gz dentro de BACKUP_DIR')
+        parser.add_argument('--confirmar', action='store_true',
+                            help='Sin esta opción solo muestra la cadena que se aplicaría')
+        parser.add_argument('--metodo', choices=RestauradorBackup.METODOS, default='copy',
+                            help='copy: secciones completas con COPY (por defecto); insert: INSERT por lotes')
+        parser.add_argument('--detalle', action='store_true',
+                            help='Muestra filas y tiempo por tabla')
+
+    def handle(self, *args, **options):
+        nombre = options['nombre']
+        if not es_nombre_valido(nombre):
+            raise CommandError(f'Nombre de backup inválido: {nombre}')
+        try:
+            manifiestos = cadena(nombre)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for manifiesto in manifiestos:
+            self.stdout.write(f"   {manifiesto['tipo']:<12} {manifiesto['nombre']} ({manifiesto['filas']} filas)")
+        if not options['confirmar']:
+            self.stdout.write(self.style.WARNING('⚠️ Nada restaurado: agrega --confirmar para reemplazar los datos'))
+            return
+
+        try:
+            estadisticas = RestauradorBackup.restaurar(nombre, metodo=options['metodo'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['detalle']:
+            secciones = sorted(estadisticas['secciones'].items(), key=lambda s: s[1]['segundos'], reverse=True)
+            for etiqueta, seccion in secciones:
+                if seccion['filas'] or seccion['eliminados']:
+                    self.stdout.write(f"   {etiqueta:<40} {seccion['filas']:>9} filas {seccion['segundos']:>8.3f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Restaurado ({estadisticas['metodo']}): {estadisticas['filas']} filas, "
+            f"{estadisticas['eliminados']} eliminados en {estadisticas['duracion']}s "
+            f"({estadisticas['filas_por_segundo']} filas/s)"
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroEliminado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100)),
+                ('objeto_id', models.CharField(max_length=64)),
+                ('eliminado_en', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'backup_registro_eliminado',
+                'indexes': [models.Index(fields=['eliminado_en'], name='backup_eliminado_fecha_idx')],
+            },
+        ),
+    ]
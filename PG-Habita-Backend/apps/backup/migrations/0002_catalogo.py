@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backup', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tipo', models.CharField(choices=[('completo', 'Completo'), ('incremental', 'Incremental'), ('legado', 'JSON antiguo')], max_length=20)),
+                ('creado_en', models.DateTimeField()),
+                ('marca', models.DateTimeField(blank=True, null=True)),
+                ('tamano', models.BigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('filas', models.BigIntegerField(default=0)),
+                ('secciones', models.JSONField(blank=True, default=dict)),
+                ('duracion', models.FloatField(blank=True, null=True)),
+                ('verificacion', models.CharField(blank=True, choices=[('', 'Sin verificar'), ('ok', 'Íntegro'), ('danado', 'Dañado'), ('faltante', 'Archivo faltante')], default='', max_length=10)),
+                ('verificado_en', models.DateTimeField(blank=True, null=True)),
+                ('restaurado_en', models.DateTimeField(blank=True, null=True)),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='backups', to=settings.AUTH_USER_MODEL)),
+                ('padre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incrementales', to='backup.backupcatalogo')),
+            ],
+            options={
+                'db_table': 'backup_catalogo',
+                'ordering': ['-creado_en'],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import models
+from django.utils import timezone
+
+
+class RegistroEliminado(models.Model):
+    """
+    Lápida de un registro borrado en un modelo con respaldo incremental
+    (los que tienen actualizado_en). El backup incremental las exporta para
+    que la restauración borre esas filas al reproducir la cadena.
+    """
+    modelo = models.CharField(max_length=100)  # app_label.modelname
+    objeto_id = models.CharField(max_length=64)
+    eliminado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'backup_registro_eliminado'
+        indexes = [
+            models.Index(fields=['eliminado_en'], name='backup_eliminado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo}#{self.objeto_id} ({self.eliminado_en})"
+
+
+class BackupCatalogo(models.Model):
+    """
+    Índice de los backups del directorio BACKUP_DIR: lo que antes se obtenía
+    abriendo cada archivo. Se llena al crear el backup (y con
+    CatalogoBackups.sincronizar para archivos copiados a mano o antiguos).
+    """
+    TIPOS = [
+        ('completo', 'Completo'),
+        ('incremental', 'Incremental'),
+        ('legado', 'JSON antiguo'),
+    ]
+    VERIFICACION = [
+        ('', 'Sin verificar'),
+        ('ok', 'Íntegro'),
+        ('danado', 'Dañado'),
+        ('faltante', 'Archivo faltante'),
+    ]
+
+    nombre = models.CharField(max_length=255, unique=True)
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    padre = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='incrementales')
+    creado_en = models.DateTimeField()
+    marca = models.DateTimeField(null=True, blank=True)  # foto de la base usada por los incrementales
+    tamano = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    filas = models.BigIntegerField(default=0)
+    secciones = models.JSONField(default=dict, blank=True)  # etiqueta -> {filas, eliminados, sha256, completa}
+    duracion = models.FloatField(null=True, blank=True)
+    creado_por = models.ForeignKey(
+        'usuarios.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='backups'
+    )
+    verificacion = models.CharField(max_length=10, choices=VERIFICACION, blank=True, default='')
+    verificado_en = models.DateTimeField(null=True, blank=True)
+    restaurado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'backup_catalogo'
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.tipo})"
@@ -0,0 +1,343 @@
+"""
+Motor de backups en NDJSON comprimido (gzip), sin cargar tablas en memoria.
+
+Formato de backup_habita_<fecha>_<tipo>.ndjson.gz, una línea JSON por vez:
+    {"backup": {...encabezado...}}
+    {"seccion": "reservas.reservas", "campos": [...], "completa": true}
+    {"eliminados": [pk, pk, ...]}       <- solo en incrementales
+    [valor, valor, ...]                 <- una fila por línea, en el orden de "campos"
+    {"fin": "reservas.reservas", "filas": 120}
+
+Junto a cada archivo se escribe <nombre>.manifest.json con filas y sha256 por
+sección, el sha256 del archivo comprimido y la cadena (base/padre). El mismo
+contenido queda en BackupCatalogo para listar sin tocar los archivos.
+
+Incrementales: los modelos con actualizado_en (auto_now) exportan solo lo
+modificado desde la marca del backup anterior, más las lápidas de
+RegistroEliminado; los demás se copian completos en cada incremental.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, time as time_, timedelta
+from typing import Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMATO = 1
+PREFIJO = 'backup_habita_'
+EXTENSION = '.ndjson.gz'
+EXTENSION_MANIFIESTO = '.manifest.json'
+CAMPO_MARCA = 'actualizado_en'
+
+
+class CodificadorBackup(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, (datetime, time_)):
+            # DjangoJSONEncoder recorta a milisegundos
+            return o.isoformat()
+        if isinstance(o, (bytes, memoryview)):
+            # BinaryField.to_python acepta base64 al restaurar
+            return base64.b64encode(bytes(o)).decode('ascii')
+        return super().default(o)
+
+
+# ---------- modelos ----------
+
+def _excluido(modelo) -> bool:
+    excluir = getattr(settings, 'BACKUP_EXCLUIR', ['sessions', 'backup'])
+    return modelo._meta.app_label in excluir or modelo._meta.label_lower in excluir
+
+
+def modelos_respaldados() -> List:
+    """Modelos concretos (incluye tablas intermedias M2M) en orden de dependencias"""
+    modelos = [
+        m for m in apps.get_models(include_auto_created=True)
+        if m._meta.managed and not m._meta.proxy and not _excluido(m)
+    ]
+    return orden_dependencias(modelos)
+
+
+def orden_dependencias(modelos: List) -> List:
+    """Primero los referenciados por FK; los ciclos quedan en orden alfabético"""
+    pendientes = {m._meta.label_lower: m for m in modelos}
+    dependencias = {
+        etiqueta: {
+            f.related_model._meta.label_lower for f in m._meta.concrete_fields
+            if f.is_relation and f.related_model is not None
+            and f.related_model._meta.label_lower in pendientes
+            and f.related_model._meta.label_lower != etiqueta
+        }
+        for etiqueta, m in pendientes.items()
+    }
+    ordenados, listos = [], set()
+    while pendientes:
+        disponibles = sorted(e for e in pendientes if dependencias[e] <= listos) or [sorted(pendientes)[0]]
+        for etiqueta in disponibles:
+            ordenados.append(pendientes.pop(etiqueta))
+            listos.add(etiqueta)
+    return ordenados
+
+
+def campos_respaldados(modelo) -> List:
+    # Las columnas generadas (p. ej. tsvector) las recalcula la base
+    return [f for f in modelo._meta.concrete_fields if not getattr(f, 'generated', False)]
+
+
+def es_incremental(modelo) -> bool:
+    campo = next((f for f in modelo._meta.concrete_fields if f.name == CAMPO_MARCA), None)
+    return campo is not None and getattr(campo, 'auto_now', False)
+
+
+def modelos_incrementales() -> List:
+    return [m for m in modelos_respaldados() if es_incremental(m)]
+
+
+# ---------- archivos ----------
+
+def directorio() -> str:
+    ruta = getattr(settings, 'BACKUP_DIR', os.path.join(settings.BASE_DIR, 'backups'))
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def ruta_backup(nombre: str) -> str:
+    return os.path.join(directorio(), nombre)
+
+
+def ruta_manifiesto(nombre: str) -> str:
+    return ruta_backup(nombre[:-len(EXTENSION)] + EXTENSION_MANIFIESTO)
+
+
+def es_nombre_valido(nombre: str) -> bool:
+    return nombre.startswith(PREFIJO) and os.path.basename(nombre) == nombre
+
+
+def leer_manifiesto(nombre: str) -> Optional[Dict]:
+    try:
+        with open(ruta_manifiesto(nombre), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cadena(nombre: str) -> List[Dict]:
+    """Manifiestos desde el backup completo base hasta 'nombre' (en orden de aplicación)"""
+    manifiestos = []
+    actual = nombre
+    while actual:
+        manifiesto = leer_manifiesto(actual)
+        if manifiesto is None or not os.path.exists(ruta_backup(actual)):
+            raise ValueError(f"Falta el backup {actual} de la cadena de {nombre}")
+        manifiestos.append(manifiesto)
+        actual = manifiesto.get('padre')
+    manifiestos.reverse()
+    if manifiestos[0]['tipo'] != 'completo':
+        raise ValueError(f"La cadena de {nombre} no empieza en un backup completo")
+    return manifiestos
+
+
+class _EscritorConHash:
+    """Archivo que calcula el sha256 de lo escrito (el contenido comprimido)"""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.sha256 = hashlib.sha256()
+
+    def write(self, datos):
+        self.sha256.update(datos)
+        return self.archivo.write(datos)
+
+    def flush(self):
+        self.archivo.flush()
+
+
+def sha256_archivo(ruta: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+# ---------- creación ----------
+
+class MotorBackup:
+    """
+    Uso: MotorBackup.crear('completo') / MotorBackup.crear('incremental')
+    Retorna el manifiesto del backup creado.
+    """
+
+    LOTE_ITERADOR = 2000
+
+    @staticmethod
+    def padre_incremental() -> Optional[Dict]:
+        """Manifiesto del último backup de la cadena vigente (ver CatalogoBackups)"""
+        from .catalogo import CatalogoBackups
+
+        entrada = CatalogoBackups.padre_incremental()
+        return leer_manifiesto(entrada.nombre) if entrada else None
+
+    @staticmethod
+    def crear(tipo: str = 'completo', usuario=None) -> Dict:
+        from .catalogo import CatalogoBackups
+
+        if tipo not in ('completo', 'incremental'):
+            raise ValueError(f"Tipo de backup inválido: {tipo}")
+
+        padre = MotorBackup.padre_incremental() if tipo == 'incremental' else None
+        if tipo == 'incremental' and padre is None:
+            # Sin cadena vigente el incremental no tendría base
+            tipo = 'completo'
+
+        inicio = time.monotonic()
+        fecha = timezone.now()
+        nombre = f"{PREFIJO}{fecha:%Y%m%d_%H%M%S}{fecha.microsecond // 1000:03d}_{tipo}{EXTENSION}"
+        ruta = ruta_backup(nombre)
+        temporal = ruta + '.parcial'
+
+        desde = None
+        if padre:
+            margen = timedelta(seconds=getattr(settings, 'BACKUP_MARGEN_SEGUNDOS', 60))
+            desde = parse_datetime(padre['marca']) - margen
+
+        secciones = {}
+        try:
+            with open(temporal, 'wb') as destino, transaction.atomic():
+                escritor = _EscritorConHash(destino)
+                with connection.cursor() as cursor:
+                    # Todas las tablas desde la misma foto de la base
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+                    cursor.execute('SELECT now()')
+                    marca = cursor.fetchone()[0]
+
+                encabezado = {
+                    'formato': FORMATO,
+                    'tipo': tipo,
+                    'creado_en': fecha.isoformat(),
+                    'marca': marca.isoformat(),
+                    'padre': padre['nombre'] if padre else None,
+                    'base': (padre.get('base') or padre['nombre']) if padre else None,
+                }
+                nivel = getattr(settings, 'BACKUP_NIVEL_COMPRESION', 6)
+                with gzip.GzipFile(filename='', mode='wb', fileobj=escritor, compresslevel=nivel, mtime=0) as gz:
+                    gz.write(MotorBackup._linea({'backup': encabezado}))
+                    for modelo in modelos_respaldados():
+                        secciones[modelo._meta.label_lower] = MotorBackup._escribir_seccion(gz, modelo, desde)
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+        manifiesto = {
+            **encabezado,
+            'nombre': nombre,
+            'compresion': 'gzip',
+            'tamano': os.path.getsize(ruta),
+            'sha256': escritor.sha256.hexdigest(),
+            'filas': sum(s['filas'] for s in secciones.values()),
+            'secciones': secciones,
+            'duracion': round(time.monotonic() - inicio, 3),
+        }
+        with open(ruta_manifiesto(nombre), 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        CatalogoBackups.registrar(manifiesto, usuario)
+
+        if tipo == 'completo':
+            MotorBackup._podar_eliminados(marca)
+        return manifiesto
+
+    @staticmethod
+    def _linea(dato) -> bytes:
+        return json.dumps(dato, cls=CodificadorBackup, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+    @staticmethod
+    def _escribir_seccion(gz, modelo, desde) -> Dict:
+        from .models import RegistroEliminado
+
+        etiqueta = modelo._meta.label_lower
+        campos = [f.attname for f in campos_respaldados(modelo)]
+        incremental = desde is not None and es_incremental(modelo)
+
+        queryset = modelo._base_manager.order_by(modelo._meta.pk.attname)
+        if incremental:
+            queryset = queryset.filter(**{f'{CAMPO_MARCA}__gte': desde})
+
+        gz.write(MotorBackup._linea({'seccion': etiqueta, 'campos': campos, 'completa': not incremental}))
+        sha256 = hashlib.sha256()
+
+        # Las lápidas van antes que las filas: al restaurar se borra primero
+        # para no chocar con restricciones únicas de filas recreadas
+        eliminados = 0
+        if incremental:
+            ids = list(
+                RegistroEliminado.objects.filter(modelo=etiqueta, eliminado_en__gte=desde)
+                .values_list('objeto_id', flat=True).distinct()
+            )
+            pk = modelo._meta.pk
+            for i in range(0, len(ids), 1000):
+                linea = MotorBackup._linea({'eliminados': [pk.to_python(v) for v in ids[i:i + 1000]]})
+                sha256.update(linea)
+                gz.write(linea)
+            eliminados = len(ids)
+
+        filas = 0
+        for fila in queryset.values_list(*campos).iterator(chunk_size=MotorBackup.LOTE_ITERADOR):
+            linea = MotorBackup._linea(fila)
+            sha256.update(linea)
+            gz.write(linea)
+            filas += 1
+
+        gz.write(MotorBackup._linea({'fin': etiqueta, 'filas': filas}))
+        return {'filas': filas, 'eliminados': eliminados, 'completa': not incremental, 'sha256': sha256.hexdigest()}
+
+    @staticmethod
+    def _podar_eliminados(marca):
+        """Tras un completo, los incrementales nuevos encadenan a él: las lápidas previas sobran"""
+        from .models import RegistroEliminado
+
+        margen = timedelta(seconds=getattr(settings, 'BACKUP_MARGEN_SEGUNDOS', 60))
+        RegistroEliminado.objects.filter(eliminado_en__lt=marca - margen).delete()
+
+# ---------- lectura ----------
+
+def leer_backup(nombre: str):
+    """
+    Recorre un backup sección por sección sin cargarlo entero.
+    Genera (encabezado, None, None) y luego (etiqueta, campos, iterador) por sección;
+    el iterador da ('eliminados', lista de pks) y luego ('fila', lista).
+    """
+    with gzip.open(ruta_backup(nombre), 'rb') as gz:
+        lineas = iter(gz)
+        primera = json.loads(next(lineas))
+        yield primera['backup'], None, None
+
+        for linea in lineas:
+            dato = json.loads(linea)
+            etiqueta = dato['seccion']
+            completa = dato.get('completa', True)
+
+            def contenido():
+                for linea_seccion in lineas:
+                    valor = json.loads(linea_seccion)
+                    if isinstance(valor, list):
+                        yield 'fila', valor
+                    elif 'eliminados' in valor:
+                        yield 'eliminados', valor['eliminados']
+                    else:  # {"fin": ...}
+                        return
+
+            seccion = contenido()
+            yield etiqueta, {'campos': dato['campos'], 'completa': completa}, seccion
+            # Si quien lee saltó la sección, avanzar hasta su "fin"
+            for _ in seccion:
+                pass
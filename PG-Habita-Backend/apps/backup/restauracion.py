@@ -0,0 +1,292 @@
+"""
+Restauración de backups NDJSON: reproduce la cadena base completa + incrementales
+en una sola transacción. Escribe con SQL directo (sin save() ni señales) para
+conservar los valores originales de auto_now/auto_now_add y no disparar
+notificaciones ni lápidas durante la restauración.
+
+Las secciones completas se cargan con COPY ... FROM STDIN en bloques generados
+en memoria; las incrementales con INSERT ... ON CONFLICT por lotes.
+"""
+import base64
+import io
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Set
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .motor import cadena, leer_backup, ruta_backup, sha256_archivo
+
+logger = logging.getLogger(__name__)
+
+TIPOS_SIN_ESCAPE = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField',
+    'PositiveSmallIntegerField', 'FloatField', 'DecimalField', 'DateField', 'DateTimeField',
+}
+
+
+def _escapar_copy(texto: str) -> str:
+    # La mayoría de los valores no tiene nada que escapar: comprobar es más barato que reemplazar
+    if '\\' in texto:
+        texto = texto.replace('\\', '\\\\')
+    if '\t' in texto or '\n' in texto or '\r' in texto:
+        texto = texto.replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return texto
+
+
+class RestauradorBackup:
+    """Uso: RestauradorBackup.restaurar(nombre) -> estadísticas"""
+
+    LOTE = 1000
+    # Filas por bloque de COPY (el bloque se arma en memoria antes de enviarlo)
+    LOTE_COPY = 20000
+    METODOS = ('copy', 'insert')
+
+    @staticmethod
+    def verificar(manifiestos: List[Dict]):
+        """Compara el sha256 de cada archivo con su manifiesto antes de tocar la base"""
+        for manifiesto in manifiestos:
+            if sha256_archivo(ruta_backup(manifiesto['nombre'])) != manifiesto['sha256']:
+                raise ValueError(f"El backup {manifiesto['nombre']} está dañado (sha256 distinto)")
+
+    @staticmethod
+    def restaurar(nombre: str, metodo: str = 'copy') -> Dict:
+        """metodo: 'copy' (secciones completas con COPY) o 'insert' (todo con INSERT por lotes)"""
+        if metodo not in RestauradorBackup.METODOS:
+            raise ValueError(f"Método de restauración inválido: {metodo}")
+        manifiestos = cadena(nombre)
+        RestauradorBackup.verificar(manifiestos)
+
+        inicio = time.monotonic()
+        versiones_previas = RestauradorBackup._versiones_reportes()
+        estadisticas = {'backups': [m['nombre'] for m in manifiestos], 'filas': 0, 'eliminados': 0, 'secciones': {}}
+        modelos = {}
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Las FK de Django ya son DEFERRABLE: se validan al confirmar
+                cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+                # Si el servidor cae antes de confirmar se repite la restauración completa
+                cursor.execute('SET LOCAL synchronous_commit TO OFF')
+
+                for manifiesto in manifiestos:
+                    for etiqueta, seccion, contenido in leer_backup(manifiesto['nombre']):
+                        if seccion is None:
+                            continue  # encabezado
+                        try:
+                            modelo = apps.get_model(etiqueta)
+                        except LookupError:
+                            logger.warning(f"⚠️ Modelo {etiqueta} del backup no existe, se omite")
+                            continue
+                        modelos[etiqueta] = modelo
+
+                        inicio_seccion = time.monotonic()
+                        if seccion['completa']:
+                            cursor.execute(f"DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}")
+                        if seccion['completa'] and metodo == 'copy':
+                            filas, eliminados = RestauradorBackup._copiar_seccion(
+                                cursor, modelo, seccion['campos'], contenido
+                            )
+                        else:
+                            filas, eliminados = RestauradorBackup._aplicar_seccion(
+                                cursor, modelo, seccion['campos'], contenido, upsert=not seccion['completa']
+                            )
+                        resumen = estadisticas['secciones'].setdefault(
+                            etiqueta, {'filas': 0, 'eliminados': 0, 'segundos': 0.0}
+                        )
+                        resumen['filas'] += filas
+                        resumen['eliminados'] += eliminados
+                        resumen['segundos'] = round(resumen['segundos'] + time.monotonic() - inicio_seccion, 3)
+                        estadisticas['filas'] += filas
+                        estadisticas['eliminados'] += eliminados
+
+                # Los id siguientes deben continuar después de los restaurados
+                for sql in connection.ops.sequence_reset_sql(no_style(), list(modelos.values())):
+                    cursor.execute(sql)
+
+            RestauradorBackup._reparar_referencias(set(modelos.values()))
+
+            # Las lápidas pendientes eran de la base anterior a la restauración
+            from .models import RegistroEliminado
+            RegistroEliminado.objects.all().delete()
+            RestauradorBackup._avanzar_versiones_reportes(versiones_previas)
+
+        RestauradorBackup._despues_de_restaurar(manifiestos[-1])
+        duracion = time.monotonic() - inicio
+        estadisticas['metodo'] = metodo
+        estadisticas['duracion'] = round(duracion, 3)
+        estadisticas['filas_por_segundo'] = round(estadisticas['filas'] / duracion) if duracion else 0
+        return estadisticas
+
+    @staticmethod
+    def _reparar_referencias(restaurados: Set):
+        """
+        Las tablas que no vienen en el backup (BACKUP_EXCLUIR, p. ej. backup_catalogo.creado_por)
+        conservan sus filas: las FK a filas que ya no existen fallarían al confirmar.
+        Se anulan, o se borra la fila si la FK no admite NULL.
+        """
+        for modelo in apps.get_models(include_auto_created=True):
+            if modelo in restaurados or not modelo._meta.managed or modelo._meta.proxy:
+                continue
+            for campo in modelo._meta.concrete_fields:
+                if not campo.is_relation or campo.related_model not in restaurados:
+                    continue
+                existentes = campo.related_model._base_manager.values(campo.target_field.attname)
+                huerfanas = modelo._base_manager.filter(
+                    **{f'{campo.attname}__isnull': False}
+                ).exclude(**{f'{campo.attname}__in': existentes})
+                if campo.null:
+                    cantidad = huerfanas.update(**{campo.attname: None})
+                else:
+                    cantidad = huerfanas.delete()[0]
+                if cantidad:
+                    logger.warning(f"⚠️ {modelo._meta.label_lower}.{campo.name}: {cantidad} referencias a filas no restauradas")
+
+    @staticmethod
+    def _columnas(modelo, campos: List[str]):
+        """Retorna (índices en la fila del backup, campos del modelo) de las columnas que siguen existiendo"""
+        por_attname = {f.attname: f for f in modelo._meta.concrete_fields}
+        faltantes = [c for c in campos if c not in por_attname]
+        if faltantes:
+            # Columnas que ya no existen en el modelo: se descartan
+            logger.warning(f"⚠️ {modelo._meta.label_lower}: columnas omitidas {faltantes}")
+        indices = [i for i, c in enumerate(campos) if c in por_attname]
+        return indices, [por_attname[campos[i]] for i in indices]
+
+    @staticmethod
+    def _eliminar(cursor, modelo, valores) -> int:
+        pk = modelo._meta.pk
+        ids = [pk.get_db_prep_value(pk.to_python(v), connection) for v in valores]
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)} "
+            f"WHERE {connection.ops.quote_name(pk.column)} = ANY(%s)", [ids]
+        )
+        return len(ids)
+
+    @staticmethod
+    def _aplicar_seccion(cursor, modelo, campos: List[str], contenido, upsert: bool):
+        indices, campos_modelo = RestauradorBackup._columnas(modelo, campos)
+
+        tabla = connection.ops.quote_name(modelo._meta.db_table)
+        pk = modelo._meta.pk
+        columnas = ', '.join(connection.ops.quote_name(f.column) for f in campos_modelo)
+        marcador = '(' + ', '.join(['%s'] * len(campos_modelo)) + ')'
+        conflicto = ''
+        if upsert:
+            actualizar = ', '.join(
+                f"{connection.ops.quote_name(f.column)} = EXCLUDED.{connection.ops.quote_name(f.column)}"
+                for f in campos_modelo if f is not pk
+            )
+            conflicto = f" ON CONFLICT ({connection.ops.quote_name(pk.column)}) DO " + (
+                f"UPDATE SET {actualizar}" if actualizar else "NOTHING"
+            )
+
+        def insertar(lote):
+            sql = f"INSERT INTO {tabla} ({columnas}) VALUES " + ', '.join([marcador] * len(lote)) + conflicto
+            cursor.execute(sql, [valor for fila in lote for valor in fila])
+
+        filas = eliminados = 0
+        lote = []
+        for tipo, valores in contenido:
+            if tipo == 'eliminados':
+                eliminados += RestauradorBackup._eliminar(cursor, modelo, valores)
+                continue
+            lote.append([
+                f.get_db_prep_save(f.to_python(valores[i]), connection) for f, i in zip(campos_modelo, indices)
+            ])
+            if len(lote) >= RestauradorBackup.LOTE:
+                insertar(lote)
+                filas += len(lote)
+                lote = []
+        if lote:
+            insertar(lote)
+            filas += len(lote)
+        return filas, eliminados
+
+    # ---------- COPY ----------
+
+    @staticmethod
+    def _conversor_copy(campo) -> Callable:
+        """Valor del NDJSON -> texto ya escapado para el formato de texto de COPY"""
+        tipo = (campo.target_field if campo.is_relation else campo).get_internal_type()
+        if tipo == 'JSONField':
+            return lambda v: _escapar_copy(json.dumps(v, ensure_ascii=False))
+        if tipo == 'BinaryField':
+            return lambda v: '\\\\x' + base64.b64decode(v).hex()
+        if tipo == 'BooleanField':
+            return lambda v: 't' if v else 'f'
+        if tipo in TIPOS_SIN_ESCAPE:
+            # Números, Decimal como texto y fechas ISO: sin barras, tabs ni saltos
+            return str
+        return lambda v: _escapar_copy(str(v))
+
+    @staticmethod
+    def _copiar_seccion(cursor, modelo, campos: List[str], contenido):
+        """Sección completa (tabla ya vacía) con COPY FROM STDIN en bloques de LOTE_COPY filas"""
+        indices, campos_modelo = RestauradorBackup._columnas(modelo, campos)
+        columnas = [(i, RestauradorBackup._conversor_copy(f)) for i, f in zip(indices, campos_modelo)]
+
+        tabla = connection.ops.quote_name(modelo._meta.db_table)
+        lista_columnas = ', '.join(connection.ops.quote_name(f.column) for f in campos_modelo)
+        sql = f"COPY {tabla} ({lista_columnas}) FROM STDIN"
+        # copy_expert es de psycopg2: se usa el cursor real, no el envoltorio de Django
+        cursor_db = cursor.cursor
+
+        def enviar(lineas):
+            cursor_db.copy_expert(sql, io.StringIO(''.join(lineas)))
+
+        filas = eliminados = 0
+        lineas = []
+        for tipo, valores in contenido:
+            if tipo == 'eliminados':
+                eliminados += RestauradorBackup._eliminar(cursor, modelo, valores)
+                continue
+            lineas.append('\t'.join([
+                '\\N' if valores[i] is None else convertir(valores[i]) for i, convertir in columnas
+            ]) + '\n')
+            if len(lineas) >= RestauradorBackup.LOTE_COPY:
+                enviar(lineas)
+                filas += len(lineas)
+                lineas = []
+        if lineas:
+            enviar(lineas)
+            filas += len(lineas)
+        return filas, eliminados
+
+    @staticmethod
+    def _versiones_reportes() -> Dict[str, int]:
+        from apps.reportes.models import VersionDatosReporte
+        return dict(VersionDatosReporte.objects.values_list('alcance', 'version'))
+
+    @staticmethod
+    def _avanzar_versiones_reportes(previas: Dict[str, int]):
+        """
+        El backup trae versiones viejas: si volvieran a un número ya usado, otros
+        procesos servirían reportes cacheados de antes de restaurar. Cada alcance
+        queda por encima de la mayor versión conocida.
+        """
+        from apps.reportes.models import VersionDatosReporte
+
+        restauradas = RestauradorBackup._versiones_reportes()
+        ahora = timezone.now()
+        for alcance in set(previas) | set(restauradas):
+            version = max(previas.get(alcance, 0), restauradas.get(alcance, 0)) + 1
+            VersionDatosReporte.objects.update_or_create(
+                alcance=alcance, defaults={'version': version, 'actualizado_en': ahora}
+            )
+
+    @staticmethod
+    def _despues_de_restaurar(manifiesto: Dict):
+        from apps.reportes.services import CacheReportes
+        from .catalogo import CatalogoBackups
+
+        # Los incrementales siguientes no pueden encadenar a backups anteriores a esto
+        entrada = CatalogoBackups.registrar(manifiesto)
+        entrada.restaurado_en = timezone.now()
+        entrada.save(update_fields=['restaurado_en'])
+        CacheReportes.limpiar()
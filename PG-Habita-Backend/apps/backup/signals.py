@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete
+
+from .models import RegistroEliminado
+from .motor import modelos_incrementales
+
+
+def registrar_eliminado(sender, instance, **kwargs):
+    RegistroEliminado.objects.create(modelo=sender._meta.label_lower, objeto_id=str(instance.pk))
+
+
+def conectar():
+    # Solo los modelos con marca de agua: el resto se copia completo en cada
+    # incremental y un receptor global quitaría el borrado rápido a todos
+    for modelo in modelos_incrementales():
+        post_delete.connect(registrar_eliminado, sender=modelo, dispatch_uid=f'backup_eliminado_{modelo._meta.label_lower}')
@@ -0,0 +1,154 @@
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.propiedades.models import GeocodificacionCache, Propiedades
+from apps.reportes.models import ResumenMensualReservas
+from apps.reservas.models import Reservas
+from apps.reservas.tests import crear_usuario
+from apps.servicios.models import Servicio
+from .models import BackupCatalogo, RegistroEliminado
+from .motor import MotorBackup, ruta_backup
+from .restauracion import RestauradorBackup
+
+
+# MotorBackup.crear fija el aislamiento de su propia transacción: no puede
+# correr dentro de la transacción de un TestCase
+@override_settings(BACKUP_MARGEN_SEGUNDOS=0)
+class BackupRestauracionTest(TransactionTestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(BACKUP_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        # Servicio se copia completo en cada backup; GeocodificacionCache es incremental
+        self.servicio = Servicio.objects.create(
+            nombre='Limpieza', descripcion='Limpieza final', precio=Decimal('50'), status=True, descuento=0,
+        )
+        self.caches = [
+            GeocodificacionCache.objects.create(
+                tipo='coordenadas', clave=f'calle {i}', resultado={'lat': i, 'lon': -i},
+                expira_en=timezone.now() + timedelta(days=30),
+            )
+            for i in range(3)
+        ]
+
+    def estado(self):
+        return (
+            list(Servicio.objects.order_by('pk').values_list('pk', 'nombre', 'precio', 'status', 'descuento')),
+            list(GeocodificacionCache.objects.order_by('pk').values_list(
+                'pk', 'clave', 'resultado', 'exito', 'hits', 'creado_en', 'actualizado_en'
+            )),
+        )
+
+    def alterar(self):
+        Servicio.objects.update(precio=Decimal('999'))
+        GeocodificacionCache.objects.all().delete()
+
+    def test_completo_ida_y_vuelta(self):
+        manifiesto = MotorBackup.crear('completo')
+        esperado = self.estado()
+
+        for metodo in RestauradorBackup.METODOS:
+            with self.subTest(metodo=metodo):
+                self.alterar()
+                estadisticas = RestauradorBackup.restaurar(manifiesto['nombre'], metodo)
+
+                self.assertEqual(self.estado(), esperado)
+                self.assertEqual(estadisticas['backups'], [manifiesto['nombre']])
+                # Los id nuevos continúan después de los restaurados
+                nuevo = Servicio.objects.create(nombre='Otro', descripcion='', precio=1, status=True, descuento=0)
+                self.assertGreater(nuevo.pk, self.servicio.pk)
+                nuevo.delete()
+
+    def test_incremental_lleva_solo_cambios_y_lapidas(self):
+        base = MotorBackup.crear('completo')
+        modificado, eliminado, _ = self.caches
+        modificado.hits = 7
+        modificado.save()
+        eliminado.delete()
+        GeocodificacionCache.objects.create(
+            tipo='sugerencias', clave='calle 9', resultado=[], expira_en=timezone.now() + timedelta(days=1),
+        )
+        Servicio.objects.update(descuento=Decimal('5'))
+
+        incremental = MotorBackup.crear('incremental')
+        esperado = self.estado()
+
+        self.assertEqual(incremental['tipo'], 'incremental')
+        self.assertEqual(incremental['padre'], base['nombre'])
+        seccion = incremental['secciones']['propiedades.geocodificacioncache']
+        self.assertEqual((seccion['filas'], seccion['eliminados'], seccion['completa']), (2, 1, False))
+        self.assertTrue(incremental['secciones']['servicios.servicio']['completa'])
+
+        self.alterar()
+        estadisticas = RestauradorBackup.restaurar(incremental['nombre'])
+
+        self.assertEqual(estadisticas['backups'], [base['nombre'], incremental['nombre']])
+        self.assertEqual(self.estado(), esperado)
+        self.assertFalse(RegistroEliminado.objects.exists())
+
+    def test_archivo_danado_no_toca_la_base(self):
+        manifiesto = MotorBackup.crear('completo')
+        with open(ruta_backup(manifiesto['nombre']), 'ab') as archivo:
+            archivo.write(b'\0')
+        self.alterar()
+        alterado = self.estado()
+
+        with self.assertRaises(ValueError):
+            RestauradorBackup.restaurar(manifiesto['nombre'])
+
+        self.assertEqual(self.estado(), alterado)
+
+    def test_restaurar_anula_referencias_de_tablas_excluidas(self):
+        # backup_catalogo no se restaura: su creado_por apunta a un usuario posterior al backup
+        base = MotorBackup.crear('completo')
+        admin = crear_usuario('admin_posterior')
+        MotorBackup.crear('completo', usuario=admin)
+
+        RestauradorBackup.restaurar(base['nombre'])
+
+        self.assertFalse(type(admin).objects.filter(pk=admin.pk).exists())
+        self.assertEqual(BackupCatalogo.objects.count(), 2)
+        self.assertFalse(BackupCatalogo.objects.filter(creado_por__isnull=False).exists())
+
+    def test_incremental_lleva_el_resumen_de_un_mes_existente(self):
+        # Los contadores del resumen se suman con update(): deben marcar actualizado_en igual
+        huesped = crear_usuario('huesped_backup')
+        propiedad = Propiedades.objects.create(
+            user=crear_usuario('anfitrion_backup'), nombre='Casa Backup', descripcion='Casa de prueba',
+            tipo='casa', precio_noche=100, direccion_completa='Calle 1',
+        )
+        anio = timezone.localdate().year + 1
+
+        def reservar(dia: int):
+            Reservas.objects.create(
+                user=huesped, propiedad=propiedad, fecha_checkin=date(anio, 3, dia),
+                fecha_checkout=date(anio, 3, dia + 2), cant_huesp=1, cant_noches=2, monto_total=Decimal('200'),
+            )
+
+        def resumen():
+            return list(ResumenMensualReservas.objects.filter(propiedad=propiedad).values_list(
+                'mes', 'status', 'pago_estado', 'cantidad', 'noches', 'ingresos'
+            ))
+
+        reservar(1)
+        MotorBackup.crear('completo')
+        reservar(10)
+        incremental = MotorBackup.crear('incremental')
+        esperado = resumen()
+
+        self.assertEqual(esperado, [(date(anio, 3, 1), 'pendiente', 'pendiente', 2, 4, Decimal('400'))])
+        self.assertEqual(incremental['secciones']['reportes.resumenmensualreservas']['filas'], 1)
+
+        ResumenMensualReservas.objects.all().delete()
+        RestauradorBackup.restaurar(incremental['nombre'])
+
+        self.assertEqual(resumen(), esperado)
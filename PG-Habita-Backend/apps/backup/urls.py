@@ -6,6 +6,7 @@ urlpatterns = [
     path('list/', views.list_backups, name='list_backups'),
     path('download/<str:filename>/', views.download_backup, name='download_backup'),
     path('delete/<str:filename>/', views.delete_backup, name='delete_backup'),
+    path('verify/<str:filename>/', views.verify_backup, name='verify_backup'),
     path('status/', views.backup_status, name='backup_status'),
     path('restore/', views.restore_backup, name='restore_backup'),
 ]
\ No newline at end of file
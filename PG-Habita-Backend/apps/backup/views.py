@@ -1,107 +1,50 @@
 # apps/backup/views.py - VERSIÓN COMPLETA CON MANEJO DE ERRORES
 import os
 import json
-from datetime import datetime
-from django.http import HttpResponse, JsonResponse
-from django.core import serializers
-from django.conf import settings
+from django.http import FileResponse, JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from apps.permisos.permissions import HasPermission
+from . import motor
+from .catalogo import CatalogoBackups
+from .models import BackupCatalogo
+from .motor import MotorBackup
+from .restauracion import RestauradorBackup
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, HasPermission])
 def backup_database(request):
-    """Crear backup rápido de toda la base de datos"""
+    """
+    Crear backup de toda la base en NDJSON comprimido (ver apps.backup.motor).
+    Body opcional: {"tipo": "completo" | "incremental"}
+    """
     try:
-        print("🔧 Iniciando proceso de backup...")
-
-        # Importar modelos dentro del try para evitar imports circulares
-        from apps.usuarios.models import CustomUser
-        from apps.propiedades.models import Propiedades
-        from apps.reservas.models import Reservas
-        from apps.favoritos.models import Favoritos
-        from apps.notificaciones.models import Notificacion
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
+        tipo = request.data.get('tipo', 'completo')
+        if tipo not in ('completo', 'incremental'):
+            return JsonResponse({
+                'status': 'error',
+                'message': "tipo debe ser 'completo' o 'incremental'"
+            }, status=400)
 
-        print(f"📁 Directorio de backup: {backup_dir}")
+        print(f"🔧 Iniciando backup {tipo}...")
+        manifiesto = MotorBackup.crear(tipo, usuario=request.user)
+        stats = {etiqueta: seccion['filas'] for etiqueta, seccion in manifiesto['secciones'].items()}
 
-        backup_data = {
-            'timestamp': timestamp,
-            'database': 'habita_db',
-            'backup_type': 'full'
-        }
-
-        # Recopilar datos con manejo de errores individual
-        models_data = {}
-
-        try:
-            models_data['usuarios'] = json.loads(serializers.serialize('json', CustomUser.objects.all()))
-            print(f"✅ Usuarios backup: {len(models_data['usuarios'])} registros")
-        except Exception as e:
-            print(f"❌ Error en usuarios: {e}")
-            models_data['usuarios'] = []
-
-        try:
-            models_data['propiedades'] = json.loads(serializers.serialize('json', Propiedades.objects.all()))
-            print(f"✅ Propiedades backup: {len(models_data['propiedades'])} registros")
-        except Exception as e:
-            print(f"❌ Error en propiedades: {e}")
-            models_data['propiedades'] = []
-
-        try:
-            models_data['reservas'] = json.loads(serializers.serialize('json', Reservas.objects.all()))
-            print(f"✅ Reservas backup: {len(models_data['reservas'])} registros")
-        except Exception as e:
-            print(f"❌ Error en reservas: {e}")
-            models_data['reservas'] = []
-
-        try:
-            models_data['favoritos'] = json.loads(serializers.serialize('json', Favoritos.objects.all()))
-            print(f"✅ Favoritos backup: {len(models_data['favoritos'])} registros")
-        except Exception as e:
-            print(f"❌ Error en favoritos: {e}")
-            models_data['favoritos'] = []
-
-        try:
-            models_data['notificaciones'] = json.loads(serializers.serialize('json', Notificacion.objects.all()))
-            print(f"✅ Notificaciones backup: {len(models_data['notificaciones'])} registros")
-        except Exception as e:
-            print(f"❌ Error en notificaciones: {e}")
-            models_data['notificaciones'] = []
-
-        backup_data['models'] = models_data
-
-        # Guardar archivo
-        filename = f'backup_habita_{timestamp}.json'
-        filepath = os.path.join(backup_dir, filename)
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, indent=2, ensure_ascii=False)
-
-        # Estadísticas
-        stats = {
-            'usuarios': len(models_data['usuarios']),
-            'propiedades': len(models_data['propiedades']),
-            'reservas': len(models_data['reservas']),
-            'favoritos': len(models_data['favoritos']),
-            'notificaciones': len(models_data['notificaciones'])
-        }
-
-        print(f"💾 Backup guardado: {filename}")
+        print(f"💾 Backup guardado: {manifiesto['nombre']} ({manifiesto['filas']} filas en {manifiesto['duracion']}s)")
 
         return JsonResponse({
             'status': 'success',
-            'message': f'Backup creado: {filename}',
-            'filename': filename,
-            'filepath': filepath,
+            'message': f"Backup creado: {manifiesto['nombre']}",
+            'filename': manifiesto['nombre'],
+            'tipo': manifiesto['tipo'],
+            'padre': manifiesto['padre'],
             'stats': stats,
-            'size': f"{os.path.getsize(filepath) / 1024:.1f} KB"
+            'eliminados': sum(s['eliminados'] for s in manifiesto['secciones'].values()),
+            'sha256': manifiesto['sha256'],
+            'size': f"{manifiesto['tamano'] / 1024:.1f} KB",
+            'duracion': manifiesto['duracion']
         })
 
     except Exception as e:
@@ -123,36 +66,16 @@ backup_database.permission_codename = "backup.crear"
 def list_backups(request):
     """Listar todos los backups disponibles"""
     try:
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        backups = []
-
-        print(f"📁 Buscando backups en: {backup_dir}")
-
-        if os.path.exists(backup_dir):
-            for file in os.listdir(backup_dir):
-                if file.endswith('.json') and file.startswith('backup_habita_'):
-                    file_path = os.path.join(backup_dir, file)
-
-                    try:
-                        stats = os.stat(file_path)
-
-                        # Leer metadata del backup
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-
-                        backups.append({
-                            'name': file,
-                            'size': f"{stats.st_size / 1024:.1f} KB",
-                            'created': datetime.fromtimestamp(stats.st_ctime).strftime("%Y-%m-%d %H:%M:%S"),
-                            'timestamp': data.get('timestamp', ''),
-                            'records': sum(len(data.get('models', {}).get(key, [])) for key in data.get('models', {}))
-                        })
-                    except Exception as e:
-                        print(f"⚠️ Error leyendo backup {file}: {e}")
-                        continue
+        # El catálogo tiene tamaño, filas y checksum: no se abre ningún backup
+        # (sincronizar solo lee los archivos que todavía no están catalogados)
+        cambios = CatalogoBackups.sincronizar()
+        if cambios['agregados'] or cambios['quitados']:
+            print(f"📁 Catálogo sincronizado: {cambios}")
 
-        # Ordenar por fecha (más reciente primero)
-        backups.sort(key=lambda x: x['created'], reverse=True)
+        backups = [
+            CatalogoBackups.a_dict(entrada)
+            for entrada in BackupCatalogo.objects.select_related('padre').order_by('-creado_en')
+        ]
 
         print(f"📊 Encontrados {len(backups)} backups")
 
@@ -197,12 +120,9 @@ def backup_status(request):
         }
 
         # Verificar si hay backups
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        if os.path.exists(backup_dir) and os.listdir(backup_dir):
-            backups = [f for f in os.listdir(backup_dir) if f.startswith('backup_habita_')]
-            if backups:
-                backups.sort(reverse=True)
-                stats['ultimo_backup'] = backups[0]
+        ultimo = BackupCatalogo.objects.order_by('-creado_en').values_list('nombre', flat=True).first()
+        if ultimo:
+            stats['ultimo_backup'] = ultimo
 
         print(f"📈 Estadísticas: {stats}")
 
@@ -230,14 +150,12 @@ backup_status.permission_codename = "backup.ver"
 def download_backup(request, filename):
     """Descargar backup específico"""
     try:
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        file_path = os.path.join(backup_dir, filename)
-
-        if os.path.exists(file_path) and filename.startswith('backup_habita_'):
-            with open(file_path, 'rb') as fh:
-                response = HttpResponse(fh.read(), content_type='application/json')
-                response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                return response
+        file_path = motor.ruta_backup(filename)
+
+        if motor.es_nombre_valido(filename) and os.path.exists(file_path):
+            content_type = 'application/gzip' if filename.endswith('.gz') else 'application/json'
+            # FileResponse envía el archivo por partes, sin leerlo entero
+            return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
         else:
             return JsonResponse({
                 'status': 'error',
@@ -260,11 +178,23 @@ download_backup.permission_codename = "backup.descargar"
 def delete_backup(request, filename):
     """Eliminar backup"""
     try:
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        file_path = os.path.join(backup_dir, filename)
-
-        if os.path.exists(file_path) and filename.startswith('backup_habita_'):
+        file_path = motor.ruta_backup(filename)
+
+        if motor.es_nombre_valido(filename) and os.path.exists(file_path):
+            if filename.endswith(motor.EXTENSION):
+                dependientes = list(
+                    BackupCatalogo.objects.filter(padre__nombre=filename).values_list('nombre', flat=True)
+                )
+                if dependientes and request.GET.get('forzar') != '1':
+                    return JsonResponse({
+                        'status': 'error',
+                        'message': 'Hay backups incrementales que dependen de este backup',
+                        'dependientes': dependientes
+                    }, status=409)
+                if os.path.exists(motor.ruta_manifiesto(filename)):
+                    os.remove(motor.ruta_manifiesto(filename))
             os.remove(file_path)
+            BackupCatalogo.objects.filter(nombre=filename).delete()
             return JsonResponse({
                 'status': 'success',
                 'message': f'Backup {filename} eliminado'
@@ -286,11 +216,96 @@ def delete_backup(request, filename):
 delete_backup.permission_codename = "backup.eliminar"
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, HasPermission])
+def verify_backup(request, filename):
+    """
+    Verificar integridad de un backup con el catálogo (tamaño y sha256 del
+    archivo), sin descomprimirlo. Con ?cadena=1 verifica también sus padres.
+    """
+    try:
+        entrada = BackupCatalogo.objects.select_related('padre').filter(nombre=filename).first()
+        if entrada is None:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Backup no catalogado'
+            }, status=404)
+
+        entradas = [entrada]
+        if request.GET.get('cadena') == '1':
+            while entradas[-1].padre_id:
+                entradas.append(BackupCatalogo.objects.get(pk=entradas[-1].padre_id))
+
+        resultados = []
+        for actual in entradas:
+            ok, detalle = CatalogoBackups.verificar(actual)
+            resultados.append({'name': actual.nombre, 'ok': ok, 'verificacion': actual.verificacion, 'detalle': detalle})
+            print(f"{'✅' if ok else '❌'} Verificación {actual.nombre}: {detalle}")
+
+        integro = all(r['ok'] for r in resultados)
+        return JsonResponse({
+            'status': 'success',
+            'integro': integro,
+            'message': 'Backup íntegro' if integro else 'El backup o su cadena tiene archivos dañados o faltantes',
+            'resultados': resultados
+        })
+
+    except Exception as e:
+        print(f"💥 ERROR verificando backup: {e}")
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Error verificando backup: {str(e)}'
+        }, status=500)
+
+
+verify_backup.permission_codename = "backup.ver"
+
+
+def _restaurar_ndjson(filename, confirmar):
+    try:
+        manifiestos = motor.cadena(filename)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    cadena = [
+        {'nombre': m['nombre'], 'tipo': m['tipo'], 'creado_en': m['creado_en'], 'filas': m['filas']}
+        for m in manifiestos
+    ]
+    if not confirmar:
+        return JsonResponse({
+            'status': 'success',
+            'message': f'La restauración aplicaría {len(cadena)} backup(s)',
+            'filename': filename,
+            'cadena': cadena,
+            'nota': 'Envía "confirmar": true para reemplazar los datos actuales por los del backup.'
+        })
+
+    print(f"🔄 Restaurando {filename} ({len(cadena)} backups en la cadena)")
+    estadisticas = RestauradorBackup.restaurar(filename)
+    print(f"✅ Restauración completada: {estadisticas['filas']} filas en {estadisticas['duracion']}s "
+          f"({estadisticas['filas_por_segundo']} filas/s)")
+    return JsonResponse({
+        'status': 'success',
+        'message': f'Backup {filename} restaurado',
+        'filename': filename,
+        'cadena': cadena,
+        'stats': {etiqueta: datos['filas'] for etiqueta, datos in estadisticas['secciones'].items()},
+        'filas': estadisticas['filas'],
+        'eliminados': estadisticas['eliminados'],
+        'duracion': estadisticas['duracion'],
+        'filas_por_segundo': estadisticas['filas_por_segundo']
+    })
+
+
 # apps/backup/views.py - AGREGAR ESTA FUNCIÓN
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, HasPermission])
 def restore_backup(request):
-    """Restaurar base de datos desde un backup - Requiere backup.restaurar"""
+    """
+    Restaurar base de datos desde un backup - Requiere backup.restaurar
+    Body: {"filename": "...", "confirmar": true}. Sin confirmar solo muestra la
+    cadena (base + incrementales) que se aplicaría. Los .json antiguos solo se analizan.
+    """
     try:
         filename = request.data.get('filename')
 
@@ -300,15 +315,17 @@ def restore_backup(request):
                 'message': 'Nombre de archivo requerido'
             }, status=400)
 
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        file_path = os.path.join(backup_dir, filename)
+        file_path = motor.ruta_backup(filename)
 
-        if not os.path.exists(file_path) or not filename.startswith('backup_habita_'):
+        if not motor.es_nombre_valido(filename) or not os.path.exists(file_path):
             return JsonResponse({
                 'status': 'error',
                 'message': 'Archivo de backup no encontrado o inválido'
             }, status=404)
 
+        if filename.endswith(motor.EXTENSION):
+            return _restaurar_ndjson(filename, request.data.get('confirmar') in (True, 'true', '1'))
+
         print(f"🔄 Iniciando restauración desde: {filename}")
 
         # Leer el archivo de backup
@@ -0,0 +1,150 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Bitacora
+
+logger = logging.getLogger(__name__)
+
+
+class BufferBitacora:
+    """
+    Cola en memoria para la bitácora. El middleware solo encola; un hilo en
+    segundo plano escribe con bulk_create cuando se juntan BITACORA_LOTE
+    registros o pasan BITACORA_FLUSH_SEGUNDOS. La cola es acotada: si se llena
+    (base caída o lenta) los registros nuevos se descartan y se cuentan.
+    Al terminar el proceso se vacía lo pendiente (atexit).
+    """
+
+    ESPERA_MAXIMA = 0.5  # segundos
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._cola = None
+        self._hilo = None
+        self._detener = threading.Event()
+        self._metricas = {'encoladas': 0, 'escritas': 0, 'descartadas': 0, 'fallidas': 0, 'lotes': 0}
+        atexit.register(self.detener)
+
+    # ---------- configuración ----------
+
+    @staticmethod
+    def max_pendientes() -> int:
+        return getattr(settings, 'BITACORA_BUFFER_MAX', 10000)
+
+    @staticmethod
+    def tamano_lote() -> int:
+        return getattr(settings, 'BITACORA_LOTE', 200)
+
+    @staticmethod
+    def intervalo() -> float:
+        return getattr(settings, 'BITACORA_FLUSH_SEGUNDOS', 2.0)
+
+    # ---------- productor ----------
+
+    def encolar(self, registro: Dict):
+        """registro: kwargs de Bitacora (usuario_id, accion, modulo, ...)"""
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            with self._lock:
+                self._metricas['descartadas'] += 1
+                descartadas = self._metricas['descartadas']
+            if descartadas == 1 or descartadas % 1000 == 0:
+                logger.warning(f"⚠️ Bitácora: cola llena, {descartadas} registros descartados")
+            return
+        with self._lock:
+            self._metricas['encoladas'] += 1
+
+    def _asegurar_hilo(self):
+        # Con gunicorn --preload el proceso hijo hereda el objeto pero no el hilo
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._cola = queue.Queue(maxsize=self.max_pendientes())
+                self._hilo = None
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._ejecutar, name='bitacora-flush', daemon=True)
+                self._hilo.start()
+
+    # ---------- consumidor ----------
+
+    def _ejecutar(self):
+        lote: List[Dict] = []
+        limite = None
+        while not self._detener.is_set():
+            espera = self.intervalo() if limite is None else max(limite - time.monotonic(), 0)
+            try:
+                # Espera corta para notar detener() sin perder el lote en curso
+                lote.append(self._cola.get(timeout=min(espera, self.ESPERA_MAXIMA)))
+                if limite is None:
+                    limite = time.monotonic() + self.intervalo()
+            except queue.Empty:
+                pass
+
+            if lote and (len(lote) >= self.tamano_lote() or time.monotonic() >= limite):
+                self._escribir(lote)
+                lote, limite = [], None
+
+        if lote:
+            self._escribir(lote)
+        close_old_connections()
+
+    def _escribir(self, lote: List[Dict]):
+        try:
+            close_old_connections()
+            Bitacora.objects.bulk_create([Bitacora(**registro) for registro in lote], batch_size=500)
+            with self._lock:
+                self._metricas['escritas'] += len(lote)
+                self._metricas['lotes'] += 1
+        except Exception:
+            with self._lock:
+                self._metricas['fallidas'] += len(lote)
+            logger.exception(f"❌ Bitácora: no se pudieron guardar {len(lote)} registros")
+
+    # ---------- control ----------
+
+    def vaciar(self):
+        """Escribe lo pendiente en el hilo actual (tests, comandos, apagado)"""
+        if self._cola is None or self._pid != os.getpid():
+            return
+        lote = []
+        while True:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+            if len(lote) >= self.tamano_lote():
+                self._escribir(lote)
+                lote = []
+        if lote:
+            self._escribir(lote)
+
+    def detener(self, timeout: float = 5.0):
+        self._detener.set()
+        if self._hilo is not None and self._pid == os.getpid():
+            self._hilo.join(timeout)
+        self.vaciar()
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                **self._metricas,
+                'pendientes': self._cola.qsize() if self._cola is not None else 0,
+                'max_pendientes': self.max_pendientes(),
+            }
+
+
+buffer_bitacora = BufferBitacora()
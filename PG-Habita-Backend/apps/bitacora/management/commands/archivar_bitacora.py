@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.bitacora.models import Bitacora
+
+CAMPOS_ARCHIVO = (
+    'id', 'usuario_id', 'usuario__username', 'accion', 'modulo',
+    'detalles', 'ip_address', 'user_agent', 'creado_en',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve a un archivo .ndjson.gz los registros de bitácora más antiguos que '
+        'la retención (BITACORA_RETENCION_DIAS) y los borra de la tabla. '
+        'Solo borra después de cerrar el archivo completo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Días a conservar (por defecto BITACORA_RETENCION_DIAS)')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Registros leídos/borrados por consulta')
+        parser.add_argument('--destino', default=None,
+                            help='Carpeta de los archivos (por defecto BITACORA_DIR_ARCHIVO)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo cuenta lo que se archivaría')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else settings.BITACORA_RETENCION_DIAS
+        corte = timezone.now() - timedelta(days=dias)
+        antiguos = Bitacora.objects.filter(creado_en__lt=corte)
+
+        if options['dry_run']:
+            self.stdout.write(f'🔎 Registros anteriores a {corte:%Y-%m-%d %H:%M}: {antiguos.count()}')
+            return
+
+        destino = options['destino'] or settings.BITACORA_DIR_ARCHIVO
+        os.makedirs(destino, exist_ok=True)
+        nombre = f"bitacora_hasta_{corte:%Y%m%d}_{timezone.now():%Y%m%d%H%M%S}.ndjson.gz"
+        ruta = os.path.join(destino, nombre)
+        temporal = ruta + '.parcial'
+
+        inicio = time.monotonic()
+        ultimo_id = 0
+        archivados = 0
+        with gzip.open(temporal, 'wt', encoding='utf-8') as archivo:
+            while True:
+                # Recorrido por id: no depende de OFFSET ni de ordenar por fecha
+                lote = list(
+                    antiguos.filter(id__gt=ultimo_id).order_by('id').values(*CAMPOS_ARCHIVO)[:options['lote']]
+                )
+                if not lote:
+                    break
+                for registro in lote:
+                    registro['usuario'] = registro.pop('usuario__username')
+                    archivo.write(json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False))
+                    archivo.write('\n')
+                ultimo_id = lote[-1]['id']
+                archivados += len(lote)
+
+        if not archivados:
+            os.remove(temporal)
+            self.stdout.write(self.style.SUCCESS(f'✅ Nada que archivar (anteriores a {corte:%Y-%m-%d})'))
+            return
+        os.replace(temporal, ruta)
+
+        # Solo lo que quedó en el archivo: mismo filtro acotado al último id escrito
+        borrados = 0
+        while True:
+            ids = list(
+                antiguos.filter(id__lte=ultimo_id).order_by('id').values_list('id', flat=True)[:options['lote']]
+            )
+            if not ids:
+                break
+            borrados += Bitacora.objects.filter(id__in=ids).delete()[0]
+
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {archivados} registros archivados en {ruta} '
+            f'({os.path.getsize(ruta) / 1024:.1f} KB), {borrados} borrados en {duracion:.1f}s'
+        ))
+        if borrados != archivados:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ Se borraron {borrados} de {archivados} registros archivados'
+            ))
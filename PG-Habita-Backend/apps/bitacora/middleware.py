@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.utils import timezone
+
+from .buffer import buffer_bitacora
 from .models import Bitacora
 
 class BitacoraMiddleware:
@@ -14,8 +18,9 @@ class BitacoraMiddleware:
         try:
             accion = self.determinar_accion(request)
             if accion:
-                Bitacora.objects.create(
-                    usuario=request.user,
+                registro = dict(
+                    usuario_id=request.user.pk,
+                    usuario_texto=Bitacora.texto_de_usuario(request.user),
                     accion=accion['accion'],
                     modulo=accion['modulo'],
                     detalles={
@@ -25,8 +30,14 @@ class BitacoraMiddleware:
                         'params': dict(request.GET) if request.method == 'GET' else {}
                     },
                     ip_address=self.get_client_ip(request),
-                    user_agent=request.META.get('HTTP_USER_AGENT', '')
+                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                    # Hora de la petición, no la de la escritura del lote
+                    creado_en=timezone.now()
                 )
+                if getattr(settings, 'BITACORA_ASINCRONA', True):
+                    buffer_bitacora.encolar(registro)
+                else:
+                    Bitacora.objects.create(**registro)
         except Exception:
             pass
 
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bitacora', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bitacora',
+            name='creado_en',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
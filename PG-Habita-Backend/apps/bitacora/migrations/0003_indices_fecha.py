@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bitacora', '0002_creado_en_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=models.Index(fields=['usuario', '-creado_en', '-id'], name='bitacora_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=models.Index(fields=['-creado_en', '-id'], name='bitacora_fecha_idx'),
+        ),
+    ]
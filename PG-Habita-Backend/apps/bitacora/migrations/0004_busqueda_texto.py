@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.fields.json
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import CharField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Trim
+
+
+def copiar_usuario_texto(apps, schema_editor):
+    Bitacora = apps.get_model('bitacora', 'Bitacora')
+    CustomUser = apps.get_model('usuarios', 'CustomUser')
+    texto = CustomUser.objects.filter(pk=OuterRef('usuario_id')).annotate(
+        texto=Trim(Concat(F('username'), Value(' '), F('first_name'), Value(' '), F('last_name'),
+                          output_field=CharField()))
+    ).values('texto')[:1]
+    Bitacora.objects.update(usuario_texto=Subquery(texto))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bitacora', '0003_indices_fecha'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bitacora',
+            name='usuario_texto',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.RunPython(copiar_usuario_texto, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='bitacora',
+            name='texto_busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('accion', config='spanish', weight='A'), '||', django.contrib.postgres.search.SearchVector('modulo', 'usuario_texto', config='spanish', weight='B'), django.contrib.postgres.search.SearchConfig('spanish')), '||', django.contrib.postgres.search.SearchVector(django.db.models.functions.text.Replace(django.db.models.fields.json.KeyTextTransform('path', 'detalles'), models.Value('/'), models.Value(' '), output_field=models.TextField()), config='spanish', weight='C'), django.contrib.postgres.search.SearchConfig('spanish')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['texto_busqueda'], name='bitacora_busqueda_gin'),
+        ),
+    ]
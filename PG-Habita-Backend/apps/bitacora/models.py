@@ -1,4 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Replace
+from django.utils import timezone
 from apps.usuarios.models import CustomUser
 
 
@@ -9,11 +15,37 @@ class Bitacora(models.Model):
     detalles = models.JSONField(default=dict)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    creado_en = models.DateTimeField(auto_now_add=True)
+    # default en vez de auto_now_add: bulk_create sobrescribiría la hora de la petición
+    creado_en = models.DateTimeField(default=timezone.now, editable=False)
+    # Copia de username y nombre al registrar: la búsqueda no necesita el JOIN a usuarios
+    usuario_texto = models.CharField(max_length=300, blank=True, default='')
+    # Columna generada por PostgreSQL (también en bulk_create); la ruta se parte
+    # por '/' para que '/api/reservas/12/' se indexe como palabras
+    texto_busqueda = models.GeneratedField(
+        expression=(
+            SearchVector('accion', weight='A', config='spanish') +
+            SearchVector('modulo', 'usuario_texto', weight='B', config='spanish') +
+            SearchVector(Replace(KeyTextTransform('path', 'detalles'), Value('/'), Value(' '), output_field=models.TextField()),
+                         weight='C', config='spanish')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = 'bitacora'
         ordering = ['-creado_en']
+        indexes = [
+            # Listado por usuario y paginación por cursor (creado_en, id)
+            models.Index(fields=['usuario', '-creado_en', '-id'], name='bitacora_usuario_fecha_idx'),
+            models.Index(fields=['-creado_en', '-id'], name='bitacora_fecha_idx'),
+            GinIndex(fields=['texto_busqueda'], name='bitacora_busqueda_gin'),
+        ]
+
+    @staticmethod
+    def texto_de_usuario(usuario) -> str:
+        nombre = f"{usuario.first_name} {usuario.last_name}".strip()
+        return f"{usuario.username} {nombre}".strip()
 
     def __str__(self):
         return f"{self.usuario.username} - {self.accion} - {self.creado_en}"
\ No newline at end of file
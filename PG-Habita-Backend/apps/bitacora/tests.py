@@ -1,3 +1,117 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.reservas.tests import crear_usuario
+from .buffer import BufferBitacora
+from .models import Bitacora
+
+
+def registro(n: int = 0) -> dict:
+    return {'usuario_id': 1, 'accion': f'Acción {n}', 'modulo': 'Pruebas'}
+
+
+class BufferDePrueba(BufferBitacora):
+    """Guarda los lotes en memoria en lugar de escribirlos en la base"""
+
+    def __init__(self):
+        super().__init__()
+        self.lotes = []
+        self.escrito = threading.Event()
+
+    def _escribir(self, lote):
+        self.lotes.append(list(lote))
+        self.escrito.set()
+
+    def registros(self):
+        return [r for lote in self.lotes for r in lote]
+
+
+class BufferBitacoraTest(SimpleTestCase):
+
+    def crear_buffer(self, clase=BufferDePrueba):
+        buffer = clase()
+        self.addCleanup(buffer.detener)
+        return buffer
+
+    @override_settings(BITACORA_LOTE=3, BITACORA_FLUSH_SEGUNDOS=60)
+    def test_escribe_al_completar_el_lote(self):
+        buffer = self.crear_buffer()
+        for n in range(3):
+            buffer.encolar(registro(n))
+
+        self.assertTrue(buffer.escrito.wait(2))
+        self.assertEqual(buffer.lotes, [[registro(0), registro(1), registro(2)]])
+
+    @override_settings(BITACORA_LOTE=100, BITACORA_FLUSH_SEGUNDOS=0.2)
+    def test_escribe_al_pasar_el_intervalo(self):
+        buffer = self.crear_buffer()
+        inicio = time.monotonic()
+        buffer.encolar(registro())
+
+        self.assertTrue(buffer.escrito.wait(2))
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+        self.assertEqual(buffer.lotes, [[registro()]])
+
+    @override_settings(BITACORA_LOTE=1, BITACORA_FLUSH_SEGUNDOS=60, BITACORA_BUFFER_MAX=2)
+    def test_cola_llena_descarta_y_cuenta(self):
+        escribiendo, continuar = threading.Event(), threading.Event()
+
+        class BufferLento(BufferDePrueba):
+            # La base no responde: el hilo queda dentro de _escribir
+            def _escribir(self, lote):
+                escribiendo.set()
+                continuar.wait(5)
+                super()._escribir(lote)
+
+        buffer = self.crear_buffer(BufferLento)
+        self.addCleanup(continuar.set)
+        buffer.encolar(registro(0))
+        self.assertTrue(escribiendo.wait(2))
+        for n in range(1, 5):
+            buffer.encolar(registro(n))
+
+        estadisticas = buffer.estadisticas()
+        self.assertEqual((estadisticas['encoladas'], estadisticas['descartadas']), (3, 2))
+        self.assertEqual(estadisticas['pendientes'], 2)
+
+        continuar.set()
+        buffer.detener()
+        self.assertEqual(buffer.registros(), [registro(0), registro(1), registro(2)])
+
+    @override_settings(BITACORA_LOTE=100, BITACORA_FLUSH_SEGUNDOS=60)
+    def test_detener_escribe_lo_pendiente(self):
+        buffer = self.crear_buffer()
+        for n in range(5):
+            buffer.encolar(registro(n))
+
+        buffer.detener()
+
+        self.assertEqual(buffer.registros(), [registro(n) for n in range(5)])
+        self.assertEqual(buffer.estadisticas()['pendientes'], 0)
+
+
+# Sin hilo: vaciar() escribe en el hilo (y la transacción) del test. close_old_connections
+# cerraría la conexión dentro de la transacción del TestCase.
+@mock.patch('apps.bitacora.buffer.close_old_connections')
+@mock.patch('apps.bitacora.buffer.threading.Thread')
+class BufferBitacoraEscrituraTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario('usuario_bitacora')
+
+    def test_vaciar_guarda_con_la_hora_de_la_peticion(self, *mocks):
+        buffer = BufferBitacora()
+        peticion = timezone.now() - timedelta(hours=1)
+        buffer.encolar({**registro(), 'usuario_id': self.usuario.pk, 'creado_en': peticion})
+
+        buffer.vaciar()
+
+        bitacora = Bitacora.objects.get(usuario=self.usuario)
+        self.assertEqual(bitacora.creado_en, peticion)
+        self.assertEqual(buffer.estadisticas()['escritas'], 1)
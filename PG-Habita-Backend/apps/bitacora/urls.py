@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.listar_bitacora, name='listar_bitacora'),
+    path('buscar/', views.buscar_bitacora, name='buscar_bitacora'),
+    path('buffer/', views.estado_buffer_bitacora, name='estado_buffer_bitacora'),
 ]
\ No newline at end of file
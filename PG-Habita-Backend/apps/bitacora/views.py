@@ -1,43 +1,131 @@
-from django.db.models import Q
+import base64
+import re
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
 from django.http import JsonResponse
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from apps.permisos.permissions import HasPermission
+from .buffer import buffer_bitacora
 from .models import Bitacora
 from apps.usuarios.models import CustomUser
 
+def _bitacora_a_dict(bitacora):
+    return {
+        'id': bitacora.id,
+        'usuario': {
+            'id': bitacora.usuario.id,
+            'username': bitacora.usuario.username,
+            'nombre_completo': f"{bitacora.usuario.first_name} {bitacora.usuario.last_name}".strip() or bitacora.usuario.username
+        },
+        'accion': bitacora.accion,
+        'modulo': bitacora.modulo,
+        'detalles': bitacora.detalles,
+        'ip_address': bitacora.ip_address,
+        'user_agent': bitacora.user_agent,
+        'creado_en': bitacora.creado_en.isoformat()
+    }
+
+
+def _inicio_del_dia(dia):
+    """00:00 del día en la zona horaria actual (rango sobre creado_en, que usa los índices)"""
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _bitacoras_filtradas(request):
+    """Bitácora visible para el usuario con los filtros modulo, usuario_id, desde y hasta"""
+    user = request.user
+    queryset = Bitacora.objects.all() if user.is_superuser else Bitacora.objects.filter(usuario=user)
+    queryset = queryset.defer('texto_busqueda')
+    if request.GET.get('modulo'):
+        queryset = queryset.filter(modulo=request.GET['modulo'])
+    if request.GET.get('usuario_id') and user.is_superuser:
+        queryset = queryset.filter(usuario_id=int(request.GET['usuario_id']))
+    if request.GET.get('desde'):
+        queryset = queryset.filter(creado_en__gte=_inicio_del_dia(date.fromisoformat(request.GET['desde'])))
+    if request.GET.get('hasta'):
+        dia_siguiente = date.fromisoformat(request.GET['hasta']) + timedelta(days=1)
+        queryset = queryset.filter(creado_en__lt=_inicio_del_dia(dia_siguiente))
+    return queryset
+
+
+def _consulta_texto(texto):
+    """
+    Convierte lo que escribe el usuario en un tsquery por prefijos
+    ('reserv juan' -> 'reserv:* & juan:*') para buscar mientras se escribe.
+    Retorna None si no hay palabras.
+    """
+    palabras = re.findall(r'\w+', texto.lower())[:10]
+    if not palabras:
+        return None
+    return SearchQuery(' & '.join(f"{p}:*" for p in palabras), search_type='raw', config='spanish')
+
+
+def _codificar_cursor(bitacora):
+    valor = f"{bitacora.creado_en.isoformat()}|{bitacora.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def _decodificar_cursor(cursor):
+    """Retorna (creado_en, id) o None si el cursor no es válido"""
+    try:
+        fecha, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        creado_en = datetime.fromisoformat(fecha)
+        return creado_en, int(id_)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, HasPermission])
 def listar_bitacora(request):
+    """
+    Dos modos de paginación:
+    - ?page=N: por páginas con total (count() + OFFSET, se vuelve lento con tablas grandes)
+    - ?cursor=: por cursor sobre (creado_en, id) sin count(); la respuesta trae
+      'siguiente_cursor' para pedir la página siguiente (vacío = primera página)
+    'search' usa el índice de texto completo (palabras por prefijo, no subcadenas).
+    """
     try:
         user = request.user
         search = request.GET.get('search', '')
         page = int(request.GET.get('page', 1))
-        page_size = 20
-        queryset = Bitacora.objects.all() if user.is_superuser else Bitacora.objects.filter(usuario=user)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+        queryset = _bitacoras_filtradas(request)
         if search:
-            queryset = queryset.filter(Q(usuario__username__icontains=search) | Q(accion__icontains=search) | Q(modulo__icontains=search))
-        total = queryset.count()
-        bitacoras = queryset.select_related('usuario')[(page - 1) * page_size: page * page_size]
-        datos_bitacora = []
-        for bitacora in bitacoras:
-            datos_bitacora.append({
-                'id': bitacora.id,
-                'usuario': {
-                    'id': bitacora.usuario.id,
-                    'username': bitacora.usuario.username,
-                    'nombre_completo': f"{bitacora.usuario.first_name} {bitacora.usuario.last_name}".strip() or bitacora.usuario.username
-                },
-                'accion': bitacora.accion,
-                'modulo': bitacora.modulo,
-                'detalles': bitacora.detalles,
-                'ip_address': bitacora.ip_address,
-                'user_agent': bitacora.user_agent,
-                'creado_en': bitacora.creado_en.isoformat()
+            consulta = _consulta_texto(search)
+            if consulta is None:
+                queryset = queryset.none()
+            else:
+                queryset = queryset.filter(texto_busqueda=consulta)
+
+        if 'cursor' in request.GET:
+            cursor = request.GET['cursor']
+            if cursor:
+                posicion = _decodificar_cursor(cursor)
+                if posicion is None:
+                    return JsonResponse({'status': 'error', 'message': 'Cursor inválido'}, status=400)
+                creado_en, id_ = posicion
+                queryset = queryset.filter(Q(creado_en__lt=creado_en) | Q(creado_en=creado_en, id__lt=id_))
+            # Una fila extra para saber si hay página siguiente sin contar
+            bitacoras = list(queryset.select_related('usuario').order_by('-creado_en', '-id')[:page_size + 1])
+            hay_mas = len(bitacoras) > page_size
+            bitacoras = bitacoras[:page_size]
+            return JsonResponse({
+                'status': 'success',
+                'bitacoras': [_bitacora_a_dict(b) for b in bitacoras],
+                'hay_mas': hay_mas,
+                'siguiente_cursor': _codificar_cursor(bitacoras[-1]) if hay_mas else None
             })
+
+        total = queryset.count()
+        bitacoras = queryset.select_related('usuario').order_by('-creado_en', '-id')[(page - 1) * page_size: page * page_size]
         return JsonResponse({
             'status': 'success',
-            'bitacoras': datos_bitacora,
+            'bitacoras': [_bitacora_a_dict(b) for b in bitacoras],
             'total': total,
             'pagina': page,
             'total_paginas': (total + page_size - 1) // page_size
@@ -45,4 +133,52 @@ def listar_bitacora(request):
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': f'Error obteniendo bitácora: {str(e)}'}, status=500)
 
-listar_bitacora.permission_codename = "bitacora.ver"
\ No newline at end of file
+listar_bitacora.permission_codename = "bitacora.ver"
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, HasPermission])
+def buscar_bitacora(request):
+    """
+    Búsqueda de texto completo ordenada por relevancia (acción > módulo/usuario > ruta).
+    Parámetros: q (requerido), desde/hasta (YYYY-MM-DD), modulo, usuario_id, page, page_size.
+    No cuenta el total: 'hay_mas' indica si existe otra página.
+    """
+    try:
+        consulta = _consulta_texto(request.GET.get('q', ''))
+        if consulta is None:
+            return JsonResponse({'status': 'error', 'message': 'El parámetro q es requerido'}, status=400)
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+
+        queryset = _bitacoras_filtradas(request).filter(texto_busqueda=consulta).annotate(
+            relevancia=SearchRank(F('texto_busqueda'), consulta)
+        ).select_related('usuario').order_by('-relevancia', '-creado_en', '-id')
+        bitacoras = list(queryset[(page - 1) * page_size: page * page_size + 1])
+        hay_mas = len(bitacoras) > page_size
+
+        resultados = []
+        for bitacora in bitacoras[:page_size]:
+            datos = _bitacora_a_dict(bitacora)
+            datos['relevancia'] = round(bitacora.relevancia, 4)
+            resultados.append(datos)
+        return JsonResponse({
+            'status': 'success',
+            'bitacoras': resultados,
+            'pagina': page,
+            'hay_mas': hay_mas
+        })
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': f'Parámetro inválido: {str(e)}'}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': f'Error buscando en bitácora: {str(e)}'}, status=500)
+
+buscar_bitacora.permission_codename = "bitacora.ver"
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, HasPermission])
+def estado_buffer_bitacora(request):
+    """Métricas del buffer de este proceso (pendientes, escritas, descartadas)"""
+    return JsonResponse({'status': 'success', 'buffer': buffer_bitacora.estadisticas()})
+
+estado_buffer_bitacora.permission_codename = "bitacora.ver"
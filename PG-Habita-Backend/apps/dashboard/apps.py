@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'dashboard'
+    name = 'apps.dashboard'
+
+    def ready(self):
+        import apps.dashboard.signals
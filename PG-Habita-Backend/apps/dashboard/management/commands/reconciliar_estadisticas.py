@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.services import CLAVE_GLOBAL, EstadisticasService, clave_usuario
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard desde las tablas (corrige desvíos de los incrementales)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, action='append', dest='usuarios',
+                            help='ID de usuario a reconciliar (se puede repetir)')
+        parser.add_argument('--global', action='store_true', dest='solo_global',
+                            help='Reconciliar solo la fila global')
+        parser.add_argument('--cada', type=int, default=None,
+                            help='Repetir cada N segundos (modo periódico)')
+
+    def handle(self, *args, **options):
+        claves = None
+        if options['usuarios'] or options['solo_global']:
+            claves = [clave_usuario(u) for u in options['usuarios'] or []]
+            if options['solo_global']:
+                claves.append(CLAVE_GLOBAL)
+
+        while True:
+            inicio = time.monotonic()
+            filas = EstadisticasService.reconciliar(claves)
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Estadísticas reconciliadas: {filas} filas en {time.monotonic() - inicio:.2f}s'
+            ))
+            if not options['cada']:
+                break
+            time.sleep(options['cada'])
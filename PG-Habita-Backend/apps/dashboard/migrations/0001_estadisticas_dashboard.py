@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=50, unique=True)),
+                ('propiedades_activas', models.IntegerField(default=0)),
+                ('reservas_total', models.IntegerField(default=0)),
+                ('reservas_por_estado', models.JSONField(default=dict)),
+                ('ingresos_totales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('notificaciones_no_leidas', models.IntegerField(default=0)),
+                ('notificaciones_por_dia', models.JSONField(default=dict)),
+                ('reservas_por_checkin', models.JSONField(default=dict)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'estadisticas_dashboard',
+            },
+        ),
+    ]
@@ -1,3 +1,25 @@
 from django.db import models
 
-# Create your models here.
+
+class EstadisticaDashboard(models.Model):
+    """
+    Contadores precalculados del dashboard. Una fila 'global' y una por
+    usuario ('usuario:<id>'); se actualizan desde signals y se recalculan
+    con el comando reconciliar_estadisticas.
+    """
+    clave = models.CharField(max_length=50, unique=True)
+    propiedades_activas = models.IntegerField(default=0)
+    reservas_total = models.IntegerField(default=0)
+    reservas_por_estado = models.JSONField(default=dict)
+    ingresos_totales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    notificaciones_no_leidas = models.IntegerField(default=0)
+    # {'YYYY-MM-DD': cantidad} para la actividad reciente
+    notificaciones_por_dia = models.JSONField(default=dict)
+    reservas_por_checkin = models.JSONField(default=dict)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'estadisticas_dashboard'
+
+    def __str__(self):
+        return f"Estadísticas {self.clave}"
@@ -0,0 +1,328 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.notificaciones.models import Notificacion
+from apps.propiedades.models import Propiedades
+from apps.reservas.models import Reservas
+from .models import EstadisticaDashboard
+
+CLAVE_GLOBAL = 'global'
+# Los deltas globales van a fragmentos 'global:<n>' elegidos al azar: con una
+# sola fila, cada reserva o notificación del sistema esperaría el mismo bloqueo.
+# La fila 'global' guarda la base que escribe la reconciliación; el valor
+# global es la base más la suma de los fragmentos.
+PREFIJO_FRAGMENTO = f'{CLAVE_GLOBAL}:'
+
+# Días de actividad que se conservan en los mapas por día
+DIAS_HISTORIAL = 30
+
+CAMPOS_MAPA = ('reservas_por_estado', 'notificaciones_por_dia', 'reservas_por_checkin')
+CAMPOS_CONTADOR = (
+    'propiedades_activas', 'reservas_total', 'reservas_por_estado', 'ingresos_totales',
+    'notificaciones_no_leidas', 'notificaciones_por_dia', 'reservas_por_checkin',
+)
+
+
+def clave_usuario(usuario_id) -> str:
+    return f'usuario:{usuario_id}'
+
+
+def es_fragmento(clave: str) -> bool:
+    return clave.startswith(PREFIJO_FRAGMENTO)
+
+
+def _dia(valor) -> str:
+    if hasattr(valor, 'hour'):
+        valor = timezone.localdate(valor)
+    return valor.isoformat()
+
+
+class EstadisticasService:
+    """
+    Contadores incrementales del dashboard. Cada cambio se traduce en deltas
+    por clave ('global' y 'usuario:<id>') que se aplican con la fila bloqueada,
+    en la misma transacción que el cambio que los origina. Los deltas de
+    'global' se reparten entre fragmentos (ver PREFIJO_FRAGMENTO).
+    """
+
+    # ---------- deltas ----------
+
+    @staticmethod
+    def _sumar(deltas: Dict, clave: str, campo: str, valor, subclave: Optional[str] = None):
+        destino = deltas.setdefault(clave, {})
+        if subclave is None:
+            destino[campo] = destino.get(campo, 0) + valor
+        else:
+            mapa = destino.setdefault(campo, {})
+            mapa[subclave] = mapa.get(subclave, 0) + valor
+
+    @staticmethod
+    def deltas_reserva(valores: Optional[Dict], signo: int, deltas: Optional[Dict] = None) -> Dict:
+        """valores: user_id, status, pago_estado, monto_total, fecha_checkin"""
+        deltas = {} if deltas is None else deltas
+        if not valores:
+            return deltas
+        for clave in (CLAVE_GLOBAL, clave_usuario(valores['user_id'])):
+            EstadisticasService._sumar(deltas, clave, 'reservas_total', signo)
+            EstadisticasService._sumar(deltas, clave, 'reservas_por_estado', signo, valores['status'])
+            if valores['fecha_checkin']:
+                EstadisticasService._sumar(deltas, clave, 'reservas_por_checkin', signo, _dia(valores['fecha_checkin']))
+            if valores['pago_estado'] == 'pagado':
+                EstadisticasService._sumar(deltas, clave, 'ingresos_totales', signo * Decimal(valores['monto_total'] or 0))
+        return deltas
+
+    @staticmethod
+    def deltas_propiedad(valores: Optional[Dict], signo: int, deltas: Optional[Dict] = None) -> Dict:
+        """valores: user_id, status"""
+        deltas = {} if deltas is None else deltas
+        if valores and valores['status']:
+            for clave in (CLAVE_GLOBAL, clave_usuario(valores['user_id'])):
+                EstadisticasService._sumar(deltas, clave, 'propiedades_activas', signo)
+        return deltas
+
+    @staticmethod
+    def deltas_notificacion(valores: Optional[Dict], signo: int, deltas: Optional[Dict] = None,
+                            contar_dia: bool = True) -> Dict:
+        """valores: usuario_id, leida, creado_en"""
+        deltas = {} if deltas is None else deltas
+        if not valores:
+            return deltas
+        usuario = clave_usuario(valores['usuario_id'])
+        if not valores['leida']:
+            EstadisticasService._sumar(deltas, usuario, 'notificaciones_no_leidas', signo)
+        if contar_dia and valores['creado_en']:
+            for clave in (CLAVE_GLOBAL, usuario):
+                EstadisticasService._sumar(deltas, clave, 'notificaciones_por_dia', signo, _dia(valores['creado_en']))
+        return deltas
+
+    # ---------- aplicación ----------
+
+    @staticmethod
+    def aplicar(deltas: Dict):
+        if not deltas:
+            return
+        limite = (timezone.localdate() - timedelta(days=DIAS_HISTORIAL)).isoformat()
+        if CLAVE_GLOBAL in deltas:
+            deltas = dict(deltas)
+            fragmentos = getattr(settings, 'DASHBOARD_FRAGMENTOS_GLOBAL', 8)
+            deltas[f'{PREFIJO_FRAGMENTO}{random.randrange(fragmentos)}'] = deltas.pop(CLAVE_GLOBAL)
+
+        with transaction.atomic():
+            existentes = set(EstadisticaDashboard.objects.filter(clave__in=deltas).values_list('clave', flat=True))
+            faltantes = [c for c in deltas if c not in existentes]
+
+            # Un fragmento nuevo empieza en cero: el total está en la fila base
+            nuevos_fragmentos = [c for c in faltantes if es_fragmento(c)]
+            if nuevos_fragmentos:
+                EstadisticaDashboard.objects.bulk_create(
+                    [EstadisticaDashboard(clave=c) for c in nuevos_fragmentos], ignore_conflicts=True
+                )
+                existentes.update(nuevos_fragmentos)
+                faltantes = [c for c in faltantes if not es_fragmento(c)]
+
+            # Una clave sin fila se calcula completa; como los signals corren
+            # después de escribir, el cálculo ya incluye este cambio
+            if faltantes:
+                try:
+                    EstadisticasService.reconciliar(faltantes)
+                    deltas = {c: v for c, v in deltas.items() if c in existentes}
+                except IntegrityError:
+                    # Otra transacción creó la fila (sin este cambio): aplicar el delta
+                    pass
+
+            # Todas las filas en una consulta, bloqueadas en orden fijo para no
+            # generar deadlocks entre transacciones (un envío masivo toca miles)
+            filas = list(
+                EstadisticaDashboard.objects.select_for_update().filter(clave__in=deltas).order_by('clave')
+            )
+            campos = {'actualizado_en'}
+            ahora = timezone.now()
+            for fila in filas:
+                for campo, valor in deltas[fila.clave].items():
+                    campos.add(campo)
+                    if campo in CAMPOS_MAPA:
+                        mapa = getattr(fila, campo)
+                        for subclave, cantidad in valor.items():
+                            mapa[subclave] = mapa.get(subclave, 0) + cantidad
+                            if not mapa[subclave]:
+                                del mapa[subclave]
+                    else:
+                        setattr(fila, campo, getattr(fila, campo) + valor)
+
+                # Descartar días que ya no entran en la actividad reciente
+                for campo in ('notificaciones_por_dia', 'reservas_por_checkin'):
+                    setattr(fila, campo, {d: n for d, n in getattr(fila, campo).items() if d >= limite})
+                # bulk_update no aplica auto_now
+                fila.actualizado_en = ahora
+
+            campos.update(('notificaciones_por_dia', 'reservas_por_checkin'))
+            EstadisticaDashboard.objects.bulk_update(filas, sorted(campos), batch_size=500)
+
+    # ---------- lectura ----------
+
+    @staticmethod
+    def obtener(claves) -> Dict[str, EstadisticaDashboard]:
+        """
+        Filas de las claves pedidas; las que falten se calculan en el momento.
+        La de 'global' es la base más sus fragmentos (una instancia sin guardar).
+        """
+        claves = list(claves)
+        filtro = Q(clave__in=claves)
+        if CLAVE_GLOBAL in claves:
+            filtro |= Q(clave__startswith=PREFIJO_FRAGMENTO)
+        filas = {f.clave: f for f in EstadisticaDashboard.objects.filter(filtro)}
+        faltantes = [c for c in claves if c not in filas]
+        if faltantes:
+            try:
+                EstadisticasService.reconciliar(faltantes)
+            except IntegrityError:
+                # Otra petición la creó al mismo tiempo
+                pass
+            filtro = Q(clave__in=faltantes)
+            if CLAVE_GLOBAL in faltantes:
+                # La reconciliación de la base también puso los fragmentos en cero
+                filtro |= Q(clave__startswith=PREFIJO_FRAGMENTO)
+            filas.update({f.clave: f for f in EstadisticaDashboard.objects.filter(filtro)})
+
+        fragmentos = [filas.pop(c) for c in list(filas) if es_fragmento(c)]
+        if CLAVE_GLOBAL in filas and fragmentos:
+            filas[CLAVE_GLOBAL] = EstadisticasService._combinar(filas[CLAVE_GLOBAL], fragmentos)
+        return filas
+
+    @staticmethod
+    def _combinar(base: EstadisticaDashboard, fragmentos) -> EstadisticaDashboard:
+        total = EstadisticaDashboard(clave=base.clave, actualizado_en=base.actualizado_en)
+        for campo in CAMPOS_CONTADOR:
+            setattr(total, campo, dict(getattr(base, campo)) if campo in CAMPOS_MAPA else getattr(base, campo))
+        for fragmento in fragmentos:
+            for campo in CAMPOS_CONTADOR:
+                valor = getattr(fragmento, campo)
+                if campo in CAMPOS_MAPA:
+                    mapa = getattr(total, campo)
+                    for subclave, cantidad in valor.items():
+                        mapa[subclave] = mapa.get(subclave, 0) + cantidad
+                        if not mapa[subclave]:
+                            del mapa[subclave]
+                else:
+                    setattr(total, campo, getattr(total, campo) + valor)
+            total.actualizado_en = max(total.actualizado_en, fragmento.actualizado_en)
+        return total
+
+    @staticmethod
+    def recientes(mapa: Dict[str, int], dias: int = 7) -> int:
+        limite = (timezone.localdate() - timedelta(days=dias)).isoformat()
+        return sum(n for d, n in mapa.items() if d >= limite)
+
+    # ---------- reconciliación ----------
+
+    @staticmethod
+    def valores_vacios() -> Dict:
+        return {
+            'propiedades_activas': 0, 'reservas_total': 0, 'reservas_por_estado': {},
+            'ingresos_totales': Decimal('0'), 'notificaciones_no_leidas': 0,
+            'notificaciones_por_dia': {}, 'reservas_por_checkin': {},
+        }
+
+    @staticmethod
+    def calcular(claves=None) -> Dict[str, Dict]:
+        """Recalcula los contadores desde las tablas con consultas agrupadas"""
+        usuarios = None
+        if claves is not None:
+            usuarios = [int(c.split(':')[1]) for c in claves if c.startswith('usuario:')]
+
+        desde = timezone.localdate() - timedelta(days=DIAS_HISTORIAL)
+        datos = defaultdict(EstadisticasService.valores_vacios)
+
+        def destinos(usuario_id):
+            if claves is None or CLAVE_GLOBAL in claves:
+                yield datos[CLAVE_GLOBAL]
+            if usuarios is None or usuario_id in usuarios:
+                yield datos[clave_usuario(usuario_id)]
+
+        def por_usuario(queryset, campo_usuario):
+            if usuarios is not None and (CLAVE_GLOBAL not in claves):
+                queryset = queryset.filter(**{f'{campo_usuario}__in': usuarios})
+            return queryset
+
+        propiedades = por_usuario(Propiedades.objects.filter(status=True), 'user_id')
+        for fila in propiedades.values('user_id').annotate(n=Count('id')):
+            for destino in destinos(fila['user_id']):
+                destino['propiedades_activas'] += fila['n']
+
+        reservas = por_usuario(Reservas.objects.all(), 'user_id')
+        for fila in reservas.values('user_id', 'status').annotate(
+                n=Count('id'), pagado=Sum('monto_total', filter=Q(pago_estado='pagado'))):
+            for destino in destinos(fila['user_id']):
+                destino['reservas_total'] += fila['n']
+                destino['reservas_por_estado'][fila['status']] = \
+                    destino['reservas_por_estado'].get(fila['status'], 0) + fila['n']
+                destino['ingresos_totales'] += fila['pagado'] or 0
+
+        for fila in reservas.filter(fecha_checkin__gte=desde).values('user_id', 'fecha_checkin').annotate(n=Count('id')):
+            dia = _dia(fila['fecha_checkin'])
+            for destino in destinos(fila['user_id']):
+                destino['reservas_por_checkin'][dia] = destino['reservas_por_checkin'].get(dia, 0) + fila['n']
+
+        notificaciones = por_usuario(Notificacion.objects.all(), 'usuario_id')
+        for fila in notificaciones.filter(leida=False).values('usuario_id').annotate(n=Count('id')):
+            if usuarios is None or fila['usuario_id'] in usuarios:
+                datos[clave_usuario(fila['usuario_id'])]['notificaciones_no_leidas'] += fila['n']
+
+        recientes = notificaciones.filter(creado_en__date__gte=desde).annotate(
+            dia=TruncDate('creado_en')
+        ).values('usuario_id', 'dia').annotate(n=Count('id'))
+        for fila in recientes:
+            dia = _dia(fila['dia'])
+            for destino in destinos(fila['usuario_id']):
+                destino['notificaciones_por_dia'][dia] = destino['notificaciones_por_dia'].get(dia, 0) + fila['n']
+
+        # Las claves pedidas existen aunque no tengan datos
+        for clave in (claves if claves is not None else [CLAVE_GLOBAL]):
+            datos[clave]
+        return dict(datos)
+
+    @staticmethod
+    def reconciliar(claves=None) -> int:
+        """
+        Reescribe las filas indicadas (o todas). Retorna filas escritas.
+
+        Las filas se bloquean antes de calcular y se actualizan en el lugar: un
+        cambio concurrente o ya estaba confirmado (y entra en el cálculo) o
+        espera el bloqueo y suma su delta sobre el valor reconciliado. Con
+        'global' se reescribe la base y los fragmentos vuelven a cero.
+        """
+        with transaction.atomic():
+            bloqueadas = EstadisticaDashboard.objects.select_for_update().order_by('clave')
+            if claves is not None:
+                filtro = Q(clave__in=claves)
+                if CLAVE_GLOBAL in claves:
+                    filtro |= Q(clave__startswith=PREFIJO_FRAGMENTO)
+                bloqueadas = bloqueadas.filter(filtro)
+            existentes = {f.clave: f for f in bloqueadas}
+
+            datos = EstadisticasService.calcular(claves)
+
+            ahora = timezone.now()
+            for clave, fila in existentes.items():
+                # Fragmentos y claves sin datos quedan en cero
+                for campo, valor in (datos.get(clave) or EstadisticasService.valores_vacios()).items():
+                    setattr(fila, campo, valor)
+                fila.actualizado_en = ahora
+            EstadisticaDashboard.objects.bulk_update(
+                list(existentes.values()), list(CAMPOS_CONTADOR) + ['actualizado_en'], batch_size=500
+            )
+            # Si otra transacción crea la misma clave, IntegrityError: quien llama decide
+            EstadisticaDashboard.objects.bulk_create(
+                [EstadisticaDashboard(clave=clave, **valores) for clave, valores in datos.items() if clave not in existentes],
+                batch_size=1000,
+            )
+        return len(datos)
@@ -0,0 +1,78 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.notificaciones.models import Notificacion
+from apps.propiedades.models import Propiedades
+from apps.reservas.models import Reservas
+from .services import EstadisticasService as E
+
+
+def _valores_reserva(reserva):
+    return {
+        'user_id': reserva.user_id, 'status': reserva.status, 'pago_estado': reserva.pago_estado,
+        'monto_total': reserva.monto_total, 'fecha_checkin': reserva.fecha_checkin,
+    }
+
+
+@receiver(post_save, sender=Reservas)
+def reserva_guardada(sender, instance, created, **kwargs):
+    # Reservas.save() deja los valores anteriores en _previo
+    previo = None if created else getattr(instance, '_previo', None)
+    deltas = E.deltas_reserva(previo, -1)
+    E.aplicar(E.deltas_reserva(_valores_reserva(instance), 1, deltas))
+
+
+@receiver(post_delete, sender=Reservas)
+def reserva_eliminada(sender, instance, **kwargs):
+    E.aplicar(E.deltas_reserva(_valores_reserva(instance), -1))
+
+
+@receiver(pre_save, sender=Propiedades)
+def propiedad_previa(sender, instance, update_fields=None, **kwargs):
+    instance._estadisticas_previo = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {'status', 'user', 'user_id'} & set(update_fields):
+        # Guardados parciales (geocodificación, bajas) no cambian los contadores
+        instance._estadisticas_omitir = True
+        return
+    instance._estadisticas_omitir = False
+    instance._estadisticas_previo = Propiedades.objects.filter(pk=instance.pk).values('user_id', 'status').first()
+
+
+@receiver(post_save, sender=Propiedades)
+def propiedad_guardada(sender, instance, created, **kwargs):
+    if getattr(instance, '_estadisticas_omitir', False):
+        return
+    deltas = E.deltas_propiedad(getattr(instance, '_estadisticas_previo', None), -1)
+    E.aplicar(E.deltas_propiedad({'user_id': instance.user_id, 'status': instance.status}, 1, deltas))
+
+
+@receiver(post_delete, sender=Propiedades)
+def propiedad_eliminada(sender, instance, **kwargs):
+    E.aplicar(E.deltas_propiedad({'user_id': instance.user_id, 'status': instance.status}, -1))
+
+
+@receiver(pre_save, sender=Notificacion)
+def notificacion_previa(sender, instance, **kwargs):
+    instance._estadisticas_previo = None
+    if instance.pk is not None:
+        instance._estadisticas_previo = Notificacion.objects.filter(pk=instance.pk).values(
+            'usuario_id', 'leida', 'creado_en'
+        ).first()
+
+
+@receiver(post_save, sender=Notificacion)
+def notificacion_guardada(sender, instance, created, **kwargs):
+    previo = getattr(instance, '_estadisticas_previo', None)
+    actual = {'usuario_id': instance.usuario_id, 'leida': instance.leida, 'creado_en': instance.creado_en}
+    # La fecha de creación no cambia: en actualizaciones solo cuenta 'leida'
+    deltas = E.deltas_notificacion(previo, -1, contar_dia=False)
+    E.aplicar(E.deltas_notificacion(actual, 1, deltas, contar_dia=created or previo is None))
+
+
+@receiver(post_delete, sender=Notificacion)
+def notificacion_eliminada(sender, instance, **kwargs):
+    E.aplicar(E.deltas_notificacion(
+        {'usuario_id': instance.usuario_id, 'leida': instance.leida, 'creado_en': instance.creado_en}, -1
+    ))
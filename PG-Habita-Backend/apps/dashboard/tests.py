@@ -1,3 +1,94 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from apps.notificaciones.models import Notificacion
+from apps.notificaciones.services import DespachoNotificaciones
+from apps.reservas.tests import ReservasTestCase
+from .models import EstadisticaDashboard
+from .services import CAMPOS_CONTADOR, CLAVE_GLOBAL, PREFIJO_FRAGMENTO, EstadisticasService, clave_usuario
+
+
+class EstadisticasIncrementalesTest(ReservasTestCase):
+    """Los contadores incrementales deben coincidir siempre con EstadisticasService.calcular()"""
+
+    def setUp(self):
+        EstadisticasService.reconciliar()
+        self.claves = [CLAVE_GLOBAL, clave_usuario(self.huesped.pk), clave_usuario(self.anfitrion.pk)]
+
+    def assertContadoresCoinciden(self):
+        filas = EstadisticasService.obtener(self.claves)
+        calculado = EstadisticasService.calcular(self.claves)
+        for clave in self.claves:
+            with self.subTest(clave=clave):
+                self.assertEqual({c: getattr(filas[clave], c) for c in CAMPOS_CONTADOR}, calculado[clave])
+
+    def test_alta_cambio_cancelacion_y_baja_de_reservas(self):
+        reserva = self.reservar(date(self.anio, 3, 1), date(self.anio, 3, 4))
+        otra = self.reservar(date(self.anio, 3, 10), date(self.anio, 3, 12))
+        self.assertContadoresCoinciden()
+
+        reserva.status = 'confirmada'
+        reserva.pago_estado = 'pagado'
+        reserva.fecha_checkin = date(self.anio, 3, 2)
+        reserva.save()
+        self.assertContadoresCoinciden()
+
+        otra.status = 'cancelada'
+        otra.save()
+        self.assertContadoresCoinciden()
+
+        reserva.delete()
+        otra.delete()
+        self.assertContadoresCoinciden()
+
+    @override_settings(DASHBOARD_FRAGMENTOS_GLOBAL=1)
+    def test_deltas_globales_van_a_fragmentos(self):
+        base = EstadisticaDashboard.objects.get(clave=CLAVE_GLOBAL)
+        EstadisticaDashboard.objects.filter(clave__startswith=PREFIJO_FRAGMENTO).delete()
+
+        self.reservar(date(self.anio, 4, 1), date(self.anio, 4, 3), pago_estado='pagado')
+
+        fragmento = EstadisticaDashboard.objects.get(clave__startswith=PREFIJO_FRAGMENTO)
+        self.assertEqual(fragmento.clave, f'{PREFIJO_FRAGMENTO}0')
+        self.assertEqual((fragmento.reservas_total, fragmento.ingresos_totales), (1, Decimal('200')))
+        # La base solo la escribe la reconciliación
+        self.assertEqual(EstadisticaDashboard.objects.get(clave=CLAVE_GLOBAL).reservas_total, base.reservas_total)
+        self.assertContadoresCoinciden()
+
+    def test_reconciliar_global_pone_los_fragmentos_en_cero(self):
+        self.reservar(date(self.anio, 5, 1), date(self.anio, 5, 3))
+
+        EstadisticasService.reconciliar([CLAVE_GLOBAL])
+
+        for fragmento in EstadisticaDashboard.objects.filter(clave__startswith=PREFIJO_FRAGMENTO):
+            self.assertEqual(fragmento.reservas_total, 0)
+            self.assertEqual(fragmento.reservas_por_estado, {})
+        self.assertContadoresCoinciden()
+
+    def test_clave_sin_fila_se_calcula_completa(self):
+        self.reservar(date(self.anio, 6, 1), date(self.anio, 6, 3))
+        EstadisticaDashboard.objects.filter(clave=clave_usuario(self.huesped.pk)).delete()
+
+        # El delta encuentra la clave sin fila: se reconcilia (con este cambio incluido)
+        self.reservar(date(self.anio, 6, 10), date(self.anio, 6, 12))
+
+        self.assertEqual(EstadisticaDashboard.objects.get(clave=clave_usuario(self.huesped.pk)).reservas_total, 2)
+        self.assertContadoresCoinciden()
+
+    def test_notificaciones_en_lote_y_marcar_todas_leidas(self):
+        DespachoNotificaciones.crear([
+            Notificacion(usuario=self.huesped, titulo=f'Aviso {i}', mensaje='Mensaje', tipo='sistema')
+            for i in range(3)
+        ])
+        self.assertContadoresCoinciden()
+
+        cliente = APIClient(HTTP_HOST='localhost')
+        cliente.force_authenticate(self.huesped)
+        respuesta = cliente.post('/api/notificaciones/marcar-todas-leidas/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(EstadisticaDashboard.objects.get(clave=clave_usuario(self.huesped.pk)).notificaciones_no_leidas, 0)
+        self.assertContadoresCoinciden()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NotificacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.notificaciones'
+
+    def ready(self):
+        import apps.notificaciones.signals
@@ -0,0 +1,98 @@
+"""
+Plantillas de las notificaciones de reservas. Cada evento define, por
+destinatario ('anfitrion' o 'huesped'), el tipo, el título y el mensaje; los
+mensajes se completan con el contexto de la reserva, que se arma una sola vez
+por evento (ver DespachoNotificaciones).
+"""
+from string import Formatter
+from typing import Dict, List, Tuple
+
+# Claves disponibles en los mensajes
+CAMPOS_CONTEXTO = {'propiedad', 'huesped', 'checkin', 'checkout', 'monto'}
+
+PLANTILLAS: Dict[str, List[Tuple[str, str, str, str]]] = {
+    'reserva_creada': [
+        ('anfitrion', 'reserva_creada', "🎉 ¡Nueva Reserva Recibida!",
+         "Tienes una nueva reserva para tu propiedad '{propiedad}'. "
+         "El huésped {huesped} ha reservado desde {checkin} hasta {checkout}. "
+         "Total: ${monto}. Por favor, confirma o rechaza la reserva pronto."),
+        ('huesped', 'reserva_creada', "✅ Reserva Solicitada",
+         "Tu solicitud de reserva en '{propiedad}' ha sido enviada. "
+         "Fechas: {checkin} a {checkout}. Total: ${monto}. "
+         "El anfitrión ha sido notificado y confirmará tu reserva pronto."),
+    ],
+    'reserva_confirmada': [
+        ('huesped', 'reserva_confirmada', "🎊 ¡Reserva Confirmada!",
+         "¡Buenas noticias! Tu reserva en '{propiedad}' ha sido confirmada por el anfitrión. "
+         "Prepárate para tu estadía del {checkin} al {checkout}. "
+         "Contacta al anfitrión si necesitas información adicional."),
+        ('anfitrion', 'reserva_confirmada', "✅ Reserva Confirmada",
+         "Has confirmado la reserva de {huesped} en '{propiedad}'. "
+         "Fechas: {checkin} a {checkout}. El huésped ha sido notificado."),
+    ],
+    'reserva_cancelada_anfitrion': [
+        ('huesped', 'reserva_cancelada', "⚠️ Reserva Cancelada por Anfitrión",
+         "El anfitrión ha cancelado tu reserva en '{propiedad}'. "
+         "Fechas afectadas: {checkin} a {checkout}. "
+         "Si ya realizaste el pago, recibirás un reembolso según las políticas de cancelación."),
+    ],
+    'reserva_cancelada_huesped': [
+        ('anfitrion', 'reserva_cancelada', "❌ Reserva Cancelada por Huésped",
+         "El huésped {huesped} ha cancelado la reserva en '{propiedad}'. "
+         "Fechas liberadas: {checkin} a {checkout}."),
+    ],
+    'reserva_rechazada': [
+        ('huesped', 'reserva_rechazada', "❌ Reserva Rechazada",
+         "Lamentablemente, tu reserva en '{propiedad}' para las fechas {checkin} a {checkout} "
+         "ha sido rechazada por el anfitrión. Puedes buscar otras propiedades disponibles."),
+    ],
+    'pago_recibido': [
+        ('anfitrion', 'pago_recibido', "💰 Pago Recibido",
+         "Se ha recibido el pago de ${monto} por la reserva de {huesped} en '{propiedad}'. "
+         "La reserva está completamente confirmada."),
+        ('huesped', 'pago_recibido', "✅ Pago Confirmado",
+         "Tu pago de ${monto} para la reserva en '{propiedad}' ha sido confirmado. "
+         "¡Todo listo para tu estadía!"),
+    ],
+    'pago_fallido': [
+        ('huesped', 'pago_fallido', "❌ Pago Fallido",
+         "El pago para tu reserva en '{propiedad}' ha fallado. "
+         "Por favor, verifica tu método de pago e inténtalo nuevamente. "
+         "Tu reserva permanecerá pendiente hasta que se complete el pago."),
+    ],
+    'recordatorio_checkin': [
+        ('huesped', 'recordatorio_checkin', "🔔 Recordatorio: Check-in Mañana",
+         "¡Tu check-in en '{propiedad}' es mañana! "
+         "Recuerda que tu reserva comienza el {checkin}. Prepárate para una excelente estadía."),
+    ],
+    'reserva_completada': [
+        ('anfitrion', 'sistema', "🏠 Reserva Completada",
+         "La reserva de {huesped} en '{propiedad}' ha finalizado. "
+         "Fechas: {checkin} a {checkout}. ¡Esperamos que haya sido una buena experiencia!"),
+        ('huesped', 'recordatorio_resena', "🌟 Estadía Completada",
+         "¡Esperamos que hayas disfrutado tu estadía en '{propiedad}'! "
+         "Tu reserva del {checkin} al {checkout} ha finalizado. "
+         "¿Te gustaría dejar una reseña sobre tu experiencia?"),
+    ],
+}
+
+
+def _validar_plantillas():
+    """Un campo mal escrito falla al importar, no al enviar la notificación"""
+    for evento, entradas in PLANTILLAS.items():
+        for _, _, titulo, mensaje in entradas:
+            for texto in (titulo, mensaje):
+                campos = {campo for _, campo, _, _ in Formatter().parse(texto) if campo}
+                if campos - CAMPOS_CONTEXTO:
+                    raise ValueError(f"Plantilla '{evento}' usa campos desconocidos: {campos - CAMPOS_CONTEXTO}")
+
+
+_validar_plantillas()
+
+
+def renderizar(evento: str, contexto: Dict[str, str]) -> List[Tuple[str, str, str, str]]:
+    """Retorna (destinatario, tipo, título, mensaje) por cada entrada del evento"""
+    return [
+        (destinatario, tipo, titulo.format_map(contexto), mensaje.format_map(contexto))
+        for destinatario, tipo, titulo, mensaje in PLANTILLAS[evento]
+    ]
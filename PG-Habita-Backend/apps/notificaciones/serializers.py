@@ -18,4 +18,21 @@ class NotificacionCreateSerializer(serializers.ModelSerializer):
         fields = ['titulo', 'mensaje', 'tipo', 'reserva']
 
 class MarcarLeidaSerializer(serializers.Serializer):
-    leida = serializers.BooleanField(default=True)
\ No newline at end of file
+    leida = serializers.BooleanField(default=True)
+
+
+class DifusionSerializer(serializers.Serializer):
+    titulo = serializers.CharField(max_length=255)
+    mensaje = serializers.CharField()
+    tipo = serializers.ChoiceField(choices=Notificacion.TIPOS_NOTIFICACION, default='sistema')
+    # Sin usuarios: todos los usuarios activos
+    usuarios = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+
+    def validate_usuarios(self, value):
+        from apps.usuarios.models import CustomUser
+
+        existentes = set(CustomUser.objects.filter(id__in=value).values_list('id', flat=True))
+        faltantes = sorted(set(value) - existentes)
+        if faltantes:
+            raise serializers.ValidationError(f'Usuarios inexistentes: {faltantes}')
+        return value
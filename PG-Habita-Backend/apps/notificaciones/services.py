@@ -1,90 +1,138 @@
+from typing import Dict, Iterable, List, Optional
+
 from django.db import transaction
-from django.utils import timezone
 from .models import Notificacion
+from .plantillas import renderizar
+from .tiempo_real import notificacion_a_dict, publicar
 from apps.reservas.models import Reservas
 
-class NotificacionService:
+
+class DespachoNotificaciones:
+    """
+    Alta de notificaciones en lote: una reserva se carga una sola vez con sus
+    relaciones, los mensajes salen de plantillas y todas las filas se insertan
+    con un bulk_create. bulk_create no dispara signals, así que los contadores
+    del dashboard se ajustan aquí, en la misma transacción.
+    """
+
+    # Filas por INSERT y por transacción en los envíos masivos
+    LOTE = 1000
 
     @staticmethod
-    def notificar_reserva_creada(reserva: Reservas):
-        """Notificar al anfitrión y huésped sobre nueva reserva"""
-        with transaction.atomic():
-            # Notificar al ANFITRIÓN
-            titulo_anfitrion = "🎉 ¡Nueva Reserva Recibida!"
-            mensaje_anfitrion = (
-                f"Tienes una nueva reserva para tu propiedad '{reserva.propiedad.nombre}'. "
-                f"El huésped {reserva.user.get_full_name() or reserva.user.username} "
-                f"ha reservado desde {reserva.fecha_checkin} hasta {reserva.fecha_checkout}. "
-                f"Total: ${reserva.monto_total}. "
-                f"Por favor, confirma o rechaza la reserva pronto."
-            )
+    def _cargar_reserva(reserva: Reservas) -> Reservas:
+        """Reserva con user y propiedad.user en memoria (a lo sumo una consulta)"""
+        if (Reservas.user.is_cached(reserva) and Reservas.propiedad.is_cached(reserva)
+                and type(reserva.propiedad).user.is_cached(reserva.propiedad)):
+            return reserva
+        relaciones = Reservas.objects.select_related('user', 'propiedad__user').get(pk=reserva.pk)
+        # Los campos propios se toman del objeto recibido: pueden no estar guardados todavía
+        reserva.user = relaciones.user
+        reserva.propiedad = relaciones.propiedad
+        return reserva
 
-            Notificacion.objects.create(
-                usuario=reserva.propiedad.user,  # Anfitrión
-                titulo=titulo_anfitrion,
-                mensaje=mensaje_anfitrion,
-                tipo='reserva_creada',
-                reserva=reserva
-            )
+    @staticmethod
+    def contexto_reserva(reserva: Reservas) -> Dict[str, str]:
+        huesped = reserva.user
+        return {
+            'propiedad': reserva.propiedad.nombre,
+            'huesped': huesped.get_full_name() or huesped.username,
+            'checkin': reserva.fecha_checkin,
+            'checkout': reserva.fecha_checkout,
+            'monto': reserva.monto_total,
+        }
 
-            # Notificar al HUÉSPED
-            titulo_huesped = "✅ Reserva Solicitada"
-            mensaje_huesped = (
-                f"Tu solicitud de reserva en '{reserva.propiedad.nombre}' ha sido enviada. "
-                f"Fechas: {reserva.fecha_checkin} a {reserva.fecha_checkout}. "
-                f"Total: ${reserva.monto_total}. "
-                f"El anfitrión ha sido notificado y confirmará tu reserva pronto."
-            )
+    @staticmethod
+    def crear(notificaciones: List[Notificacion]) -> List[Notificacion]:
+        """bulk_create + contadores del dashboard y push (lo que harían los signals por fila)"""
+        from apps.dashboard.services import EstadisticasService
 
-            Notificacion.objects.create(
-                usuario=reserva.user,  # Huésped
-                titulo=titulo_huesped,
-                mensaje=mensaje_huesped,
-                tipo='reserva_creada',
-                reserva=reserva
-            )
+        if not notificaciones:
+            return []
+        with transaction.atomic():
+            creadas = Notificacion.objects.bulk_create(notificaciones, batch_size=DespachoNotificaciones.LOTE)
+            deltas = {}
+            for notificacion in creadas:
+                EstadisticasService.deltas_notificacion({
+                    'usuario_id': notificacion.usuario_id,
+                    'leida': notificacion.leida,
+                    'creado_en': notificacion.creado_en,
+                }, 1, deltas)
+            EstadisticasService.aplicar(deltas)
+            for notificacion in creadas:
+                publicar(notificacion.usuario_id, 'notificacion', notificacion_a_dict(notificacion))
+        return creadas
 
-        print(f"📧 NOTIFICACIONES ENVIADAS: Reserva #{reserva.id}")
-        print(f"   → Anfitrión: {reserva.propiedad.user.username}")
-        print(f"   → Huésped: {reserva.user.username}")
+    @staticmethod
+    def preparar(reserva: Reservas, evento: str) -> List[Notificacion]:
+        """Notificaciones (sin guardar) de un evento de reserva (ver plantillas.PLANTILLAS)"""
+        reserva = DespachoNotificaciones._cargar_reserva(reserva)
+        destinatarios = {'anfitrion': reserva.propiedad.user, 'huesped': reserva.user}
+        return [
+            Notificacion(
+                usuario=destinatarios[destinatario],
+                titulo=titulo,
+                mensaje=mensaje,
+                tipo=tipo,
+                reserva=reserva,
+            )
+            for destinatario, tipo, titulo, mensaje in renderizar(
+                evento, DespachoNotificaciones.contexto_reserva(reserva)
+            )
+        ]
 
     @staticmethod
-    def notificar_reserva_confirmada(reserva: Reservas):
-        """Notificar confirmación de reserva"""
-        with transaction.atomic():
-            # Notificar al HUÉSPED
-            titulo_huesped = "🎊 ¡Reserva Confirmada!"
-            mensaje_huesped = (
-                f"¡Buenas noticias! Tu reserva en '{reserva.propiedad.nombre}' "
-                f"ha sido confirmada por el anfitrión. "
-                f"Prepárate para tu estadía del {reserva.fecha_checkin} al {reserva.fecha_checkout}. "
-                f"Contacta al anfitrión si necesitas información adicional."
-            )
+    def notificar_reserva(reserva: Reservas, evento: str) -> List[Notificacion]:
+        """Crea en el momento las notificaciones de un evento de reserva"""
+        creadas = DespachoNotificaciones.crear(DespachoNotificaciones.preparar(reserva, evento))
 
-            Notificacion.objects.create(
-                usuario=reserva.user,
-                titulo=titulo_huesped,
-                mensaje=mensaje_huesped,
-                tipo='reserva_confirmada',
-                reserva=reserva
-            )
+        print(f"📧 NOTIFICACIONES ENVIADAS: Reserva #{reserva.id} ({evento})")
+        for notificacion in creadas:
+            print(f"   → {notificacion.usuario.username}: {notificacion.titulo}")
+        return creadas
 
-            # Notificar al ANFITRIÓN
-            titulo_anfitrion = "✅ Reserva Confirmada"
-            mensaje_anfitrion = (
-                f"Has confirmado la reserva de {reserva.user.get_full_name() or reserva.user.username} "
-                f"en '{reserva.propiedad.nombre}'. "
-                f"Fechas: {reserva.fecha_checkin} a {reserva.fecha_checkout}. "
-                f"El huésped ha sido notificado."
+    @staticmethod
+    def difundir(titulo: str, mensaje: str, tipo: str = 'sistema',
+                 usuarios: Optional[Iterable[int]] = None) -> int:
+        """
+        Envío masivo (mensajes del sistema) a 'usuarios' (ids) o a todos los
+        usuarios activos. Se inserta en lotes de LOTE filas, cada uno en su
+        propia transacción para no bloquear los contadores del dashboard
+        durante todo el envío. Retorna cuántas notificaciones se crearon.
+        """
+        from apps.usuarios.models import CustomUser
+
+        if usuarios is None:
+            ids = CustomUser.objects.filter(is_active=True).order_by('id').values_list('id', flat=True).iterator(
+                chunk_size=DespachoNotificaciones.LOTE
             )
+        else:
+            ids = iter(sorted(set(usuarios)))
 
-            Notificacion.objects.create(
-                usuario=reserva.propiedad.user,
-                titulo=titulo_anfitrion,
-                mensaje=mensaje_anfitrion,
-                tipo='reserva_confirmada',
-                reserva=reserva
-            )
+        total = 0
+        lote = []
+        for usuario_id in ids:
+            lote.append(Notificacion(usuario_id=usuario_id, titulo=titulo, mensaje=mensaje, tipo=tipo))
+            if len(lote) >= DespachoNotificaciones.LOTE:
+                total += len(DespachoNotificaciones.crear(lote))
+                lote = []
+        if lote:
+            total += len(DespachoNotificaciones.crear(lote))
+
+        print(f"📢 Notificación '{titulo}' enviada a {total} usuarios")
+        return total
+
+
+class NotificacionService:
+
+    @staticmethod
+    def notificar_reserva_creada(reserva: Reservas):
+        """Notificar al anfitrión y huésped sobre nueva reserva"""
+        DespachoNotificaciones.notificar_reserva(reserva, 'reserva_creada')
+
+    @staticmethod
+    def notificar_reserva_confirmada(reserva: Reservas):
+        """Notificar confirmación de reserva"""
+        DespachoNotificaciones.notificar_reserva(reserva, 'reserva_confirmada')
 
     @staticmethod
     def notificar_reserva_aceptada(reserva: Reservas):
@@ -94,158 +142,31 @@ class NotificacionService:
     @staticmethod
     def notificar_reserva_cancelada(reserva: Reservas, cancelado_por_anfitrion: bool = False):
         """Notificar cancelación de reserva"""
-        if cancelado_por_anfitrion:
-            # Anfitrión canceló - notificar HUÉSPED
-            titulo = "⚠️ Reserva Cancelada por Anfitrión"
-            mensaje = (
-                f"El anfitrión ha cancelado tu reserva en '{reserva.propiedad.nombre}'. "
-                f"Fechas afectadas: {reserva.fecha_checkin} a {reserva.fecha_checkout}. "
-                f"Si ya realizaste el pago, recibirás un reembolso según las políticas de cancelación."
-            )
-            usuario = reserva.user
-        else:
-            # Huésped canceló - notificar ANFITRIÓN
-            titulo = "❌ Reserva Cancelada por Huésped"
-            mensaje = (
-                f"El huésped {reserva.user.get_full_name() or reserva.user.username} "
-                f"ha cancelado la reserva en '{reserva.propiedad.nombre}'. "
-                f"Fechas liberadas: {reserva.fecha_checkin} a {reserva.fecha_checkout}."
-            )
-            usuario = reserva.propiedad.user
-
-        Notificacion.objects.create(
-            usuario=usuario,
-            titulo=titulo,
-            mensaje=mensaje,
-            tipo='reserva_cancelada',
-            reserva=reserva
-        )
+        # Anfitrión canceló - notificar HUÉSPED; huésped canceló - notificar ANFITRIÓN
+        evento = 'reserva_cancelada_anfitrion' if cancelado_por_anfitrion else 'reserva_cancelada_huesped'
+        DespachoNotificaciones.notificar_reserva(reserva, evento)
 
     @staticmethod
     def notificar_reserva_rechazada(reserva: Reservas):
         """Notificar rechazo de reserva"""
-        titulo_huesped = "❌ Reserva Rechazada"
-        mensaje_huesped = (
-            f"Lamentablemente, tu reserva en '{reserva.propiedad.nombre}' "
-            f"para las fechas {reserva.fecha_checkin} a {reserva.fecha_checkout} "
-            f"ha sido rechazada por el anfitrión. "
-            f"Puedes buscar otras propiedades disponibles."
-        )
-
-        Notificacion.objects.create(
-            usuario=reserva.user,
-            titulo=titulo_huesped,
-            mensaje=mensaje_huesped,
-            tipo='reserva_rechazada',  # 🔥 NUEVO TIPO ESPECÍFICO
-            reserva=reserva
-        )
+        DespachoNotificaciones.notificar_reserva(reserva, 'reserva_rechazada')
 
     @staticmethod
     def notificar_pago_recibido(reserva: Reservas):
         """Notificar pago recibido a ambos"""
-        with transaction.atomic():
-            # Notificar ANFITRIÓN
-            titulo_anfitrion = "💰 Pago Recibido"
-            mensaje_anfitrion = (
-                f"Se ha recibido el pago de ${reserva.monto_total} por la reserva "
-                f"de {reserva.user.get_full_name() or reserva.user.username} "
-                f"en '{reserva.propiedad.nombre}'. "
-                f"La reserva está completamente confirmada."
-            )
-
-            Notificacion.objects.create(
-                usuario=reserva.propiedad.user,
-                titulo=titulo_anfitrion,
-                mensaje=mensaje_anfitrion,
-                tipo='pago_recibido',
-                reserva=reserva
-            )
-
-            # Notificar HUÉSPED
-            titulo_huesped = "✅ Pago Confirmado"
-            mensaje_huesped = (
-                f"Tu pago de ${reserva.monto_total} para la reserva en "
-                f"'{reserva.propiedad.nombre}' ha sido confirmado. "
-                f"¡Todo listo para tu estadía!"
-            )
-
-            Notificacion.objects.create(
-                usuario=reserva.user,
-                titulo=titulo_huesped,
-                mensaje=mensaje_huesped,
-                tipo='pago_recibido',
-                reserva=reserva
-            )
+        DespachoNotificaciones.notificar_reserva(reserva, 'pago_recibido')
 
     @staticmethod
     def notificar_pago_fallido(reserva: Reservas):
         """Notificar pago fallido al huésped"""
-        titulo_huesped = "❌ Pago Fallido"
-        mensaje_huesped = (
-            f"El pago para tu reserva en '{reserva.propiedad.nombre}' ha fallado. "
-            f"Por favor, verifica tu método de pago e inténtalo nuevamente. "
-            f"Tu reserva permanecerá pendiente hasta que se complete el pago."
-        )
-
-        Notificacion.objects.create(
-            usuario=reserva.user,
-            titulo=titulo_huesped,
-            mensaje=mensaje_huesped,
-            tipo='pago_fallido',
-            reserva=reserva
-        )
+        DespachoNotificaciones.notificar_reserva(reserva, 'pago_fallido')
 
     @staticmethod
     def notificar_recordatorio_checkin(reserva: Reservas):
         """Notificar recordatorio de check-in"""
-        titulo_huesped = "🔔 Recordatorio: Check-in Mañana"
-        mensaje_huesped = (
-            f"¡Tu check-in en '{reserva.propiedad.nombre}' es mañana! "
-            f"Recuerda que tu reserva comienza el {reserva.fecha_checkin}. "
-            f"Prepárate para una excelente estadía."
-        )
-
-        Notificacion.objects.create(
-            usuario=reserva.user,
-            titulo=titulo_huesped,
-            mensaje=mensaje_huesped,
-            tipo='recordatorio_checkin',
-            reserva=reserva
-        )
+        DespachoNotificaciones.notificar_reserva(reserva, 'recordatorio_checkin')
 
     @staticmethod
     def notificar_reserva_completada(reserva: Reservas):
         """Notificar finalización de reserva"""
-        with transaction.atomic():
-            # Notificar ANFITRIÓN
-            titulo_anfitrion = "🏠 Reserva Completada"
-            mensaje_anfitrion = (
-                f"La reserva de {reserva.user.get_full_name() or reserva.user.username} "
-                f"en '{reserva.propiedad.nombre}' ha finalizado. "
-                f"Fechas: {reserva.fecha_checkin} a {reserva.fecha_checkout}. "
-                f"¡Esperamos que haya sido una buena experiencia!"
-            )
-
-            Notificacion.objects.create(
-                usuario=reserva.propiedad.user,
-                titulo=titulo_anfitrion,
-                mensaje=mensaje_anfitrion,
-                tipo='sistema',
-                reserva=reserva
-            )
-
-            # Notificar HUÉSPED
-            titulo_huesped = "🌟 Estadía Completada"
-            mensaje_huesped = (
-                f"¡Esperamos que hayas disfrutado tu estadía en '{reserva.propiedad.nombre}'! "
-                f"Tu reserva del {reserva.fecha_checkin} al {reserva.fecha_checkout} ha finalizado. "
-                f"¿Te gustaría dejar una reseña sobre tu experiencia?"
-            )
-
-            Notificacion.objects.create(
-                usuario=reserva.user,
-                titulo=titulo_huesped,
-                mensaje=mensaje_huesped,
-                tipo='recordatorio_resena',
-                reserva=reserva
-            )
\ No newline at end of file
+        DespachoNotificaciones.notificar_reserva(reserva, 'reserva_completada')
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notificacion
+from .tiempo_real import notificacion_a_dict, publicar
+
+
+@receiver(post_save, sender=Notificacion)
+def notificacion_guardada(sender, instance, created, **kwargs):
+    # Las altas en lote (DespachoNotificaciones.crear) publican por su cuenta
+    publicar(instance.usuario_id, 'notificacion' if created else 'actualizada', notificacion_a_dict(instance))
+
+
+@receiver(post_delete, sender=Notificacion)
+def notificacion_eliminada(sender, instance, **kwargs):
+    publicar(instance.usuario_id, 'eliminada', {'id': instance.id})
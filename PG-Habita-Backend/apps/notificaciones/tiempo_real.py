@@ -0,0 +1,164 @@
+"""
+Push de notificaciones: pub/sub por usuario detrás de un broker intercambiable
+(settings.NOTIFICACIONES_BROKER). Los cambios se publican al confirmar la
+transacción en el canal 'usuario:<id>' y las vistas stream (SSE) y esperar
+(long-poll) los entregan al usuario conectado.
+
+BrokerMemoria solo reparte dentro del proceso: lo que se crea en otro proceso
+(p. ej. despachar_eventos_reserva) lo recogen las vistas con su consulta de
+respaldo periódica (NOTIFICACIONES_STREAM_RESPALDO).
+"""
+import queue
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def canal_usuario(usuario_id) -> str:
+    return f'usuario:{usuario_id}'
+
+
+class Suscripcion:
+    """Cola acotada de mensajes de un canal. Usar con 'with' para darla de baja."""
+
+    def __init__(self, broker, canal: str, max_pendientes: int):
+        self.broker = broker
+        self.canal = canal
+        self.cola = queue.Queue(maxsize=max_pendientes)
+        # Se perdieron mensajes por cola llena: el consumidor debe resincronizar
+        self.desbordada = False
+
+    def entregar(self, mensaje: Dict):
+        try:
+            self.cola.put_nowait(mensaje)
+        except queue.Full:
+            self.desbordada = True
+
+    def recibir(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cerrar(self):
+        self.broker.cancelar(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class Broker:
+    """Interfaz de los brokers: suscribir / cancelar / publicar por canal"""
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        raise NotImplementedError
+
+    def cancelar(self, suscripcion: Suscripcion):
+        raise NotImplementedError
+
+    def publicar(self, canal: str, mensaje: Dict) -> int:
+        """Retorna a cuántas suscripciones se entregó"""
+        raise NotImplementedError
+
+
+class BrokerMemoria(Broker):
+    """Suscripciones en memoria del proceso (workers con hilos)"""
+
+    def __init__(self):
+        self.max_pendientes = getattr(settings, 'NOTIFICACIONES_STREAM_MAX_PENDIENTES', 100)
+        self._lock = threading.Lock()
+        self._suscripciones = defaultdict(set)
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        suscripcion = Suscripcion(self, canal, self.max_pendientes)
+        with self._lock:
+            self._suscripciones[canal].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.canal)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.canal]
+
+    def publicar(self, canal: str, mensaje: Dict) -> int:
+        with self._lock:
+            suscripciones = list(self._suscripciones.get(canal, ()))
+        for suscripcion in suscripciones:
+            suscripcion.entregar(mensaje)
+        return len(suscripciones)
+
+    def conexiones(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._suscripciones.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def obtener_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                ruta = getattr(settings, 'NOTIFICACIONES_BROKER', 'apps.notificaciones.tiempo_real.BrokerMemoria')
+                _broker = import_string(ruta)()
+    return _broker
+
+
+class LimiteConexiones:
+    """
+    Conexiones abiertas (stream/esperar) por proceso. Cada una ocupa un hilo
+    del worker: por encima del límite se rechazan para que el resto de la API
+    siga teniendo hilos libres.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.abiertas = 0
+
+    def maximo(self) -> int:
+        return getattr(settings, 'NOTIFICACIONES_STREAM_MAX_CONEXIONES', 8)
+
+    def reservar(self) -> bool:
+        with self._lock:
+            if self.abiertas >= self.maximo():
+                return False
+            self.abiertas += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self.abiertas = max(self.abiertas - 1, 0)
+
+
+limite_conexiones = LimiteConexiones()
+
+
+def notificacion_a_dict(notificacion) -> Dict:
+    return {
+        'id': notificacion.id,
+        'titulo': notificacion.titulo,
+        'mensaje': notificacion.mensaje,
+        'tipo': notificacion.tipo,
+        'reserva': notificacion.reserva_id,
+        'leida': notificacion.leida,
+        'creado_en': notificacion.creado_en.isoformat() if notificacion.creado_en else None,
+    }
+
+
+def publicar(usuario_id, evento: str, datos: Dict):
+    """Publica en el canal del usuario cuando la transacción actual se confirma"""
+    mensaje = {'evento': evento, 'datos': datos}
+    canal = canal_usuario(usuario_id)
+    transaction.on_commit(lambda: obtener_broker().publicar(canal, mensaje))
@@ -1,10 +1,17 @@
 from django.urls import path
-from .views import NotificacionList, NotificacionCUD, NotificacionesNoLeidas, MarcarTodasLeidas, MarcarLeida
+from .views import (
+    NotificacionList, NotificacionCUD, NotificacionesNoLeidas, MarcarTodasLeidas, MarcarLeida, DifundirNotificacion,
+    StreamNotificaciones, TicketStreamNotificaciones, EsperarNotificaciones,
+)
 
 urlpatterns = [
     path('', NotificacionList.as_view(), name='notificacion_list'),
     path('<int:pk>/', NotificacionCUD.as_view(), name='notificacion_detail'),
     path('no-leidas/', NotificacionesNoLeidas.as_view(), name='notificaciones_no_leidas'),
     path('marcar-todas-leidas/', MarcarTodasLeidas.as_view(), name='marcar_todas_leidas'),
+    path('stream/', StreamNotificaciones.as_view(), name='stream_notificaciones'),
+    path('stream/ticket/', TicketStreamNotificaciones.as_view(), name='ticket_stream_notificaciones'),
+    path('esperar/', EsperarNotificaciones.as_view(), name='esperar_notificaciones'),
+    path('difundir/', DifundirNotificacion.as_view(), name='difundir_notificacion'),
     path('<int:pk>/marcar-leida/', MarcarLeida.as_view(), name='marcar_leida'),
 ]
\ No newline at end of file
@@ -1,10 +1,26 @@
+import json
+import math
+import time
+from datetime import timedelta
+
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import Token
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 
+from apps.dashboard.services import EstadisticasService, clave_usuario
 from .models import Notificacion
-from .serializers import NotificacionSerializer, NotificacionCreateSerializer, MarcarLeidaSerializer
+from .serializers import (
+    NotificacionSerializer, NotificacionCreateSerializer, MarcarLeidaSerializer, DifusionSerializer
+)
+from .services import DespachoNotificaciones
+from .tiempo_real import canal_usuario, limite_conexiones, notificacion_a_dict, obtener_broker, publicar
 
 
 class NotificacionList(generics.ListCreateAPIView):
@@ -86,8 +102,16 @@ class MarcarTodasLeidas(APIView):
 
     def post(self, request):
         try:
-            notificaciones = Notificacion.objects.filter(usuario=request.user, leida=False)
-            count = notificaciones.update(leida=True)
+            with transaction.atomic():
+                notificaciones = Notificacion.objects.filter(usuario=request.user, leida=False)
+                count = notificaciones.update(leida=True)
+
+                # update() no dispara signals: ajustar el contador del dashboard
+                EstadisticasService.aplicar({
+                    clave_usuario(request.user.id): {'notificaciones_no_leidas': -count}
+                })
+                if count:
+                    publicar(request.user.id, 'todas_leidas', {'cantidad': count})
 
             return Response({
                 'status': 'success',
@@ -138,4 +162,277 @@ class MarcarLeida(APIView):
             return Response(
                 {'error': 'Error interno del servidor'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class DifundirNotificacion(APIView):
+    """Mensaje para muchos usuarios (todos los activos o los ids indicados)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = DifusionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        datos = serializer.validated_data
+        try:
+            count = DespachoNotificaciones.difundir(
+                datos['titulo'], datos['mensaje'], tipo=datos['tipo'], usuarios=datos.get('usuarios')
+            )
+            return Response({
+                'status': 'success',
+                'message': f'Notificación enviada a {count} usuarios',
+                'count': count
+            }, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            print(f"Error en DifundirNotificacion: {e}")
+            return Response(
+                {'error': 'Error interno del servidor'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# ---------- Push (SSE / long-poll) ----------
+
+class TicketStream(Token):
+    """
+    JWT corto y de un solo propósito (token_type 'stream') para abrir el
+    stream: EventSource no permite cabeceras y lo que va en la URL queda en
+    los logs de gunicorn y de los proxies, así que ahí nunca va el access token.
+    """
+    token_type = 'stream'
+    lifetime = timedelta(seconds=getattr(settings, 'NOTIFICACIONES_STREAM_TICKET_SEGUNDOS', 60))
+
+
+class JWTParametroAuthentication(JWTAuthentication):
+    """Cabecera Authorization o, para EventSource, ?ticket= (ver TicketStreamNotificaciones)"""
+
+    def authenticate(self, request):
+        resultado = super().authenticate(request)
+        if resultado is not None:
+            return resultado
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        try:
+            validado = TicketStream(ticket)
+        except TokenError as e:
+            raise InvalidToken({'detail': str(e)})
+        return self.get_user(validado), validado
+
+
+class TicketStreamNotificaciones(APIView):
+    """
+    Emite el ticket para abrir stream/?ticket=. Vence en
+    NOTIFICACIONES_STREAM_TICKET_SEGUNDOS: el cliente pide uno nuevo antes de
+    cada conexión (también al reconectar tras NOTIFICACIONES_STREAM_SEGUNDOS).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ticket = TicketStream.for_user(request.user)
+        return Response({'ticket': str(ticket), 'expira_en': int(TicketStream.lifetime.total_seconds())})
+
+
+def _no_leidas(usuario_id) -> int:
+    # Conteo directo y no el contador del dashboard: el evento puede llegar
+    # antes de que el signal del dashboard lo actualice
+    return Notificacion.objects.filter(usuario_id=usuario_id, leida=False).count()
+
+
+def _nuevas(usuario_id, desde_id: int, limite: int = 50):
+    return [
+        notificacion_a_dict(n)
+        for n in Notificacion.objects.filter(usuario_id=usuario_id, id__gt=desde_id).order_by('id')[:limite]
+    ]
+
+
+def _ultimo_id(request) -> int:
+    valor = request.headers.get('Last-Event-ID') or request.query_params.get('desde')
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return Notificacion.objects.filter(usuario=request.user).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _liberar_conexion_db():
+    # Entre esperas el hilo no retiene la conexión (CONN_MAX_AGE la mantendría abierta)
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+class _ContenidoStream:
+    """Iterable del stream con close(): Django lo llama al cerrar la respuesta"""
+
+    def __init__(self, generador, al_cerrar):
+        self.generador = generador
+        self.al_cerrar = al_cerrar
+
+    def __iter__(self):
+        return self.generador
+
+    def close(self):
+        self.generador.close()
+        self.al_cerrar()
+
+
+class StreamNotificaciones(APIView):
+    """
+    Server-sent events del usuario: 'notificacion', 'actualizada', 'eliminada',
+    'todas_leidas' y 'no_leidas' (contador). Reemplaza el polling de
+    no-leidas; el cliente (EventSource) reconecta solo y retoma desde el
+    último id recibido (Last-Event-ID o ?desde=).
+
+    Cada stream ocupa un hilo durante NOTIFICACIONES_STREAM_SEGUNDOS: por
+    proceso se admiten NOTIFICACIONES_STREAM_MAX_CONEXIONES y el resto recibe
+    503 con 'retry:' (EventSource reintenta solo, más tarde).
+    """
+    authentication_classes = [JWTParametroAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if not limite_conexiones.reservar():
+            reintento = getattr(settings, 'NOTIFICACIONES_STREAM_REINTENTO', 30)
+            respuesta = HttpResponse(
+                f'retry: {reintento * 1000}\n\n', status=503, content_type='text/event-stream; charset=utf-8'
+            )
+            respuesta['Retry-After'] = str(reintento)
+            return respuesta
+
+        try:
+            usuario_id = request.user.id
+            desde_id = _ultimo_id(request)
+            suscripcion = obtener_broker().suscribir(canal_usuario(usuario_id))
+        except Exception:
+            limite_conexiones.liberar()
+            raise
+
+        duracion = getattr(settings, 'NOTIFICACIONES_STREAM_SEGUNDOS', 300)
+        latido = getattr(settings, 'NOTIFICACIONES_STREAM_LATIDO', 15)
+        respaldo = getattr(settings, 'NOTIFICACIONES_STREAM_RESPALDO', 60)
+
+        def evento(nombre, datos, id_evento=None):
+            linea = f'id: {id_evento}\n' if id_evento is not None else ''
+            return f'{linea}event: {nombre}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n'
+
+        def ponerse_al_dia():
+            nonlocal desde_id
+            eventos = []
+            for datos in _nuevas(usuario_id, desde_id):
+                desde_id = datos['id']
+                eventos.append(evento('notificacion', datos, datos['id']))
+            return eventos
+
+        def generar():
+            nonlocal desde_id
+            try:
+                no_leidas = _no_leidas(usuario_id)
+                yield 'retry: 3000\n\n'
+                yield from ponerse_al_dia()
+                yield evento('no_leidas', {'cantidad': no_leidas})
+                _liberar_conexion_db()
+
+                ahora = time.monotonic()
+                fin = ahora + duracion
+                proximo_respaldo = ahora + respaldo
+                while time.monotonic() < fin:
+                    espera = min(latido, proximo_respaldo - time.monotonic(), fin - time.monotonic())
+                    mensaje = suscripcion.recibir(timeout=max(espera, 0))
+                    salida = []
+                    if mensaje is None and not suscripcion.desbordada:
+                        if time.monotonic() < proximo_respaldo:
+                            # Latido sin consultas: solo mantiene viva la conexión
+                            yield ': ping\n\n'
+                            continue
+                        # Respaldo: lo publicado en otros procesos (p. ej. el despachador)
+                        proximo_respaldo = time.monotonic() + respaldo
+                        salida = ponerse_al_dia()
+                        if not salida:
+                            yield ': ping\n\n'
+                            continue
+                    elif suscripcion.desbordada:
+                        # Cola llena: se perdieron mensajes, resincronizar desde la base
+                        suscripcion.desbordada = False
+                        salida = ponerse_al_dia()
+                    elif mensaje['evento'] == 'notificacion':
+                        if mensaje['datos']['id'] > desde_id:
+                            desde_id = mensaje['datos']['id']
+                            salida = [evento('notificacion', mensaje['datos'], desde_id)]
+                    else:
+                        salida = [evento(mensaje['evento'], mensaje['datos'])]
+
+                    # El contador solo se consulta cuando llegó algo
+                    yield from salida
+                    actual = _no_leidas(usuario_id)
+                    if actual != no_leidas:
+                        no_leidas = actual
+                        yield evento('no_leidas', {'cantidad': no_leidas})
+                    _liberar_conexion_db()
+            finally:
+                cerrar()
+
+        cerrado = False
+
+        def cerrar():
+            # Una sola vez: desde el generador o desde response.close() si nunca se iteró
+            nonlocal cerrado
+            if not cerrado:
+                cerrado = True
+                suscripcion.cerrar()
+                limite_conexiones.liberar()
+
+        respuesta = StreamingHttpResponse(_ContenidoStream(generar(), cerrar), content_type='text/event-stream; charset=utf-8')
+        respuesta['Cache-Control'] = 'no-cache'
+        # Sin buffer en proxies (nginx) para que cada evento salga al momento
+        respuesta['X-Accel-Buffering'] = 'no'
+        return respuesta
+
+
+class EsperarNotificaciones(APIView):
+    """
+    Long-poll para clientes sin SSE: responde apenas hay notificaciones con
+    id > ?desde= (o algún cambio) o al cumplirse ?timeout= segundos (máx. 30).
+    Comparte el límite de conexiones con el stream.
+    """
+    authentication_classes = [JWTParametroAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if not limite_conexiones.reservar():
+            reintento = getattr(settings, 'NOTIFICACIONES_STREAM_REINTENTO', 30)
+            respuesta = Response(
+                {'error': 'Demasiadas conexiones abiertas, reintente más tarde', 'reintentar_en': reintento},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            respuesta['Retry-After'] = str(reintento)
+            return respuesta
+
+        try:
+            usuario_id = request.user.id
+            desde_id = _ultimo_id(request)
+            try:
+                timeout = float(request.query_params.get('timeout', 25))
+            except ValueError:
+                timeout = 25
+            # nan pasaría por min/max y queue.get(timeout=nan) no vuelve nunca
+            timeout = min(max(timeout, 0), 30) if math.isfinite(timeout) else 25
+
+            # Suscribirse antes de consultar: lo que llegue entre medio no se pierde
+            with obtener_broker().suscribir(canal_usuario(usuario_id)) as suscripcion:
+                nuevas = _nuevas(usuario_id, desde_id)
+                eventos = []
+                if not nuevas:
+                    _liberar_conexion_db()
+                    mensaje = suscripcion.recibir(timeout=timeout)
+                    if mensaje is not None and mensaje['evento'] != 'notificacion':
+                        eventos.append(mensaje)
+                    nuevas = _nuevas(usuario_id, desde_id)
+        finally:
+            limite_conexiones.liberar()
+
+        return Response({
+            'notificaciones': nuevas,
+            'eventos': eventos,
+            'no_leidas': _no_leidas(usuario_id),
+            'ultimo_id': nuevas[-1]['id'] if nuevas else desde_id,
+        })
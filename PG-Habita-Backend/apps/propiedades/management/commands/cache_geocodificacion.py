@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.propiedades.services.geocoding_cache import CacheGeocodificacion
+
+
+class Command(BaseCommand):
+    help = 'Muestra estadísticas del cache de geocodificación y purga entradas expiradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purgar', action='store_true',
+                            help='Elimina las entradas expiradas')
+
+    def handle(self, *args, **options):
+        if options['purgar']:
+            eliminadas = CacheGeocodificacion.purgar_expiradas()
+            self.stdout.write(self.style.SUCCESS(f'🧹 Entradas expiradas eliminadas: {eliminadas}'))
+
+        datos = CacheGeocodificacion.estadisticas()
+        self.stdout.write(
+            f"📊 Entradas: {datos['entradas']} ({datos['negativas']} negativas, {datos['expiradas']} expiradas)\n"
+            f"   Hits: {datos['hits']} | Misses: {datos['misses']} | Aciertos: {datos['tasa_aciertos']}%"
+        )
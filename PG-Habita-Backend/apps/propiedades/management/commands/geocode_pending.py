@@ -0,0 +1,126 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.propiedades.models import Propiedades
+from apps.propiedades.services.geo_service import GeoService
+from apps.propiedades.services.geocoding_cache import CacheGeocodificacion
+from apps.propiedades.services.geocoding_queue import CAMPOS_GEO
+from apps.propiedades.services.maps_service import OpenStreetMapService
+from apps.reportes.services import VersionesReporte
+
+
+class Command(BaseCommand):
+    help = (
+        'Geocodifica en lote las propiedades sin coordenadas (latitud IS NULL). '
+        'Recorre por id, agrupa direcciones repetidas y respeta el límite compartido '
+        'de Nominatim. Se puede interrumpir y reanudar con --desde-id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Propiedades leídas por consulta')
+        parser.add_argument('--desde-id', type=int, default=0,
+                            help='Reanudar a partir de este id (exclusivo)')
+        parser.add_argument('--limite', type=int, default=None,
+                            help='Máximo de propiedades a procesar')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo lee el cache: cuenta y agrupa direcciones sin consultar Nominatim ni guardar')
+
+    def handle(self, *args, **options):
+        self.detener = False
+        signal.signal(signal.SIGINT, self._detener)
+        signal.signal(signal.SIGTERM, self._detener)
+
+        # Las propiedades con un trabajo en la cola las procesa procesar_geocodificacion
+        pendientes = Propiedades.objects.filter(latitud__isnull=True).exclude(
+            geocodificaciones__estado__in=['pendiente', 'procesando']
+        ).exclude(direccion_completa='')
+        total = pendientes.filter(id__gt=options['desde_id']).count()
+        if options['limite']:
+            total = min(total, options['limite'])
+        self.stdout.write(f'📍 Propiedades sin coordenadas: {total}')
+
+        ultimo_id = options['desde_id']
+        procesadas = geocodificadas = sin_resultado = reintentar = sin_cache = 0
+        consultas = 0
+        resultados = {}  # dirección normalizada -> resultado (solo esta corrida)
+        inicio = time.monotonic()
+
+        while not self.detener and procesadas < total:
+            tamano = min(options['lote'], total - procesadas)
+            lote = list(
+                pendientes.filter(id__gt=ultimo_id).order_by('id')
+                .only('id', 'nombre', 'direccion_completa', 'user_id')[:tamano]
+            )
+            if not lote:
+                break
+
+            actualizar = []
+            for propiedad in lote:
+                if self.detener:
+                    break
+
+                clave = CacheGeocodificacion.normalizar(propiedad.direccion_completa)
+                if clave not in resultados:
+                    if options['dry_run']:
+                        # Sin consultas remotas: no gasta el límite compartido ni escribe el cache
+                        resultados[clave] = CacheGeocodificacion.obtener(
+                            'coordenadas', propiedad.direccion_completa, contar_hit=False
+                        ) or {'exito': False, 'sin_cache': True}
+                    else:
+                        resultados[clave] = OpenStreetMapService.obtener_coordenadas(propiedad.direccion_completa)
+                    consultas += 1
+                resultado = resultados[clave]
+
+                if resultado.get('sin_cache'):
+                    sin_cache += 1
+                elif resultado['exito']:
+                    GeoService.aplicar_resultado(propiedad, resultado)
+                    propiedad.actualizar_geohash()
+                    propiedad.actualizado_en = timezone.now()
+                    actualizar.append(propiedad)
+                    geocodificadas += 1
+                elif resultado.get('reintentar'):
+                    # Error transitorio: no cachear para reintentar en la próxima dirección igual
+                    del resultados[clave]
+                    reintentar += 1
+                else:
+                    sin_resultado += 1
+
+                procesadas += 1
+                ultimo_id = propiedad.id
+
+            if actualizar and not options['dry_run']:
+                Propiedades.objects.bulk_update(actualizar, CAMPOS_GEO + ['geohash'], batch_size=500)
+                # bulk_update no dispara signals: invalidar el cache de reportes
+                VersionesReporte.incrementar({p.user_id for p in actualizar})
+
+            transcurrido = time.monotonic() - inicio
+            velocidad = procesadas / transcurrido if transcurrido else 0
+            restante = (total - procesadas) / velocidad if velocidad else 0
+            self.stdout.write(
+                f'   {procesadas}/{total} | ✅ {geocodificadas} | ❌ {sin_resultado} | 🔁 {reintentar} '
+                f'| {velocidad:.2f} prop/s | ~{restante:.0f}s restantes | último id {ultimo_id}'
+            )
+
+        transcurrido = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Procesadas {procesadas} propiedades en {transcurrido:.1f}s '
+            f'({procesadas / transcurrido if transcurrido else 0:.2f} prop/s), '
+            f'{consultas} direcciones únicas consultadas'
+        ))
+        self.stdout.write(
+            f'   Geocodificadas: {geocodificadas} | Sin resultado: {sin_resultado} | Con error transitorio: {reintentar}'
+        )
+        if options['dry_run']:
+            self.stdout.write(f'   (dry-run) Sin entrada en el cache, se consultarían a Nominatim: {sin_cache}')
+        if self.detener:
+            self.stdout.write(self.style.WARNING(
+                f'⏸️ Interrumpido. Reanudar con: python manage.py geocode_pending --desde-id {ultimo_id}'
+            ))
+
+    def _detener(self, signum, frame):
+        self.detener = True
@@ -0,0 +1,105 @@
+import csv
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.propiedades.models import LugarGazetteer
+from apps.propiedades.services.geocoding_cache import CacheGeocodificacion
+
+ARCHIVO_POR_DEFECTO = os.path.join(settings.BASE_DIR, 'csv_data', 'gazetteer_bolivia.csv')
+
+# Códigos admin1 de GeoNames para Bolivia
+DEPARTAMENTOS_GEONAMES = {
+    '01': 'Chuquisaca', '02': 'Cochabamba', '03': 'Beni', '04': 'La Paz', '05': 'Oruro',
+    '06': 'Pando', '07': 'Potosí', '08': 'Santa Cruz', '09': 'Tarija',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa lugares al gazetteer local. Acepta el CSV de csv_data '
+        '(nombre,tipo,departamento,provincia,latitud,longitud,poblacion) '
+        'o un volcado de GeoNames (BO.txt, separado por tabs).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', nargs='?', default=ARCHIVO_POR_DEFECTO)
+        parser.add_argument('--formato', choices=['auto', 'csv', 'geonames'], default='auto')
+        parser.add_argument('--si-vacio', action='store_true',
+                            help='No hace nada si el gazetteer ya tiene datos (para despliegues)')
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['si_vacio'] and LugarGazetteer.objects.exists():
+            self.stdout.write('ℹ️ Gazetteer ya cargado, se omite la importación')
+            return
+
+        archivo = options['archivo']
+        if not os.path.exists(archivo):
+            raise CommandError(f'No existe el archivo: {archivo}')
+
+        formato = options['formato']
+        if formato == 'auto':
+            formato = 'geonames' if archivo.endswith('.txt') else 'csv'
+
+        if formato == 'geonames':
+            fuente, lugares = 'geonames', self._leer_geonames(archivo)
+        else:
+            fuente, lugares = os.path.splitext(os.path.basename(archivo))[0], self._leer_csv(archivo)
+
+        total = 0
+        with transaction.atomic():
+            # Reimportar una fuente reemplaza sus filas
+            LugarGazetteer.objects.filter(fuente=fuente).delete()
+            lote = []
+            for lugar in lugares:
+                lugar.fuente = fuente
+                lugar.nombre_normalizado = CacheGeocodificacion.normalizar(lugar.nombre)[:200]
+                lote.append(lugar)
+                if len(lote) >= options['lote']:
+                    LugarGazetteer.objects.bulk_create(lote)
+                    total += len(lote)
+                    lote = []
+            LugarGazetteer.objects.bulk_create(lote)
+            total += len(lote)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Gazetteer: {total} lugares importados desde {fuente}'))
+
+    def _leer_csv(self, archivo):
+        with open(archivo, encoding='utf-8') as f:
+            for fila in csv.DictReader(f):
+                yield LugarGazetteer(
+                    nombre=fila['nombre'].strip(),
+                    tipo=fila.get('tipo') or 'localidad',
+                    departamento=fila.get('departamento', ''),
+                    provincia=fila.get('provincia', ''),
+                    latitud=float(fila['latitud']),
+                    longitud=float(fila['longitud']),
+                    poblacion=int(fila.get('poblacion') or 0),
+                )
+
+    def _leer_geonames(self, archivo):
+        with open(archivo, encoding='utf-8') as f:
+            for linea in f:
+                campos = linea.rstrip('\n').split('\t')
+                # Solo lugares poblados (feature class P)
+                if len(campos) < 15 or campos[6] != 'P':
+                    continue
+                poblacion = int(campos[14] or 0)
+                if campos[7] in ('PPLC', 'PPLG', 'PPLA'):
+                    tipo = 'capital'
+                elif poblacion >= 20000:
+                    tipo = 'ciudad'
+                else:
+                    tipo = 'localidad'
+                yield LugarGazetteer(
+                    nombre=campos[1],
+                    tipo=tipo,
+                    departamento=DEPARTAMENTOS_GEONAMES.get(campos[10], ''),
+                    latitud=float(campos[4]),
+                    longitud=float(campos[5]),
+                    poblacion=poblacion,
+                    fuente_id=campos[0],
+                )
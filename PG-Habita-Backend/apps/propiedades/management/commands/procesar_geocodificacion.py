@@ -0,0 +1,51 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.propiedades.services.geocoding_queue import ColaGeocodificacion
+
+
+class Command(BaseCommand):
+    help = 'Worker que consume la cola de geocodificación de propiedades'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=10,
+                            help='Trabajos a reclamar por vuelta')
+        parser.add_argument('--espera', type=float, default=5.0,
+                            help='Segundos a dormir cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa lo pendiente y termina')
+
+    def handle(self, *args, **options):
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        self.stdout.write('📍 Worker de geocodificación iniciado')
+        exitos = fallos = 0
+
+        while not self.detener:
+            trabajos = ColaGeocodificacion.reclamar(options['lote'])
+            if not trabajos:
+                if options['una_vez']:
+                    break
+                time.sleep(options['espera'])
+                continue
+
+            for i, trabajo in enumerate(trabajos):
+                if self.detener:
+                    # Devolver a la cola lo reclamado y no procesado
+                    ColaGeocodificacion.liberar(trabajos[i:])
+                    break
+                if ColaGeocodificacion.procesar(trabajo):
+                    exitos += 1
+                else:
+                    fallos += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Geocodificación detenida: {exitos} exitosas, {fallos} sin coordenadas'
+        ))
+
+    def _detener(self, signum, frame):
+        self.detener = True
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:35
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0009_alter_propiedades_latitud_alter_propiedades_longitud'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propiedades',
+            index=models.Index(fields=['status', 'estado_baja', 'max_huespedes'], name='prop_publica_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedades',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['caracteristicas'], name='prop_caracteristicas_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.propiedades.services.geohash import encode
+
+
+def calcular_geohash(apps, schema_editor):
+    Propiedades = apps.get_model('propiedades', 'Propiedades')
+    pendientes = []
+    for propiedad in Propiedades.objects.filter(latitud__isnull=False, longitud__isnull=False).iterator():
+        propiedad.geohash = encode(propiedad.latitud, propiedad.longitud)
+        pendientes.append(propiedad)
+    Propiedades.objects.bulk_update(pendientes, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0010_indices_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propiedades',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, help_text='Geohash de latitud/longitud (búsquedas por cercanía)', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='propiedades',
+            index=models.Index(fields=['latitud', 'longitud'], name='prop_lat_lng_idx'),
+        ),
+        migrations.RunPython(calcular_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0011_propiedades_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LimiteTasa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('actualizado_en', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'limite_tasa',
+            },
+        ),
+        migrations.CreateModel(
+            name='GeocodificacionPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('direccion', models.TextField(max_length=200)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geocodificaciones', to='propiedades.propiedades')),
+            ],
+            options={
+                'db_table': 'geocodificacion_pendiente',
+                'ordering': ['proximo_intento'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='geocod_cola_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0012_cola_geocodificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodificacionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('coordenadas', 'Coordenadas'), ('sugerencias', 'Sugerencias')], max_length=20)),
+                ('clave', models.CharField(max_length=255)),
+                ('consulta', models.TextField(blank=True)),
+                ('resultado', models.JSONField(default=dict)),
+                ('exito', models.BooleanField(default=True)),
+                ('expira_en', models.DateTimeField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'geocodificacion_cache',
+                'indexes': [models.Index(fields=['expira_en'], name='geocod_cache_expira_idx')],
+                'unique_together': {('tipo', 'clave')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:43
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0013_cache_geocodificacion'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='LugarGazetteer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200)),
+                ('nombre_normalizado', models.CharField(max_length=200)),
+                ('tipo', models.CharField(choices=[('capital', 'Capital'), ('ciudad', 'Ciudad'), ('localidad', 'Localidad'), ('destino', 'Destino turístico')], default='localidad', max_length=20)),
+                ('departamento', models.CharField(blank=True, max_length=100)),
+                ('provincia', models.CharField(blank=True, max_length=100)),
+                ('latitud', models.FloatField()),
+                ('longitud', models.FloatField()),
+                ('poblacion', models.PositiveIntegerField(default=0)),
+                ('fuente', models.CharField(default='csv', max_length=50)),
+                ('fuente_id', models.CharField(blank=True, max_length=50)),
+            ],
+            options={
+                'db_table': 'lugar_gazetteer',
+                'ordering': ['-poblacion', 'nombre'],
+                'indexes': [models.Index(fields=['nombre_normalizado'], name='gazetteer_prefijo_idx', opclasses=['varchar_pattern_ops']), django.contrib.postgres.indexes.GinIndex(fields=['nombre_normalizado'], name='gazetteer_trgm_idx', opclasses=['gin_trgm_ops'])],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0014_gazetteer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propiedades',
+            name='direccion_geocodificada',
+            field=models.TextField(blank=True, help_text='Dirección que devolvió Nominatim (la del anfitrión no se modifica)'),
+        ),
+    ]
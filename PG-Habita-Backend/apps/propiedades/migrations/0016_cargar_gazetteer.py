@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:10
+
+import csv
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+from apps.propiedades.services.geocoding_cache import CacheGeocodificacion
+
+ARCHIVO = os.path.join(settings.BASE_DIR, 'csv_data', 'gazetteer_bolivia.csv')
+FUENTE = 'gazetteer_bolivia'
+
+
+def cargar_gazetteer(apps, schema_editor):
+    """
+    Carga el CSV incluido en el repo si el gazetteer está vacío: sin él
+    /ciudades/ y las sugerencias locales quedan vacías en los entornos que no
+    corren importar_gazetteer (solo lo hace el release del Procfile).
+    """
+    LugarGazetteer = apps.get_model('propiedades', 'LugarGazetteer')
+    if LugarGazetteer.objects.exists() or not os.path.exists(ARCHIVO):
+        return
+
+    with open(ARCHIVO, encoding='utf-8') as f:
+        LugarGazetteer.objects.bulk_create([
+            LugarGazetteer(
+                nombre=fila['nombre'].strip(),
+                nombre_normalizado=CacheGeocodificacion.normalizar(fila['nombre'])[:200],
+                tipo=fila.get('tipo') or 'localidad',
+                departamento=fila.get('departamento', ''),
+                provincia=fila.get('provincia', ''),
+                latitud=float(fila['latitud']),
+                longitud=float(fila['longitud']),
+                poblacion=int(fila.get('poblacion') or 0),
+                fuente=FUENTE,
+            )
+            for fila in csv.DictReader(f)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0015_direccion_geocodificada'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargar_gazetteer, migrations.RunPython.noop),
+    ]
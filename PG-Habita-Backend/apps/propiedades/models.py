@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.utils import timezone
 from ..usuarios.models import CustomUser as User
 
 
@@ -71,11 +73,21 @@ class Propiedades(models.Model):
         blank=True,
         help_text="Longitud de la propiedad"
     )
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        db_index=True,
+        help_text="Geohash de latitud/longitud (búsquedas por cercanía)"
+    )
     direccion_completa = models.TextField(
         max_length=200,
         blank=False,
         help_text="Dirección completa formateada"
     )
+    direccion_geocodificada = models.TextField(
+        blank=True,
+        help_text="Dirección que devolvió Nominatim (la del anfitrión no se modifica)"
+    )
     ciudad = models.CharField(max_length=50, blank=True)
     provincia = models.CharField(max_length=50, blank=True)
     pais = models.CharField(max_length=50, default='Bolivia')
@@ -91,10 +103,30 @@ class Propiedades(models.Model):
     fecha_baja_fin = models.DateField(null=True, blank=True)
     motivo_baja = models.TextField(max_length=200, blank=True)
 
+    class Meta:
+        indexes = [
+            # Catálogo público / búsqueda de disponibilidad
+            models.Index(fields=['status', 'estado_baja', 'max_huespedes'], name='prop_publica_idx'),
+            # caracteristicas @> '[...]'
+            GinIndex(fields=['caracteristicas'], opclasses=['jsonb_path_ops'], name='prop_caracteristicas_gin'),
+            # Búsqueda por área visible del mapa
+            models.Index(fields=['latitud', 'longitud'], name='prop_lat_lng_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.clean()
+        self.actualizar_geohash()
+        if kwargs.get('update_fields') is not None and {'latitud', 'longitud'} & set(kwargs['update_fields']):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'geohash'}
         super().save(*args, **kwargs)
 
+    def actualizar_geohash(self):
+        from .services.geohash import encode
+        if self.latitud is not None and self.longitud is not None:
+            self.geohash = encode(self.latitud, self.longitud)
+        else:
+            self.geohash = ''
+
     @property
     def esta_disponible(self):
         """Propiedad computada que considera tanto status como estado_baja"""
@@ -113,4 +145,114 @@ class Propiedades(models.Model):
         return self.files.all()
 
     def __str__(self):
-        return self.nombre
\ No newline at end of file
+        return self.nombre
+
+
+class GeocodificacionPendiente(models.Model):
+    """Cola persistente de geocodificación (la procesa procesar_geocodificacion)"""
+
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    propiedad = models.ForeignKey(Propiedades, on_delete=models.CASCADE, related_name='geocodificaciones')
+    direccion = models.TextField(max_length=200)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'geocodificacion_pendiente'
+        ordering = ['proximo_intento']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='geocod_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"Geocodificación #{self.id} - {self.propiedad_id} ({self.estado})"
+
+
+class LimiteTasa(models.Model):
+    """Token bucket compartido por todos los procesos (ver services/rate_limiter.py)"""
+    nombre = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField(default=0)
+    actualizado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'limite_tasa'
+
+    def __str__(self):
+        return f"{self.nombre}: {self.tokens:.2f} tokens"
+
+
+class GeocodificacionCache(models.Model):
+    """Resultados de Nominatim por dirección normalizada (ver services/geocoding_cache.py)"""
+
+    TIPOS = [
+        ('coordenadas', 'Coordenadas'),
+        ('sugerencias', 'Sugerencias'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    clave = models.CharField(max_length=255)
+    consulta = models.TextField(blank=True)
+    resultado = models.JSONField(default=dict)
+    exito = models.BooleanField(default=True)
+    expira_en = models.DateTimeField()
+    hits = models.PositiveIntegerField(default=0)
+    misses = models.PositiveIntegerField(default=0)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'geocodificacion_cache'
+        unique_together = ['tipo', 'clave']
+        indexes = [
+            models.Index(fields=['expira_en'], name='geocod_cache_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo}: {self.clave} ({'ok' if self.exito else 'sin resultado'})"
+
+
+class LugarGazetteer(models.Model):
+    """Lugares de Bolivia para autocompletado sin red (ver importar_gazetteer)"""
+
+    TIPOS = [
+        ('capital', 'Capital'),
+        ('ciudad', 'Ciudad'),
+        ('localidad', 'Localidad'),
+        ('destino', 'Destino turístico'),
+    ]
+
+    nombre = models.CharField(max_length=200)
+    nombre_normalizado = models.CharField(max_length=200)
+    tipo = models.CharField(max_length=20, choices=TIPOS, default='localidad')
+    departamento = models.CharField(max_length=100, blank=True)
+    provincia = models.CharField(max_length=100, blank=True)
+    latitud = models.FloatField()
+    longitud = models.FloatField()
+    poblacion = models.PositiveIntegerField(default=0)
+    fuente = models.CharField(max_length=50, default='csv')
+    fuente_id = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        db_table = 'lugar_gazetteer'
+        ordering = ['-poblacion', 'nombre']
+        indexes = [
+            # LIKE 'prefijo%' sobre B-tree
+            models.Index(fields=['nombre_normalizado'], name='gazetteer_prefijo_idx',
+                         opclasses=['varchar_pattern_ops']),
+            # Similitud por trigramas (pg_trgm) para errores de tipeo y palabras intermedias
+            GinIndex(fields=['nombre_normalizado'], name='gazetteer_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.departamento})"
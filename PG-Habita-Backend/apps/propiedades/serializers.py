@@ -22,9 +22,9 @@ class PropiedadesSerializer(serializers.ModelSerializer):
             'estado_baja', 'fecha_baja_inicio', 'fecha_baja_fin', 'motivo_baja',
             'esta_disponible', 'user', 'creado_en', 'actualizado_en',
             'latitud', 'longitud', 'direccion_completa', 'ciudad', 'provincia', 'pais',
-            'es_destino_turistico', 'tiene_ubicacion', 'departamento'
+            'es_destino_turistico', 'tiene_ubicacion', 'departamento', 'direccion_geocodificada'
         ]
-        read_only_fields = ['user', 'creado_en', 'actualizado_en', 'esta_disponible']
+        read_only_fields = ['user', 'creado_en', 'actualizado_en', 'esta_disponible', 'direccion_geocodificada']
         extra_kwargs = {
             'direccion_completa': {'required': True},
             'nombre': {'required': True},
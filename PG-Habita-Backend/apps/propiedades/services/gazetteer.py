@@ -0,0 +1,65 @@
+from typing import Dict, List
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+
+from ..models import LugarGazetteer
+from .geocoding_cache import CacheGeocodificacion
+
+# Umbral de similitud por palabra (pg_trgm) para sugerencias aproximadas
+SIMILITUD_MINIMA = 0.4
+
+
+class Gazetteer:
+    """
+    Autocompletado local sobre la tabla lugar_gazetteer. Primero busca por
+    prefijo (índice B-tree varchar_pattern_ops) y, si no alcanza, completa
+    con similitud por trigramas (índice GIN gin_trgm_ops), así que
+    "cochab", "potosi" o "santa cruz sierra" responden sin red.
+    """
+
+    @staticmethod
+    def buscar(query: str, limite: int = 8) -> List[LugarGazetteer]:
+        texto = CacheGeocodificacion.normalizar(query)
+        if not texto:
+            return []
+
+        lugares = list(
+            LugarGazetteer.objects.filter(nombre_normalizado__startswith=texto)
+            .order_by('-poblacion', 'nombre')[:limite]
+        )
+        if len(lugares) < limite:
+            lugares += list(
+                LugarGazetteer.objects.filter(nombre_normalizado__trigram_word_similar=texto)
+                .exclude(pk__in=[l.pk for l in lugares])
+                .annotate(similitud=TrigramWordSimilarity(texto, 'nombre_normalizado'))
+                .filter(similitud__gte=SIMILITUD_MINIMA)
+                .order_by('-similitud', '-poblacion')[:limite - len(lugares)]
+            )
+        return lugares
+
+    @staticmethod
+    def a_sugerencia(lugar: LugarGazetteer) -> Dict:
+        """Mismo formato que las sugerencias de Nominatim"""
+        partes = [lugar.nombre, lugar.departamento, 'Bolivia']
+        return {
+            'nombre': ', '.join(p for p in partes if p),
+            'latitud': lugar.latitud,
+            'longitud': lugar.longitud,
+            'ciudad': lugar.nombre,
+            'departamento': lugar.departamento,
+            'tipo': lugar.tipo,
+        }
+
+    @staticmethod
+    def ciudades(limite: int = 50) -> List[Dict]:
+        return [
+            {
+                'nombre': lugar['nombre'],
+                'departamento': lugar['departamento'],
+                'lat': lugar['latitud'],
+                'lng': lugar['longitud'],
+            }
+            for lugar in LugarGazetteer.objects.filter(tipo__in=['capital', 'ciudad'])
+            .order_by('-poblacion', 'nombre')
+            .values('nombre', 'departamento', 'latitud', 'longitud')[:limite]
+        ]
@@ -1,8 +1,12 @@
 import logging
 import requests
 from typing import Dict, List, Optional, Tuple
-from django.core.cache import cache
-from .maps_service import OpenStreetMapService
+from django.conf import settings
+from django.db.models import Q
+from . import geohash
+from .gazetteer import Gazetteer
+from .geocoding_cache import CacheGeocodificacion
+from .maps_service import OpenStreetMapService, limite_nominatim
 
 logger = logging.getLogger(__name__)
 
@@ -10,9 +14,11 @@ logger = logging.getLogger(__name__)
 class GeoService:
 
     @staticmethod
-    def actualizar_geodatos_propiedad(propiedad, direccion: Optional[str] = None) -> Tuple[bool, Dict]:
+    def actualizar_geodatos_propiedad(propiedad, direccion: Optional[str] = None,
+                                      espera_maxima: Optional[float] = None) -> Tuple[bool, Dict]:
         """
-        Actualiza los datos geográficos de una propiedad con manejo mejorado de errores
+        Actualiza los datos geográficos de una propiedad con manejo mejorado de errores.
+        espera_maxima limita cuánto se espera por el límite de Nominatim (None = sin límite).
         """
         try:
             if not direccion:
@@ -22,23 +28,10 @@ class GeoService:
                 return False, {'error': 'La dirección no puede estar vacía'}
 
             # Intentar geocodificación
-            resultado = OpenStreetMapService.obtener_coordenadas(direccion)
+            resultado = OpenStreetMapService.obtener_coordenadas(direccion, espera_maxima)
 
             if resultado['exito']:
-                # Actualizar campos de la propiedad
-                propiedad.latitud = resultado['latitud']
-                propiedad.longitud = resultado['longitud']
-                propiedad.direccion_completa = resultado.get('direccion_completa', '')
-                propiedad.ciudad = resultado.get('ciudad', '')
-                propiedad.provincia = resultado.get('provincia', '')
-                propiedad.departamento = resultado.get('departamento', '')
-                propiedad.pais = resultado.get('pais', 'Bolivia')
-
-                # Determinar si es destino turístico
-                propiedad.es_destino_turistico = GeoService._es_destino_turistico(
-                    resultado.get('ciudad', ''),
-                    resultado.get('departamento', '')
-                )
+                GeoService.aplicar_resultado(propiedad, resultado)
 
                 logger.info(f"✅ Propiedad {propiedad.nombre} geocodificada exitosamente")
                 return True, resultado
@@ -50,6 +43,23 @@ class GeoService:
             logger.error(f"❌ Error en geocodificación para propiedad {propiedad.nombre}: {str(e)}")
             return False, {'error': f'Error interno: {str(e)}'}
 
+    @staticmethod
+    def aplicar_resultado(propiedad, resultado: Dict):
+        """Copia un resultado exitoso de geocodificación a la propiedad (sin guardar)"""
+        propiedad.latitud = resultado['latitud']
+        propiedad.longitud = resultado['longitud']
+        propiedad.direccion_geocodificada = resultado.get('direccion_completa', '')
+        propiedad.ciudad = resultado.get('ciudad', '')
+        propiedad.provincia = resultado.get('provincia', '')
+        propiedad.departamento = resultado.get('departamento', '')
+        propiedad.pais = resultado.get('pais', 'Bolivia')
+
+        # Determinar si es destino turístico
+        propiedad.es_destino_turistico = GeoService._es_destino_turistico(
+            resultado.get('ciudad', ''),
+            resultado.get('departamento', '')
+        )
+
     @staticmethod
     def validar_coordenadas_bolivia(latitud: float, longitud: float) -> bool:
         """
@@ -67,40 +77,33 @@ class GeoService:
         """
         Retorna lista de ciudades principales de Bolivia para autocompletado
         """
-        ciudades = [
-            {"nombre": "Santa Cruz de la Sierra", "departamento": "Santa Cruz", "lat": -17.7833, "lng": -63.1821},
-            {"nombre": "La Paz", "departamento": "La Paz", "lat": -16.4897, "lng": -68.1193},
-            {"nombre": "El Alto", "departamento": "La Paz", "lat": -16.5048, "lng": -68.1633},
-            {"nombre": "Cochabamba", "departamento": "Cochabamba", "lat": -17.3895, "lng": -66.1568},
-            {"nombre": "Sucre", "departamento": "Chuquisaca", "lat": -19.0196, "lng": -65.2620},
-            {"nombre": "Oruro", "departamento": "Oruro", "lat": -17.9667, "lng": -67.1167},
-            {"nombre": "Tarija", "departamento": "Tarija", "lat": -21.5355, "lng": -64.7296},
-            {"nombre": "Potosí", "departamento": "Potosí", "lat": -19.5836, "lng": -65.7531},
-            {"nombre": "Sacaba", "departamento": "Cochabamba", "lat": -17.4042, "lng": -66.0408},
-            {"nombre": "Quillacollo", "departamento": "Cochabamba", "lat": -17.3972, "lng": -66.2786},
-            {"nombre": "Montero", "departamento": "Santa Cruz", "lat": -17.3333, "lng": -63.2500},
-            {"nombre": "Trinidad", "departamento": "Beni", "lat": -14.8333, "lng": -64.9000},
-            {"nombre": "Warnes", "departamento": "Santa Cruz", "lat": -17.5167, "lng": -63.1667},
-            {"nombre": "Yacuiba", "departamento": "Tarija", "lat": -22.0167, "lng": -63.6833},
-            {"nombre": "Riberalta", "departamento": "Beni", "lat": -11.0000, "lng": -66.0667},
-        ]
-
-        return ciudades
+        return Gazetteer.ciudades()
 
     @staticmethod
-    def buscar_sugerencias_ubicacion(query: str) -> List[Dict]:
+    def buscar_sugerencias_ubicacion(query: str, remoto: bool = True) -> List[Dict]:
         """
-        Busca sugerencias de ubicación para autocompletado
+        Busca sugerencias de ubicación para autocompletado.
+        Responde desde el gazetteer local; Nominatim solo si no hay coincidencias
+        y remoto=True (el límite de 1 req/s se comparte con procesar_geocodificacion).
         """
-        cache_key = f"suggestions_{query.lower().replace(' ', '_')}"
-        cached = cache.get(cache_key)
+        locales = Gazetteer.buscar(query)
+        if locales:
+            return [Gazetteer.a_sugerencia(lugar) for lugar in locales]
 
-        if cached:
+        cached = CacheGeocodificacion.obtener('sugerencias', query)
+
+        if cached is not None:
             return cached
+        if not remoto:
+            return []
+
+        # Autocompletado: no esperar más de 2s por el límite compartido
+        if not limite_nominatim.adquirir(timeout=2):
+            return []
 
         try:
             response = requests.get(
-                "https://nominatim.openstreetmap.org/search",
+                f"{getattr(settings, 'NOMINATIM_URL', 'https://nominatim.openstreetmap.org').rstrip('/')}/search",
                 params={
                     'q': f"{query}, Bolivia",
                     'format': 'json',
@@ -131,7 +134,7 @@ class GeoService:
                         'tipo': address.get('type', 'ubicación')
                     })
 
-                cache.set(cache_key, sugerencias, 60 * 60 * 24)  # Cache por 24 horas
+                CacheGeocodificacion.guardar('sugerencias', query, sugerencias, exito=bool(sugerencias))
                 return sugerencias
 
             return []
@@ -140,6 +143,42 @@ class GeoService:
             logger.error(f"Error buscando sugerencias: {str(e)}")
             return []
 
+    @staticmethod
+    def propiedades_cercanas(queryset, latitud: float, longitud: float, radio_km: float,
+                             limite: int = 100) -> List[Tuple[object, float]]:
+        """
+        Propiedades a menos de radio_km del punto, ordenadas por distancia.
+        Prefiltra con prefijos geohash (índice B-tree) y el rectángulo
+        que contiene el círculo; la distancia exacta se calcula solo
+        sobre esos candidatos.
+        """
+        prefijos = Q()
+        for celda in geohash.celdas_cobertura(latitud, longitud, radio_km):
+            prefijos |= Q(geohash__startswith=celda)
+
+        delta_lat = radio_km / geohash.KM_POR_GRADO
+        candidatos = queryset.filter(prefijos).filter(
+            latitud__range=(latitud - delta_lat, latitud + delta_lat)
+        )
+
+        resultados = []
+        for propiedad in candidatos:
+            distancia = geohash.distancia_km(latitud, longitud, propiedad.latitud, propiedad.longitud)
+            if distancia <= radio_km:
+                resultados.append((propiedad, distancia))
+
+        resultados.sort(key=lambda item: item[1])
+        return resultados[:limite]
+
+    @staticmethod
+    def propiedades_en_area(queryset, sur: float, oeste: float, norte: float, este: float):
+        """Propiedades dentro del rectángulo visible del mapa"""
+        queryset = queryset.filter(latitud__range=(sur, norte))
+        if oeste <= este:
+            return queryset.filter(longitud__range=(oeste, este))
+        # El área cruza el antimeridiano
+        return queryset.filter(Q(longitud__gte=oeste) | Q(longitud__lte=este))
+
     @staticmethod
     def _es_destino_turistico(ciudad: str, departamento: str) -> bool:
         """
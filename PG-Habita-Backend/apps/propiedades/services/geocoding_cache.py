@@ -0,0 +1,110 @@
+import re
+from datetime import timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from apps.texto import normalizar
+from ..models import GeocodificacionCache
+
+# "Nº 123", "N° 123", "No. 123", "Nro 123" -> "n 123" (antes de quitar acentos, NFKD convierte º en o)
+NUMERO = re.compile(r'\bn(?:ro|[º°o])\.?\s*(?=\d)', re.IGNORECASE)
+# Indicadores ordinales y grado sueltos ("1º piso", "2ª calle")
+ORDINALES = str.maketrans('', '', 'º°ª')
+
+# TTL por defecto en segundos (tipo, exito) -> segundos
+TTL_POR_DEFECTO = {
+    ('coordenadas', True): 60 * 60 * 24 * 30,
+    ('coordenadas', False): 60 * 60 * 24,
+    ('sugerencias', True): 60 * 60 * 24 * 7,
+    ('sugerencias', False): 60 * 60 * 24,
+}
+
+
+class CacheGeocodificacion:
+    """
+    Cache de geocodificación en base de datos, compartido por todos los
+    workers y persistente entre despliegues. Las claves se normalizan para
+    que "Av. Busch  Nº 123" y "av busch n 123" sean la misma entrada.
+    Los "no encontrado" también se guardan (con TTL más corto); los errores
+    transitorios no.
+    """
+
+    @staticmethod
+    def normalizar(texto: str) -> str:
+        return normalizar(NUMERO.sub('n ', texto or '').translate(ORDINALES))
+
+    @staticmethod
+    def ttl(tipo: str, exito: bool) -> int:
+        configurados = getattr(settings, 'GEOCODIFICACION_CACHE_TTL', {})
+        return configurados.get(f"{tipo}_{'ok' if exito else 'negativo'}", TTL_POR_DEFECTO[(tipo, exito)])
+
+    @staticmethod
+    def obtener(tipo: str, consulta: str, contar_hit: bool = True):
+        """Resultado guardado y vigente, o None. Cuenta un hit si lo encuentra (y contar_hit)."""
+        clave = CacheGeocodificacion.normalizar(consulta)
+        if not clave:
+            return None
+
+        entrada = GeocodificacionCache.objects.filter(
+            tipo=tipo, clave=clave, expira_en__gt=timezone.now()
+        ).values('pk', 'resultado').first()
+        if entrada is None:
+            return None
+
+        if contar_hit:
+            GeocodificacionCache.objects.filter(pk=entrada['pk']).update(
+                hits=F('hits') + 1, actualizado_en=timezone.now()
+            )
+        return entrada['resultado']
+
+    @staticmethod
+    def guardar(tipo: str, consulta: str, resultado, exito: bool = True):
+        """Guarda el resultado de una consulta remota (cuenta como miss)"""
+        clave = CacheGeocodificacion.normalizar(consulta)
+        if not clave:
+            return
+
+        valores = {
+            'consulta': consulta,
+            'resultado': resultado,
+            'exito': exito,
+            'expira_en': timezone.now() + timedelta(seconds=CacheGeocodificacion.ttl(tipo, exito)),
+        }
+        actualizados = GeocodificacionCache.objects.filter(tipo=tipo, clave=clave).update(
+            misses=F('misses') + 1, actualizado_en=timezone.now(), **valores
+        )
+        if actualizados:
+            return
+
+        try:
+            with transaction.atomic():
+                GeocodificacionCache.objects.create(tipo=tipo, clave=clave, misses=1, **valores)
+        except IntegrityError:
+            # Otro worker la creó primero
+            GeocodificacionCache.objects.filter(tipo=tipo, clave=clave).update(
+                misses=F('misses') + 1, actualizado_en=timezone.now(), **valores
+            )
+
+    @staticmethod
+    def purgar_expiradas() -> int:
+        eliminadas, _ = GeocodificacionCache.objects.filter(expira_en__lte=timezone.now()).delete()
+        return eliminadas
+
+    @staticmethod
+    def estadisticas() -> Dict:
+        datos = GeocodificacionCache.objects.aggregate(
+            entradas=Count('id'),
+            negativas=Count('id', filter=Q(exito=False)),
+            expiradas=Count('id', filter=Q(expira_en__lte=timezone.now())),
+            hits=Sum('hits'),
+            misses=Sum('misses'),
+        )
+        datos['hits'] = datos['hits'] or 0
+        datos['misses'] = datos['misses'] or 0
+        total = datos['hits'] + datos['misses']
+        datos['tasa_aciertos'] = round(datos['hits'] / total * 100, 2) if total else 0
+        return datos
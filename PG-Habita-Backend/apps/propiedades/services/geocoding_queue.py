@@ -0,0 +1,110 @@
+import logging
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import GeocodificacionPendiente, Propiedades
+from .geo_service import GeoService
+
+logger = logging.getLogger(__name__)
+
+# Campos que escribe la geocodificación (no pisa otros cambios del anfitrión,
+# tampoco la dirección que escribió)
+CAMPOS_GEO = [
+    'latitud', 'longitud', 'direccion_geocodificada', 'ciudad', 'provincia',
+    'departamento', 'pais', 'es_destino_turistico', 'actualizado_en',
+]
+
+
+class ColaGeocodificacion:
+    """
+    Cola de geocodificación en base de datos. Las vistas solo encolan;
+    el comando procesar_geocodificacion consume los trabajos con
+    SELECT ... FOR UPDATE SKIP LOCKED, así que se pueden correr varios workers.
+    """
+
+    @staticmethod
+    def max_intentos() -> int:
+        return getattr(settings, 'GEOCODIFICACION_MAX_INTENTOS', 5)
+
+    @staticmethod
+    def backoff(intentos: int) -> timedelta:
+        """Espera exponencial: 30s, 60s, 120s... hasta 1 hora"""
+        base = getattr(settings, 'GEOCODIFICACION_BACKOFF_BASE', 30)
+        return timedelta(seconds=min(base * (2 ** max(intentos - 1, 0)), 3600))
+
+    @staticmethod
+    def encolar(propiedad: Propiedades, direccion: Optional[str] = None) -> Optional[GeocodificacionPendiente]:
+        direccion = (direccion or propiedad.direccion_completa or '').strip()
+        if not direccion:
+            return None
+
+        # Si ya hay un trabajo pendiente para la propiedad, se reemplaza la dirección
+        actualizados = GeocodificacionPendiente.objects.filter(
+            propiedad=propiedad, estado='pendiente'
+        ).update(
+            direccion=direccion, intentos=0, proximo_intento=timezone.now(),
+            ultimo_error='', actualizado_en=timezone.now()
+        )
+        if actualizados:
+            return GeocodificacionPendiente.objects.filter(propiedad=propiedad, estado='pendiente').first()
+
+        return GeocodificacionPendiente.objects.create(propiedad=propiedad, direccion=direccion)
+
+    @staticmethod
+    def reclamar(lote: int = 10) -> List[GeocodificacionPendiente]:
+        """Toma trabajos vencidos (o abandonados por un worker caído)"""
+        ahora = timezone.now()
+        abandonado = ahora - timedelta(seconds=getattr(settings, 'GEOCODIFICACION_TIMEOUT_TRABAJO', 600))
+
+        with transaction.atomic():
+            trabajos = list(
+                GeocodificacionPendiente.objects.select_for_update(skip_locked=True).filter(
+                    Q(estado='pendiente', proximo_intento__lte=ahora) |
+                    Q(estado='procesando', actualizado_en__lt=abandonado)
+                ).order_by('proximo_intento')[:lote]
+            )
+            ids = [t.pk for t in trabajos]
+            if ids:
+                GeocodificacionPendiente.objects.filter(pk__in=ids).update(
+                    estado='procesando', actualizado_en=ahora
+                )
+        return trabajos
+
+    @staticmethod
+    def liberar(trabajos: List[GeocodificacionPendiente]):
+        GeocodificacionPendiente.objects.filter(
+            pk__in=[t.pk for t in trabajos], estado='procesando'
+        ).update(estado='pendiente', actualizado_en=timezone.now())
+
+    @staticmethod
+    def procesar(trabajo: GeocodificacionPendiente) -> bool:
+        """Geocodifica un trabajo ya reclamado. True si la propiedad quedó con coordenadas."""
+        try:
+            propiedad = Propiedades.objects.get(pk=trabajo.propiedad_id)
+        except Propiedades.DoesNotExist:
+            trabajo.delete()
+            return False
+
+        trabajo.intentos += 1
+        exito, resultado = GeoService.actualizar_geodatos_propiedad(propiedad, trabajo.direccion)
+
+        if exito:
+            propiedad.save(update_fields=CAMPOS_GEO)
+            trabajo.estado = 'completada'
+            trabajo.ultimo_error = ''
+        elif resultado.get('reintentar') and trabajo.intentos < ColaGeocodificacion.max_intentos():
+            trabajo.estado = 'pendiente'
+            trabajo.proximo_intento = timezone.now() + ColaGeocodificacion.backoff(trabajo.intentos)
+            trabajo.ultimo_error = resultado.get('error', '')
+        else:
+            trabajo.estado = 'fallida'
+            trabajo.ultimo_error = resultado.get('error', 'Error desconocido')
+            logger.warning(f"⚠️ Geocodificación fallida para propiedad {propiedad.pk}: {trabajo.ultimo_error}")
+
+        trabajo.save(update_fields=['estado', 'intentos', 'proximo_intento', 'ultimo_error', 'actualizado_en'])
+        return exito
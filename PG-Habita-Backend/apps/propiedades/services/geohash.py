@@ -0,0 +1,110 @@
+"""
+Geohash (base32) para indexar latitud/longitud en una columna de texto.
+Las celdas que comparten prefijo están cerca, así que una búsqueda por
+radio se reduce a unos pocos `geohash LIKE 'abc%'` sobre un índice B-tree.
+"""
+import math
+from typing import List, Tuple
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {c: i for i, c in enumerate(BASE32)}
+
+PRECISION = 9  # ~4.8 m x 4.8 m
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+
+def encode(latitud: float, longitud: float, precision: int = PRECISION) -> str:
+    lat_rango = [-90.0, 90.0]
+    lng_rango = [-180.0, 180.0]
+    resultado = []
+    bit, valor, es_lng = 0, 0, True
+
+    while len(resultado) < precision:
+        rango, coord = (lng_rango, longitud) if es_lng else (lat_rango, latitud)
+        medio = (rango[0] + rango[1]) / 2
+        if coord >= medio:
+            valor = (valor << 1) | 1
+            rango[0] = medio
+        else:
+            valor <<= 1
+            rango[1] = medio
+        es_lng = not es_lng
+        bit += 1
+        if bit == 5:
+            resultado.append(BASE32[valor])
+            bit, valor = 0, 0
+
+    return ''.join(resultado)
+
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lng_min, lng_max) de la celda"""
+    lat_rango = [-90.0, 90.0]
+    lng_rango = [-180.0, 180.0]
+    es_lng = True
+
+    for c in geohash:
+        valor = _DECODE[c]
+        for desplazamiento in range(4, -1, -1):
+            rango = lng_rango if es_lng else lat_rango
+            medio = (rango[0] + rango[1]) / 2
+            if (valor >> desplazamiento) & 1:
+                rango[0] = medio
+            else:
+                rango[1] = medio
+            es_lng = not es_lng
+
+    return lat_rango[0], lat_rango[1], lng_rango[0], lng_rango[1]
+
+
+def tamano_celda(precision: int) -> Tuple[float, float]:
+    """Alto y ancho de una celda en grados"""
+    bits = precision * 5
+    bits_lng = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lng)
+
+
+def vecinos(geohash: str) -> List[str]:
+    """La celda y sus 8 vecinas (sin repetir cerca de los polos)"""
+    lat_min, lat_max, lng_min, lng_max = bounds(geohash)
+    alto, ancho = lat_max - lat_min, lng_max - lng_min
+    lat_c, lng_c = (lat_min + lat_max) / 2, (lng_min + lng_max) / 2
+
+    celdas = []
+    for d_lat in (-1, 0, 1):
+        lat = lat_c + d_lat * alto
+        if lat < -90 or lat > 90:
+            continue
+        for d_lng in (-1, 0, 1):
+            lng = (lng_c + d_lng * ancho + 180) % 360 - 180
+            celda = encode(lat, lng, len(geohash))
+            if celda not in celdas:
+                celdas.append(celda)
+    return celdas
+
+
+def precision_para_radio(radio_km: float, latitud: float) -> int:
+    """Mayor precisión cuya celda mide al menos radio_km por lado"""
+    coseno = max(math.cos(math.radians(latitud)), 0.01)
+    for precision in range(PRECISION, 0, -1):
+        alto, ancho = tamano_celda(precision)
+        if min(alto * KM_POR_GRADO, ancho * KM_POR_GRADO * coseno) >= radio_km:
+            return precision
+    return 1
+
+
+def celdas_cobertura(latitud: float, longitud: float, radio_km: float) -> List[str]:
+    """Prefijos que cubren el círculo (celda central + vecinas)"""
+    precision = precision_para_radio(radio_km, latitud)
+    return vecinos(encode(latitud, longitud, precision))
+
+
+def distancia_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia haversine en kilómetros"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    d_lat = p2 - p1
+    d_lng = math.radians(lng2 - lng1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(d_lng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
@@ -1,22 +1,31 @@
 
 import requests
-from django.core.cache import cache
-import time
+from django.conf import settings
+
+from .geocoding_cache import CacheGeocodificacion
+from .rate_limiter import TokenBucket
+
+# Límite global de Nominatim (1 req/s), compartido entre procesos
+limite_nominatim = TokenBucket(
+    'nominatim',
+    tasa=getattr(settings, 'GEOCODIFICACION_TASA', 1.0),
+)
 
 
 class OpenStreetMapService:
     @staticmethod
-    def obtener_coordenadas(direccion):
+    def obtener_coordenadas(direccion, espera_maxima=None):
         """
-        Obtiene latitud y longitud usando Nominatim - Adaptado para Bolivia
+        Obtiene latitud y longitud usando Nominatim - Adaptado para Bolivia.
+        Los errores transitorios (timeout, HTTP, límite) llevan 'reintentar': True
+        y no se guardan en cache.
         """
-        # Verificar cache primero
-        cache_key = f"geocoding_{direccion.replace(' ', '_').lower()}"
-        cached_result = cache.get(cache_key)
+        # Verificar cache primero (compartido en base de datos)
+        cached_result = CacheGeocodificacion.obtener('coordenadas', direccion)
         if cached_result:
             return cached_result
 
-        url = "https://nominatim.openstreetmap.org/search"
+        url = f"{getattr(settings, 'NOMINATIM_URL', 'https://nominatim.openstreetmap.org').rstrip('/')}/search"
 
         # Parámetros específicos para Bolivia
         params = {
@@ -34,11 +43,15 @@ class OpenStreetMapService:
             'Referer': 'https://habita.com'
         }
 
-        try:
-            # Respeta el rate limiting (1 request/segundo)
-            time.sleep(1)
+        # Respeta el rate limiting (1 request/segundo entre todos los workers)
+        if not limite_nominatim.adquirir(timeout=espera_maxima):
+            return {'exito': False, 'error': 'Límite de solicitudes alcanzado', 'reintentar': True}
 
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+        try:
+            response = requests.get(
+                url, params=params, headers=headers,
+                timeout=getattr(settings, 'NOMINATIM_TIMEOUT', 10)
+            )
 
             if response.status_code == 200:
                 data = response.json()
@@ -79,26 +92,20 @@ class OpenStreetMapService:
                     }
 
                     # Cache por 30 días
-                    cache.set(cache_key, respuesta, 60 * 60 * 24 * 30)
+                    CacheGeocodificacion.guardar('coordenadas', direccion, respuesta)
                     return respuesta
                 else:
                     respuesta = {'exito': False, 'error': 'Dirección no encontrada'}
-                    cache.set(cache_key, respuesta, 60 * 60 * 24)
+                    CacheGeocodificacion.guardar('coordenadas', direccion, respuesta, exito=False)
                     return respuesta
 
             else:
-                respuesta = {'exito': False, 'error': f'Error HTTP {response.status_code}'}
-                cache.set(cache_key, respuesta, 60 * 60)
-                return respuesta
+                return {'exito': False, 'error': f'Error HTTP {response.status_code}', 'reintentar': True}
 
         except requests.exceptions.Timeout:
-            respuesta = {'exito': False, 'error': 'Timeout - Servicio no disponible'}
-            cache.set(cache_key, respuesta, 60 * 10)
-            return respuesta
+            return {'exito': False, 'error': 'Timeout - Servicio no disponible', 'reintentar': True}
         except Exception as e:
-            respuesta = {'exito': False, 'error': f'Error: {str(e)}'}
-            cache.set(cache_key, respuesta, 60 * 60)
-            return respuesta
+            return {'exito': False, 'error': f'Error: {str(e)}', 'reintentar': True}
 
 
 # 🔥 AGREGAR ESTA LÍNEA PARA MANTENER COMPATIBILIDAD
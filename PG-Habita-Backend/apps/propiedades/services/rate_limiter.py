@@ -0,0 +1,52 @@
+import time
+from typing import Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+
+class TokenBucket:
+    """
+    Token bucket guardado en la tabla limite_tasa. La fila se bloquea con
+    SELECT ... FOR UPDATE, así que todos los workers y procesos web
+    comparten el mismo límite (ej. 1 solicitud/segundo a Nominatim).
+    """
+
+    def __init__(self, nombre: str, tasa: float = 1.0, capacidad: float = 1.0):
+        self.nombre = nombre
+        self.tasa = tasa
+        self.capacidad = capacidad
+
+    def _intentar(self) -> float:
+        """Consume un token si hay; si no, retorna los segundos a esperar"""
+        from ..models import LimiteTasa
+
+        with transaction.atomic():
+            LimiteTasa.objects.get_or_create(
+                nombre=self.nombre,
+                defaults={'tokens': self.capacidad}
+            )
+            bucket = LimiteTasa.objects.select_for_update().get(nombre=self.nombre)
+
+            ahora = timezone.now()
+            transcurrido = max((ahora - bucket.actualizado_en).total_seconds(), 0)
+            tokens = min(self.capacidad, bucket.tokens + transcurrido * self.tasa)
+
+            if tokens >= 1:
+                bucket.tokens = tokens - 1
+                bucket.actualizado_en = ahora
+                bucket.save(update_fields=['tokens', 'actualizado_en'])
+                return 0
+
+            return (1 - tokens) / self.tasa
+
+    def adquirir(self, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta obtener un token. False si se supera el timeout."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            espera = self._intentar()
+            if espera == 0:
+                return True
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            time.sleep(espera)
@@ -1,3 +1,293 @@
-from django.test import TestCase
+import json
+import math
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.roles.models import Rol
+from apps.usuarios.models import CustomUser
+from .models import GeocodificacionCache, GeocodificacionPendiente, LimiteTasa, Propiedades
+from .services import geohash
+from .services.geocoding_queue import ColaGeocodificacion
+from .services.maps_service import OpenStreetMapService, limite_nominatim
+from .services.rate_limiter import TokenBucket
+
+
+class GeohashTest(SimpleTestCase):
+
+    def test_encode_y_bounds(self):
+        # Ejemplo de referencia de geohash.org
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+        lat_min, lat_max, lng_min, lng_max = geohash.bounds(geohash.encode(-17.7833, -63.1821))
+        self.assertTrue(lat_min <= -17.7833 <= lat_max)
+        self.assertTrue(lng_min <= -63.1821 <= lng_max)
+
+    def test_vecinos_sin_repetir(self):
+        celda = geohash.encode(-17.7833, -63.1821, 6)
+        vecinos = geohash.vecinos(celda)
+
+        self.assertEqual(len(vecinos), 9)
+        self.assertEqual(len(set(vecinos)), 9)
+        self.assertIn(celda, vecinos)
+        self.assertTrue(all(len(v) == 6 for v in vecinos))
+
+    def test_precision_baja_con_el_radio(self):
+        precisiones = [geohash.precision_para_radio(r, -17.78) for r in (0.01, 0.5, 5, 50, 500)]
+        self.assertEqual(precisiones, sorted(precisiones, reverse=True))
+
+    def test_cobertura_incluye_todo_el_circulo(self):
+        # Puntos en el borde del círculo (y en el centro) caen en alguna celda de la cobertura
+        for latitud, longitud in [(-17.7833, -63.1821), (-16.5, -68.15), (0.0, 0.0), (59.9, 10.75)]:
+            for radio_km in (0.3, 2, 10, 80):
+                celdas = geohash.celdas_cobertura(latitud, longitud, radio_km)
+                precision = len(celdas[0])
+                for grados in range(0, 360, 15):
+                    rumbo = math.radians(grados)
+                    distancia = radio_km * 0.99
+                    lat = latitud + distancia * math.cos(rumbo) / geohash.KM_POR_GRADO
+                    lng = longitud + distancia * math.sin(rumbo) / (
+                        geohash.KM_POR_GRADO * math.cos(math.radians(latitud))
+                    )
+                    with self.subTest(latitud=latitud, radio_km=radio_km, grados=grados):
+                        self.assertLessEqual(geohash.distancia_km(latitud, longitud, lat, lng), radio_km)
+                        self.assertIn(geohash.encode(lat, lng, precision), celdas)
+
+    def test_distancia_km(self):
+        self.assertEqual(geohash.distancia_km(-17.78, -63.18, -17.78, -63.18), 0)
+        # Un grado de latitud ~ 111 km
+        self.assertAlmostEqual(geohash.distancia_km(0, 0, 1, 0), 111.2, delta=0.2)
+
+
+class TokenBucketTest(TestCase):
+
+    def test_consume_hasta_la_capacidad(self):
+        bucket = TokenBucket('pruebas', tasa=1.0, capacidad=2.0)
+
+        self.assertEqual(bucket._intentar(), 0)
+        self.assertEqual(bucket._intentar(), 0)
+        espera = bucket._intentar()
+        self.assertGreater(espera, 0)
+        self.assertLessEqual(espera, 1)
+        self.assertFalse(bucket.adquirir(timeout=0))
+
+    def test_se_recarga_con_el_tiempo(self):
+        bucket = TokenBucket('pruebas', tasa=1.0, capacidad=1.0)
+        ahora = timezone.now()
+
+        with mock.patch('apps.propiedades.services.rate_limiter.timezone.now', return_value=ahora):
+            self.assertEqual(bucket._intentar(), 0)
+            self.assertGreater(bucket._intentar(), 0)
+        with mock.patch('apps.propiedades.services.rate_limiter.timezone.now', return_value=ahora + timedelta(seconds=1)):
+            self.assertEqual(bucket._intentar(), 0)
+
+    def test_instancias_con_el_mismo_nombre_comparten_el_limite(self):
+        self.assertEqual(TokenBucket('pruebas').adquirir(timeout=0), True)
+        self.assertEqual(TokenBucket('pruebas').adquirir(timeout=0), False)
+        self.assertEqual(LimiteTasa.objects.filter(nombre='pruebas').count(), 1)
+
+
+class ServidorNominatim:
+    """
+    Nominatim de prueba en un puerto local. Responde en orden las respuestas
+    encoladas con responder() ((status, cuerpo, demora)) y guarda las consultas.
+    """
+
+    def __init__(self):
+        self.respuestas = []
+        self.consultas = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                servidor.consultas.append({'ruta': url.path, 'params': parse_qs(url.query), 'headers': dict(self.headers)})
+                status, cuerpo, demora = servidor.respuestas.pop(0) if servidor.respuestas else (500, [], 0)
+                if demora:
+                    time.sleep(demora)
+                contenido = json.dumps(cuerpo).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(contenido)))
+                self.end_headers()
+                self.wfile.write(contenido)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self.url = f'http://127.0.0.1:{self.http.server_address[1]}'
+        self.hilo = threading.Thread(target=self.http.serve_forever, daemon=True)
+
+    def responder(self, status=200, cuerpo=None, demora=0):
+        self.respuestas.append((status, cuerpo if cuerpo is not None else [], demora))
+
+    def iniciar(self):
+        self.hilo.start()
+
+    def detener(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+def resultado_nominatim(display_name='Avenida Busch 123, Santa Cruz de la Sierra, Bolivia'):
+    return [{
+        'lat': '-17.7747', 'lon': '-63.1747', 'display_name': display_name,
+        'address': {'city': 'Santa Cruz de la Sierra', 'state_district': 'Andrés Ibáñez', 'state': 'Santa Cruz'},
+    }]
+
+
+class NominatimTestCase(TestCase):
+    """Servidor de prueba + límite de Nominatim holgado para no esperar entre consultas"""
+
+    def setUp(self):
+        self.servidor = ServidorNominatim()
+        self.servidor.iniciar()
+        self.addCleanup(self.servidor.detener)
+
+        ajustes = override_settings(NOMINATIM_URL=self.servidor.url, NOMINATIM_TIMEOUT=0.5,
+                                    GEOCODIFICACION_BACKOFF_BASE=30, GEOCODIFICACION_MAX_INTENTOS=3)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        for atributo in ('tasa', 'capacidad'):
+            parche = mock.patch.object(limite_nominatim, atributo, 1000.0)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+
+class OpenStreetMapServiceTest(NominatimTestCase):
+
+    def test_exito_se_guarda_en_cache(self):
+        self.servidor.responder(cuerpo=resultado_nominatim())
+
+        resultado = OpenStreetMapService.obtener_coordenadas('Av. Busch Nº 123')
+
+        self.assertTrue(resultado['exito'])
+        self.assertEqual((resultado['latitud'], resultado['longitud']), (-17.7747, -63.1747))
+        self.assertEqual(resultado['ciudad'], 'Santa Cruz de la Sierra')
+        self.assertEqual(resultado['departamento'], 'Santa Cruz')
+        consulta = self.servidor.consultas[0]
+        self.assertEqual(consulta['ruta'], '/search')
+        self.assertEqual(consulta['params']['q'], ['Av. Busch Nº 123, Santa Cruz, Bolivia'])
+        self.assertIn('HabitaApp', consulta['headers']['User-Agent'])
+
+        # La misma dirección escrita distinto sale del cache
+        self.assertTrue(OpenStreetMapService.obtener_coordenadas('av busch n 123')['exito'])
+        self.assertEqual(len(self.servidor.consultas), 1)
+
+    def test_no_encontrada_se_guarda_como_negativo(self):
+        self.servidor.responder(cuerpo=[])
+
+        resultado = OpenStreetMapService.obtener_coordenadas('Calle que no existe')
+
+        self.assertFalse(resultado['exito'])
+        self.assertNotIn('reintentar', resultado)
+        self.assertFalse(OpenStreetMapService.obtener_coordenadas('Calle que no existe')['exito'])
+        self.assertEqual(len(self.servidor.consultas), 1)
+        self.assertFalse(GeocodificacionCache.objects.get().exito)
+
+    def test_error_http_se_reintenta_y_no_se_guarda(self):
+        self.servidor.responder(status=503)
+        self.servidor.responder(cuerpo=resultado_nominatim())
+
+        resultado = OpenStreetMapService.obtener_coordenadas('Av. Busch 123')
+
+        self.assertEqual(resultado, {'exito': False, 'error': 'Error HTTP 503', 'reintentar': True})
+        self.assertFalse(GeocodificacionCache.objects.exists())
+        self.assertTrue(OpenStreetMapService.obtener_coordenadas('Av. Busch 123')['exito'])
+        self.assertEqual(len(self.servidor.consultas), 2)
+
+    def test_timeout_se_reintenta(self):
+        self.servidor.responder(cuerpo=resultado_nominatim(), demora=1.5)
+
+        resultado = OpenStreetMapService.obtener_coordenadas('Av. Busch 123')
+
+        self.assertFalse(resultado['exito'])
+        self.assertTrue(resultado['reintentar'])
+        self.assertFalse(GeocodificacionCache.objects.exists())
+
+    def test_sin_tokens_no_consulta(self):
+        with mock.patch.object(limite_nominatim, 'tasa', 0.001), mock.patch.object(limite_nominatim, 'capacidad', 1.0):
+            LimiteTasa.objects.update_or_create(nombre=limite_nominatim.nombre, defaults={'tokens': 0})
+
+            resultado = OpenStreetMapService.obtener_coordenadas('Av. Busch 123', espera_maxima=0)
+
+        self.assertEqual(resultado['error'], 'Límite de solicitudes alcanzado')
+        self.assertTrue(resultado['reintentar'])
+        self.assertEqual(self.servidor.consultas, [])
+
+
+class ProcesarGeocodificacionTest(NominatimTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rol, _ = Rol.objects.get_or_create(nombre='PRUEBAS')
+        anfitrion = CustomUser.objects.create_user(
+            username='anfitrion_geo', correo='anfitrion_geo@example.com', N_Cel='70000001',
+            password='clave-de-prueba', rol=rol,
+        )
+        self.propiedad = Propiedades.objects.create(
+            user=anfitrion, nombre='Casa Busch', descripcion='Casa de prueba', tipo='casa',
+            precio_noche=100, direccion_completa='Av. Busch Nº 123',
+        )
+        self.trabajo = ColaGeocodificacion.encolar(self.propiedad)
+
+    def procesar(self):
+        call_command('procesar_geocodificacion', '--una-vez', stdout=mock.MagicMock())
+        self.trabajo.refresh_from_db()
+        self.propiedad.refresh_from_db()
+
+    def test_reintenta_con_backoff_y_completa(self):
+        self.servidor.responder(status=503)
+        self.servidor.responder(cuerpo=resultado_nominatim())
+
+        self.procesar()
+
+        self.assertEqual(self.trabajo.estado, 'pendiente')
+        self.assertEqual(self.trabajo.intentos, 1)
+        self.assertEqual(self.trabajo.ultimo_error, 'Error HTTP 503')
+        self.assertGreater(self.trabajo.proximo_intento, timezone.now() + timedelta(seconds=25))
+        self.assertIsNone(self.propiedad.latitud)
+
+        # Antes del backoff no se vuelve a reclamar
+        self.procesar()
+        self.assertEqual(len(self.servidor.consultas), 1)
+
+        GeocodificacionPendiente.objects.filter(pk=self.trabajo.pk).update(proximo_intento=timezone.now())
+        self.procesar()
+
+        self.assertEqual(self.trabajo.estado, 'completada')
+        self.assertEqual(self.trabajo.intentos, 2)
+        self.assertEqual((self.propiedad.latitud, self.propiedad.longitud), (-17.7747, -63.1747))
+        self.assertEqual(self.propiedad.geohash, geohash.encode(-17.7747, -63.1747))
+        # La dirección del anfitrión no se pisa con la de Nominatim
+        self.assertEqual(self.propiedad.direccion_completa, 'Av. Busch Nº 123')
+        self.assertEqual(self.propiedad.direccion_geocodificada, 'Avenida Busch 123, Santa Cruz de la Sierra, Bolivia')
+
+    def test_falla_al_agotar_los_intentos(self):
+        for _ in range(3):
+            self.servidor.responder(status=502)
+
+        for _ in range(3):
+            GeocodificacionPendiente.objects.filter(pk=self.trabajo.pk).update(proximo_intento=timezone.now())
+            self.procesar()
+
+        self.assertEqual(self.trabajo.estado, 'fallida')
+        self.assertEqual(self.trabajo.intentos, 3)
+        self.assertEqual(len(self.servidor.consultas), 3)
+
+    def test_direccion_no_encontrada_falla_sin_reintentar(self):
+        self.servidor.responder(cuerpo=[])
+
+        self.procesar()
+
+        self.assertEqual(self.trabajo.estado, 'fallida')
+        self.assertEqual(self.trabajo.ultimo_error, 'Dirección no encontrada')
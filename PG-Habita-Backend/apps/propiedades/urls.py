@@ -1,13 +1,18 @@
 from django.urls import path
-from .views import PropiedadesList, PropiedadesCUD, PropiedadesPublicList
+from .views import PropiedadesList, PropiedadesCUD, PropiedadesPublicList, PropiedadesDisponiblesList
 from . import views
 
 urlpatterns = [
     path('',PropiedadesList.as_view(), name='propiedadesList'),
     path('<int:pk>/',PropiedadesCUD.as_view(), name='propiedadesCUD'),
     path('public/', PropiedadesPublicList.as_view(), name='propiedades_public'),
+    path('public/disponibles/', PropiedadesDisponiblesList.as_view(), name='propiedades_disponibles'),
+    path('public/cercanas/', views.propiedades_cercanas, name='propiedades_cercanas'),
+    path('public/mapa/', views.propiedades_en_mapa, name='propiedades_en_mapa'),
     path('<int:pk>/dar-baja/', views.dar_baja_propiedad, name='propiedades_dar_baja'),
     path('<int:pk>/reactivar/', views.reactivar_propiedad, name='propiedades_reactivar'),
+    path('ubicaciones/sugerencias/', views.sugerencias_ubicacion, name='sugerencias_ubicacion'),
+    path('ubicaciones/ciudades/', views.ciudades_bolivia, name='ciudades_bolivia'),
     path('geocodificar/', views.geocodificar_direccion, name='geocodificar_direccion'),
     path('<int:pk>/actualizar-ubicacion/', views.actualizar_ubicacion_propiedad, name='actualizar_ubicacion'),
     path('<int:pk>/obtener-ubicacion/', views.obtener_ubicacion_propiedad, name='obtener_ubicacion'),
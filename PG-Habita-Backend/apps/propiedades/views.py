@@ -1,9 +1,15 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.db.models import Exists, OuterRef
 from .serializers import PropiedadesSerializer, DarBajaPropiedadSerializer
 from .models import Propiedades
 from django_filters.rest_framework import DjangoFilterBackend
@@ -11,6 +17,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 # Importar nuestros servicios
 from .services.maps_service import OpenStreetMapService
 from .services.geo_service import GeoService
+from .services.geocoding_queue import ColaGeocodificacion
+from apps.reservas.services import DisponibilidadService
+
+# Segundos máximos que una vista síncrona espera por el límite de Nominatim
+ESPERA_GEOCODIFICACION_SINCRONA = 5
 
 
 class PropiedadesPublicList(generics.ListAPIView):
@@ -25,6 +36,130 @@ class PropiedadesPublicList(generics.ListAPIView):
         return Propiedades.objects.filter(status=True, estado_baja='activa')
 
 
+class BusquedaCursorPagination(CursorPagination):
+    """Paginación por cursor (keyset sobre id): no usa OFFSET ni COUNT"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+
+
+class PropiedadesDisponiblesList(generics.ListAPIView):
+    """
+    Búsqueda pública: propiedades libres entre checkin y checkout.
+    Parámetros: checkin, checkout (YYYY-MM-DD), huespedes, caracteristicas
+    (separadas por coma), tipo, ciudad, precio_max, cursor.
+    """
+    serializer_class = PropiedadesSerializer
+    permission_classes = [AllowAny]
+    pagination_class = BusquedaCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+
+        try:
+            checkin = datetime.strptime(params.get('checkin', ''), '%Y-%m-%d').date()
+            checkout = datetime.strptime(params.get('checkout', ''), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({'error': 'checkin y checkout son requeridos (YYYY-MM-DD)'})
+
+        if checkout <= checkin:
+            raise ValidationError({'checkout': 'La fecha de checkout debe ser posterior al checkin'})
+
+        queryset = Propiedades.objects.filter(status=True, estado_baja='activa')
+
+        huespedes = params.get('huespedes')
+        if huespedes:
+            if not huespedes.isdigit():
+                raise ValidationError({'huespedes': 'Debe ser un número entero'})
+            queryset = queryset.filter(max_huespedes__gte=int(huespedes))
+
+        caracteristicas = [c.strip() for c in params.get('caracteristicas', '').split(',') if c.strip()]
+        if caracteristicas:
+            # @> sobre el JSON: usa el índice GIN de caracteristicas
+            queryset = queryset.filter(caracteristicas__contains=caracteristicas)
+
+        if params.get('tipo'):
+            queryset = queryset.filter(tipo=params.get('tipo'))
+        if params.get('ciudad'):
+            queryset = queryset.filter(ciudad__iexact=params.get('ciudad'))
+        if params.get('precio_max'):
+            try:
+                precio_max = Decimal(params.get('precio_max'))
+            except InvalidOperation:
+                precio_max = None
+            # Decimal también acepta 'nan' e 'inf': con nan el filtro descartaría todo
+            if precio_max is None or not precio_max.is_finite():
+                raise ValidationError({'precio_max': 'Debe ser numérico'})
+            queryset = queryset.filter(precio_noche__lte=precio_max)
+
+        # Anti-join: NOT EXISTS (reserva activa que se cruce con el rango)
+        ocupada = DisponibilidadService.reservas_solapadas(OuterRef('pk'), checkin, checkout)
+        return queryset.filter(~Exists(ocupada))
+
+
+def _coordenada(params, nombre, minimo, maximo):
+    try:
+        valor = float(params.get(nombre))
+    except (TypeError, ValueError):
+        raise ValidationError({nombre: 'Debe ser numérico'})
+    if not minimo <= valor <= maximo:
+        raise ValidationError({nombre: f'Debe estar entre {minimo} y {maximo}'})
+    return valor
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def propiedades_cercanas(request):
+    """
+    Propiedades activas a menos de radio_km de (lat, lng), más cercanas primero
+    """
+    params = request.query_params
+    latitud = _coordenada(params, 'lat', -90, 90)
+    longitud = _coordenada(params, 'lng', -180, 180)
+    radio_km = _coordenada(params, 'radio_km', 0.01, 500) if params.get('radio_km') else 5.0
+    limite = min(int(params.get('limite', 50)) if str(params.get('limite', '')).isdigit() else 50, 200)
+
+    queryset = Propiedades.objects.filter(status=True, estado_baja='activa')
+    resultados = GeoService.propiedades_cercanas(queryset, latitud, longitud, radio_km, limite)
+
+    data = []
+    for propiedad, distancia in resultados:
+        item = PropiedadesSerializer(propiedad).data
+        item['distancia_km'] = round(distancia, 3)
+        data.append(item)
+
+    return Response({
+        'centro': {'latitud': latitud, 'longitud': longitud},
+        'radio_km': radio_km,
+        'total': len(data),
+        'propiedades': data,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def propiedades_en_mapa(request):
+    """
+    Propiedades activas dentro del área visible: sur, oeste, norte, este
+    """
+    params = request.query_params
+    sur = _coordenada(params, 'sur', -90, 90)
+    norte = _coordenada(params, 'norte', -90, 90)
+    oeste = _coordenada(params, 'oeste', -180, 180)
+    este = _coordenada(params, 'este', -180, 180)
+    if sur > norte:
+        raise ValidationError({'sur': 'Debe ser menor o igual que norte'})
+    limite = min(int(params.get('limite', 200)) if str(params.get('limite', '')).isdigit() else 200, 500)
+
+    queryset = GeoService.propiedades_en_area(
+        Propiedades.objects.filter(status=True, estado_baja='activa'), sur, oeste, norte, este
+    ).order_by('id')[:limite]
+
+    data = PropiedadesSerializer(queryset, many=True).data
+    return Response({'total': len(data), 'propiedades': data})
+
+
 class PropiedadesList(generics.ListCreateAPIView):
     serializer_class = PropiedadesSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -76,17 +211,9 @@ class PropiedadesList(generics.ListCreateAPIView):
         propiedad = serializer.save(user=self.request.user)
         print(f"🔨 PROPIEDAD GUARDADA: {propiedad.nombre} (ID: {propiedad.id})")
 
-        # 🔥 NUEVO: Intentar geocodificar automáticamente al crear
-        try:
-            from .services.geo_service import GeoService
-            exito, resultado = GeoService.actualizar_geodatos_propiedad(propiedad)
-            if exito:
-                propiedad.save()
-                print(f"✅ Propiedad geocodificada automáticamente: {propiedad.nombre}")
-            else:
-                print(f"⚠️ No se pudo geocodificar automáticamente: {resultado.get('error', 'Error desconocido')}")
-        except Exception as e:
-            print(f"⚠️ Error en geocodificación automática: {e}")
+        # La geocodificación se hace en segundo plano (procesar_geocodificacion)
+        if ColaGeocodificacion.encolar(propiedad):
+            print(f"📍 Geocodificación encolada: {propiedad.nombre}")
 
 
 class PropiedadesCUD(generics.RetrieveUpdateDestroyAPIView):
@@ -99,18 +226,13 @@ class PropiedadesCUD(generics.RetrieveUpdateDestroyAPIView):
         return Propiedades.objects.filter(user=self.request.user)
 
     def perform_update(self, serializer):
+        direccion_anterior = serializer.instance.direccion_completa
         propiedad = serializer.save()
 
-        # 🔥 NUEVO: Si se actualiza la dirección, intentar geocodificar
-        if 'direccion' in serializer.validated_data:
-            try:
-                from .services.geo_service import GeoService
-                exito, resultado = GeoService.actualizar_geodatos_propiedad(propiedad)
-                if exito:
-                    propiedad.save()
-                    print(f"✅ Dirección actualizada y geocodificada: {propiedad.nombre}")
-            except Exception as e:
-                print(f"⚠️ Error en geocodificación durante actualización: {e}")
+        # Si cambió la dirección, geocodificar en segundo plano
+        if propiedad.direccion_completa != direccion_anterior:
+            if ColaGeocodificacion.encolar(propiedad):
+                print(f"📍 Geocodificación encolada: {propiedad.nombre}")
 
 
 # 🔥 NUEVAS VISTAS PARA GEOLOCALIZACIÓN
@@ -128,7 +250,7 @@ def geocodificar_direccion(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    resultado = OpenStreetMapService.obtener_coordenadas(direccion)
+    resultado = OpenStreetMapService.obtener_coordenadas(direccion, ESPERA_GEOCODIFICACION_SINCRONA)
 
     if resultado['exito']:
         return Response({
@@ -166,9 +288,12 @@ def actualizar_ubicacion_propiedad(request, pk):
 
     direccion_completa = request.data.get('direccion_completa', propiedad.direccion_completa)
 
-    exito, resultado = GeoService.actualizar_geodatos_propiedad(propiedad, direccion_completa)
+    exito, resultado = GeoService.actualizar_geodatos_propiedad(
+        propiedad, direccion_completa, ESPERA_GEOCODIFICACION_SINCRONA
+    )
 
     if exito:
+        propiedad.direccion_completa = direccion_completa
         propiedad.save()
         return Response(PropiedadesSerializer(propiedad).data)
     else:
@@ -198,6 +323,7 @@ def obtener_ubicacion_propiedad(request, pk):
         'propiedad_id': propiedad.id,
         'nombre': propiedad.nombre,
         'direccion_completa': propiedad.direccion_completa,
+        'direccion_geocodificada': propiedad.direccion_geocodificada,
         'latitud': propiedad.latitud,
         'longitud': propiedad.longitud,
         'ciudad': propiedad.ciudad,
@@ -207,6 +333,30 @@ def obtener_ubicacion_propiedad(request, pk):
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def sugerencias_ubicacion(request):
+    """
+    Autocompletado de ubicaciones (gazetteer local, Nominatim solo si no hay coincidencias).
+    Los anónimos solo reciben el gazetteer y el cache: no consumen el límite de Nominatim.
+    """
+    query = request.query_params.get('q', '').strip()
+    if len(query) < 2:
+        return Response({'sugerencias': []})
+    return Response({'sugerencias': GeoService.buscar_sugerencias_ubicacion(
+        query, remoto=request.user.is_authenticated
+    )})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ciudades_bolivia(request):
+    """
+    Ciudades principales de Bolivia
+    """
+    return Response({'ciudades': GeoService.obtener_ciudades_bolivia()})
+
+
 # 🔥 VISTAS EXISTENTES PARA BAJAS (MANTENIENDO TU CÓDIGO)
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
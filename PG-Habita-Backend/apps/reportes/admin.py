@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ReporteGuardado, ReporteGenerado
+from .models import ReporteGuardado, ReporteGenerado, TraduccionIA
 
 
 @admin.register(ReporteGuardado)
@@ -12,6 +12,12 @@ class ReporteGuardadoAdmin(admin.ModelAdmin):
 
 @admin.register(ReporteGenerado)
 class ReporteGeneradoAdmin(admin.ModelAdmin):
-	list_display = ('id', 'tipo_reporte', 'usuario', 'formato_exportado', 'tiempo_generacion', 'creado_en')
-	list_filter = ('tipo_reporte', 'formato_exportado', 'creado_en')
+	list_display = ('id', 'tipo_reporte', 'modo', 'estado', 'usuario', 'formato_exportado', 'tiempo_generacion', 'creado_en')
+	list_filter = ('estado', 'modo', 'tipo_reporte', 'formato_exportado', 'creado_en')
 	search_fields = ('usuario__username', 'usuario__correo', 'prompt_ia')
+
+
+@admin.register(TraduccionIA)
+class TraduccionIAAdmin(admin.ModelAdmin):
+	list_display = ('id', 'prompt', 'modelo', 'hits', 'ultimo_uso', 'creado_en')
+	search_fields = ('prompt', 'prompt_normalizado')
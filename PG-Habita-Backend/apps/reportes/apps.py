@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reportes'
+
+    def ready(self):
+        import apps.reportes.signals
@@ -0,0 +1,174 @@
+"""
+Traducción de prompts a configuraciones de reporte: proveedores de IA
+intercambiables (settings.REPORTES_IA_PROVEEDOR) y cache persistente.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.texto import normalizar
+from .models import TraduccionIA
+
+SYSTEM_PROMPT = (
+    'Eres un analista de datos. Devuelve SOLO JSON válido (sin markdown). '
+    'Debes mapear el pedido a una configuración para generar_reporte_dinamico con las claves: '
+    'tipo_reporte, campos_seleccionados, filtros, agrupacion, ordenamiento, limite, incluir_estadisticas, incluir_graficos. '
+    'Usa únicamente tipos/campos/filtros permitidos por este meta JSON. Si falta info, asume lo mínimo.'
+)
+
+
+class ErrorConfiguracionIA(Exception):
+    """La IA no produjo una configuración utilizable; 'respuesta' va tal cual al cliente"""
+
+    def __init__(self, mensaje: str, status: int = 400, **detalle):
+        super().__init__(mensaje)
+        self.status = status
+        self.respuesta = {'status': 'error', 'message': mensaje, **detalle}
+
+
+# ---------- Proveedores ----------
+
+class ProveedorOpenAI:
+    """Chat completions de OpenAI (o compatible vía OPENAI_API_URL)"""
+
+    def __init__(self):
+        self.api_key = os.getenv('OPENAI_API_KEY') or os.getenv('VITE_OPENAI_API_KEY')
+        self.api_url = os.getenv('OPENAI_API_URL') or os.getenv('VITE_OPENAI_API_URL') or 'https://api.openai.com/v1/chat/completions'
+        self.modelo = os.getenv('OPENAI_MODEL') or os.getenv('VITE_OPENAI_MODEL') or 'gpt-4o-mini'
+
+    def completar(self, system: str, user_msg: Dict) -> str:
+        if not self.api_key:
+            raise ErrorConfiguracionIA('Falta OPENAI_API_KEY en el backend (.env).', status=500)
+
+        resp = requests.post(
+            self.api_url,
+            headers={
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json',
+            },
+            json={
+                'model': self.modelo,
+                'messages': [
+                    {'role': 'system', 'content': system},
+                    {'role': 'user', 'content': json.dumps(user_msg, ensure_ascii=False)},
+                ],
+                'temperature': 0.2,
+            },
+            timeout=60,
+        )
+
+        if resp.status_code >= 400:
+            raise ErrorConfiguracionIA('Error consultando IA', status=502, detail=resp.text)
+
+        data = resp.json()
+        return data['choices'][0]['message']['content']
+
+
+class ProveedorLocal:
+    """
+    Proveedor sin red para pruebas y desarrollo: elige el tipo de reporte por
+    palabras clave del prompt y responde con la configuración mínima.
+    """
+
+    modelo = 'local'
+
+    PALABRAS_CLAVE = [
+        ('ingres', 'ingresos'),
+        ('ocupac', 'ocupacion'),
+        ('factur', 'facturas'),
+        ('propiedad', 'propiedades'),
+        ('usuario', 'usuarios'),
+        ('reserva', 'reservas'),
+    ]
+
+    def completar(self, system: str, user_msg: Dict) -> str:
+        prompt = normalizar(user_msg.get('prompt_usuario'))
+        tipo = next((t for palabra, t in self.PALABRAS_CLAVE if palabra in prompt), 'reservas')
+        config = {'tipo_reporte': tipo}
+
+        limite = re.search(r'\b(\d{1,4})\b', prompt)
+        if limite:
+            config['limite'] = int(limite.group(1))
+        return json.dumps(config)
+
+
+def obtener_proveedor():
+    ruta = getattr(settings, 'REPORTES_IA_PROVEEDOR', 'apps.reportes.ia.ProveedorOpenAI')
+    return import_string(ruta)()
+
+
+# ---------- Cache de traducciones ----------
+
+class TraduccionesIA:
+    """Búsqueda exacta por clave normalizada y, opcionalmente, por similitud de trigramas"""
+
+    @staticmethod
+    def hash_meta(meta: Dict) -> str:
+        return hashlib.sha256(json.dumps(meta, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _clave(prompt_normalizado: str, contexto_normalizado: str) -> str:
+        return hashlib.sha256(f"{prompt_normalizado}\n{contexto_normalizado}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _numeros(texto: str):
+        # "top 10" y "top 20" son casi iguales como texto pero no como reporte
+        return sorted(re.findall(r'\d+', texto))
+
+    @staticmethod
+    def obtener(prompt: str, contexto: str, meta_hash: str) -> Tuple[Optional[TraduccionIA], bool]:
+        """(traducción, por_similitud). Cuenta un hit si la encuentra."""
+        prompt_n = normalizar(prompt)
+        contexto_n = normalizar(contexto)
+        if not prompt_n:
+            return None, False
+
+        traduccion = TraduccionIA.objects.filter(
+            clave=TraduccionesIA._clave(prompt_n, contexto_n), meta_hash=meta_hash
+        ).first()
+        por_similitud = False
+
+        umbral = getattr(settings, 'REPORTES_IA_SIMILITUD_MINIMA', 0)
+        if traduccion is None and umbral:
+            candidatas = TraduccionIA.objects.filter(
+                meta_hash=meta_hash, contexto_normalizado=contexto_n
+            ).annotate(
+                similitud=TrigramSimilarity('prompt_normalizado', prompt_n)
+            ).filter(similitud__gte=umbral).order_by('-similitud')[:5]
+            numeros = TraduccionesIA._numeros(prompt_n)
+            traduccion = next(
+                (t for t in candidatas if TraduccionesIA._numeros(t.prompt_normalizado) == numeros), None
+            )
+            por_similitud = traduccion is not None
+
+        if traduccion is not None:
+            TraduccionIA.objects.filter(pk=traduccion.pk).update(hits=F('hits') + 1, ultimo_uso=timezone.now())
+        return traduccion, por_similitud
+
+    @staticmethod
+    def guardar(prompt: str, contexto: str, meta_hash: str, config: Dict, respuesta: str, modelo: str):
+        prompt_n = normalizar(prompt)
+        contexto_n = normalizar(contexto)
+        if not prompt_n:
+            return
+        clave = TraduccionesIA._clave(prompt_n, contexto_n)
+        valores = {'prompt': prompt, 'config': config, 'respuesta_ia': respuesta, 'modelo': modelo}
+        try:
+            with transaction.atomic():
+                TraduccionIA.objects.create(
+                    clave=clave, meta_hash=meta_hash, prompt_normalizado=prompt_n,
+                    contexto_normalizado=contexto_n, **valores
+                )
+        except IntegrityError:
+            # Otra petición tradujo el mismo prompt al mismo tiempo
+            TraduccionIA.objects.filter(clave=clave, meta_hash=meta_hash).update(**valores)
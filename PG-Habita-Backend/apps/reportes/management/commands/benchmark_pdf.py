@@ -0,0 +1,73 @@
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from apps.reportes.views import _conversores, _meta_reportes, _renderizar_pdf
+
+ESTADOS = ['pendiente', 'confirmada', 'aceptada', 'cancelada', 'completada']
+
+
+class Command(BaseCommand):
+    help = 'Mide el renderizado de PDF (filas/s, páginas, tamaño y memoria) con filas sintéticas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('filas', type=int, nargs='*', default=[10000, 100000],
+                            help='Tamaños de reporte a medir (por defecto 10000 y 100000)')
+        parser.add_argument('--tipo', default='reservas', choices=['reservas', 'propiedades', 'facturas', 'usuarios'],
+                            help='Meta del reporte (columnas y anchos)')
+        parser.add_argument('--memoria', action='store_true',
+                            help='Mide el pico de memoria con tracemalloc (más lento)')
+
+    def handle(self, *args, **options):
+        campos = list(_meta_reportes()[options['tipo']]['campos'])
+        conversores = _conversores(options['tipo'], campos)
+
+        for cantidad in options['filas']:
+            if options['memoria']:
+                tracemalloc.start()
+            inicio = time.perf_counter()
+            with tempfile.TemporaryFile() as archivo:
+                filas = self._filas(cantidad, campos, conversores, options['tipo'])
+                dibujadas = _renderizar_pdf(archivo, options['tipo'], {}, campos, filas)
+                tamano = archivo.tell()
+            transcurrido = time.perf_counter() - inicio
+
+            memoria = ''
+            if options['memoria']:
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                memoria = f' | pico de memoria {pico / 1024 / 1024:.1f} MB'
+
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {dibujadas} filas en {transcurrido:.2f}s '
+                f'({dibujadas / transcurrido:,.0f} filas/s) | {tamano / 1024 / 1024:.1f} MB{memoria}'
+            ))
+
+    def _filas(self, cantidad, campos, conversores, tipo):
+        """Filas ya convertidas, como las entrega _filas_exportacion"""
+        base = date(2027, 1, 1)
+        ahora = datetime(2027, 1, 1, tzinfo=timezone.utc)
+        meta = _meta_reportes()[tipo]['campos']
+        for i in range(cantidad):
+            fila = []
+            for campo in campos:
+                tipo_campo = meta[campo]['tipo']
+                if tipo_campo == 'number':
+                    valor = i
+                elif tipo_campo == 'money':
+                    valor = (i * 37) % 900 + 0.5
+                elif tipo_campo == 'date':
+                    valor = base + timedelta(days=i % 365)
+                elif tipo_campo == 'datetime':
+                    valor = ahora + timedelta(minutes=i)
+                elif tipo_campo == 'bool':
+                    valor = i % 2 == 0
+                elif campo == 'status':
+                    valor = ESTADOS[i % len(ESTADOS)]
+                else:
+                    valor = f'{campo} {i}'
+                fila.append(valor)
+            yield [conv(v) if conv else v for v, conv in zip(fila, conversores)]
@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.reportes.trabajos import ColaReportes
+
+
+class Command(BaseCommand):
+    help = 'Worker que genera los reportes encolados con ?async=1'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1,
+                            help='Trabajos a reclamar por vuelta')
+        parser.add_argument('--espera', type=float, default=2.0,
+                            help='Segundos a dormir cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa lo pendiente y termina')
+
+    def handle(self, *args, **options):
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        self.stdout.write('📊 Worker de reportes iniciado')
+        completados = fallidos = 0
+
+        while not self.detener:
+            trabajos = ColaReportes.reclamar(options['lote'])
+            if not trabajos:
+                if options['una_vez']:
+                    break
+                time.sleep(options['espera'])
+                continue
+
+            for i, trabajo in enumerate(trabajos):
+                if self.detener:
+                    # Devolver a la cola lo reclamado y no procesado
+                    ColaReportes.liberar(trabajos[i:])
+                    break
+                if ColaReportes.procesar(trabajo):
+                    completados += 1
+                    self.stdout.write(f'✅ Reporte #{trabajo.pk} ({trabajo.modo}) listo en {trabajo.tiempo_generacion:.2f}s')
+                else:
+                    fallidos += 1
+                    self.stdout.write(self.style.WARNING(f'⚠️ Reporte #{trabajo.pk} con error: {trabajo.error}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Worker de reportes detenido: {completados} completados, {fallidos} con error'
+        ))
+
+    def _detener(self, signum, frame):
+        self.detener = True
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.reportes.services import ResumenReservasService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen mensual de reservas (propiedad, mes, estado, estado de pago)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--propiedad', type=int, action='append', dest='propiedades',
+                            help='ID de propiedad a recalcular (se puede repetir)')
+
+    def handle(self, *args, **options):
+        filas = ResumenReservasService.reconstruir(options.get('propiedades'))
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumen mensual recalculado: {filas} filas'))
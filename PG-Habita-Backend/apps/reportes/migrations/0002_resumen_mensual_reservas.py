@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def construir_resumenes(apps, schema_editor):
+    """Agrega las reservas existentes por propiedad, mes, estado y estado de pago"""
+    Reservas = apps.get_model('reservas', 'Reservas')
+    ResumenMensualReservas = apps.get_model('reportes', 'ResumenMensualReservas')
+
+    agregados = Reservas.objects.annotate(mes=TruncMonth('fecha_checkin')).values(
+        'propiedad_id', 'mes', 'status', 'pago_estado'
+    ).annotate(
+        cantidad=Count('id'), noches=Sum('cant_noches'),
+        ingresos=Sum('monto_total'), descuentos=Sum('descuento'),
+    ).order_by()
+
+    ResumenMensualReservas.objects.bulk_create([
+        ResumenMensualReservas(
+            propiedad_id=a['propiedad_id'], mes=a['mes'], status=a['status'],
+            pago_estado=a['pago_estado'], cantidad=a['cantidad'], noches=a['noches'] or 0,
+            ingresos=a['ingresos'] or 0, descuentos=a['descuentos'] or 0,
+        )
+        for a in agregados
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0014_gazetteer'),
+        ('reportes', '0001_initial'),
+        ('reservas', '0008_indice_checkin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensualReservas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes de check-in')),
+                ('status', models.CharField(max_length=20)),
+                ('pago_estado', models.CharField(max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('noches', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('descuentos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_mensuales', to='propiedades.propiedades')),
+            ],
+            options={
+                'db_table': 'reportes_resumen_mensual',
+                'indexes': [models.Index(fields=['mes'], name='resumen_mes_idx')],
+                'unique_together': {('propiedad', 'mes', 'status', 'pago_estado')},
+            },
+        ),
+        migrations.RunPython(construir_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:54
+
+import django.core.serializers.json
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_resumen_mensual_reservas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='archivo',
+            field=models.FileField(blank=True, help_text='Archivo exportado (modo exportar)', upload_to='reportes/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='completado', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='finalizado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='iniciado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='modo',
+            field=models.CharField(choices=[('dinamico', 'Dinámico'), ('exportar', 'Exportación'), ('ia', 'IA')], default='dinamico', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, help_text='Solicitud original del trabajo'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='resultado',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Reporte JSON (modos dinamico/ia)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='reportegenerado',
+            name='formato_exportado',
+            field=models.CharField(choices=[('json', 'JSON'), ('pdf', 'PDF'), ('csv', 'CSV'), ('excel', 'Excel'), ('xlsx', 'Excel (xlsx)')], default='json', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='reportegenerado',
+            index=models.Index(fields=['estado', 'creado_en'], name='reportes_cola_idx'),
+        ),
+    ]
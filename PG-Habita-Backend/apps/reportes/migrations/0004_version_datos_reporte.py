@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0003_trabajos_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatosReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alcance', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'reportes_version_datos',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_version_datos_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraduccionIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='sha256 del prompt y contexto normalizados', max_length=64)),
+                ('meta_hash', models.CharField(max_length=64)),
+                ('prompt', models.TextField()),
+                ('prompt_normalizado', models.TextField()),
+                ('contexto_normalizado', models.TextField(blank=True)),
+                ('config', models.JSONField(default=dict)),
+                ('respuesta_ia', models.TextField(blank=True)),
+                ('modelo', models.CharField(blank=True, max_length=100)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('ultimo_uso', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'reportes_traduccion_ia',
+                'unique_together': {('clave', 'meta_hash')},
+            },
+        ),
+    ]
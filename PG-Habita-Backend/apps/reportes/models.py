@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from apps.usuarios.models import CustomUser as User
 
@@ -44,6 +45,21 @@ class ReporteGenerado(models.Model):
         ('pdf', 'PDF'),
         ('csv', 'CSV'),
         ('excel', 'Excel'),
+        ('xlsx', 'Excel (xlsx)'),
+    ]
+
+    # Estado del trabajo en segundo plano (los reportes síncronos nacen 'completado')
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    MODO_CHOICES = [
+        ('dinamico', 'Dinámico'),
+        ('exportar', 'Exportación'),
+        ('ia', 'IA'),
     ]
     
     reporte_base = models.ForeignKey(
@@ -62,13 +78,98 @@ class ReporteGenerado(models.Model):
     resultado_resumen = models.JSONField(default=dict, help_text="Resumen de los resultados")
     formato_exportado = models.CharField(max_length=10, choices=FORMATO_CHOICES, default='json')
     tiempo_generacion = models.FloatField(default=0, help_text="Tiempo en segundos")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='completado')
+    modo = models.CharField(max_length=20, choices=MODO_CHOICES, default='dinamico')
+    payload = models.JSONField(default=dict, blank=True, help_text="Solicitud original del trabajo")
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, help_text="Reporte JSON (modos dinamico/ia)")
+    archivo = models.FileField(upload_to='reportes/%Y/%m/', blank=True, help_text="Archivo exportado (modo exportar)")
+    error = models.TextField(blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    finalizado_en = models.DateTimeField(null=True, blank=True)
     creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'reportes_generados'
         ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'creado_en'], name='reportes_cola_idx'),
+        ]
         verbose_name = 'Reporte Generado'
         verbose_name_plural = 'Reportes Generados'
 
     def __str__(self):
         return f"Reporte {self.tipo_reporte} - {self.creado_en.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ResumenMensualReservas(models.Model):
+    """
+    Agregado mensual de reservas por (propiedad, mes de check-in, estado, estado de pago).
+    Se mantiene desde signals de Reservas y se reconstruye con refrescar_resumenes.
+    """
+
+    propiedad = models.ForeignKey('propiedades.Propiedades', on_delete=models.CASCADE, related_name='resumenes_mensuales')
+    mes = models.DateField(help_text="Primer día del mes de check-in")
+    status = models.CharField(max_length=20)
+    pago_estado = models.CharField(max_length=20)
+    cantidad = models.IntegerField(default=0)
+    noches = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    descuentos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reportes_resumen_mensual'
+        unique_together = ['propiedad', 'mes', 'status', 'pago_estado']
+        indexes = [
+            models.Index(fields=['mes'], name='resumen_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.propiedad_id} {self.mes:%Y-%m} {self.status}/{self.pago_estado}: {self.cantidad}"
+
+
+class VersionDatosReporte(models.Model):
+    """
+    Versión de los datos que alimentan los reportes, por alcance ('global' para
+    administradores, 'usuario:<id>' para cada anfitrión). Los signals la
+    incrementan y forma parte de la clave del cache de reportes.
+    """
+
+    alcance = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reportes_version_datos'
+
+    def __str__(self):
+        return f"{self.alcance}: v{self.version}"
+
+
+class TraduccionIA(models.Model):
+    """
+    Cache persistente de prompt -> configuración de reporte ya validada.
+    La clave es el prompt (y contexto) normalizado más el hash del meta
+    enviado a la IA: si cambian los campos disponibles, se vuelve a consultar.
+    """
+
+    clave = models.CharField(max_length=64, help_text="sha256 del prompt y contexto normalizados")
+    meta_hash = models.CharField(max_length=64)
+    prompt = models.TextField()
+    prompt_normalizado = models.TextField()
+    contexto_normalizado = models.TextField(blank=True)
+    config = models.JSONField(default=dict)
+    respuesta_ia = models.TextField(blank=True)
+    modelo = models.CharField(max_length=100, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    ultimo_uso = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reportes_traduccion_ia'
+        unique_together = ['clave', 'meta_hash']
+
+    def __str__(self):
+        return f"{self.prompt[:50]} ({self.hits} hits)"
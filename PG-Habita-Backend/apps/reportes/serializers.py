@@ -26,6 +26,7 @@ class ReporteGeneradoSerializer(serializers.ModelSerializer):
             'usuario_nombre', 'tipo_reporte', 'configuracion_usada',
             'parametros_filtro', 'prompt_ia', 'respuesta_ia',
             'resultado_resumen', 'formato_exportado', 'tiempo_generacion',
+            'estado', 'modo', 'error', 'archivo', 'iniciado_en', 'finalizado_en',
             'creado_en'
         ]
         read_only_fields = ['usuario', 'creado_en']
@@ -77,6 +78,12 @@ class GenerarReporteDinamicoSerializer(serializers.Serializer):
         default=True,
         help_text="Incluir datos para gráficos"
     )
+    formato_salida = serializers.ChoiceField(
+        choices=[('filas', 'Filas'), ('columnas', 'Columnas')],
+        required=False,
+        default='filas',
+        help_text="'filas': lista de objetos en 'rows'; 'columnas': arreglos por campo en 'columnas'"
+    )
 
 
 class ReporteIASerializer(serializers.Serializer):
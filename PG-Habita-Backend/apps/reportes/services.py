@@ -0,0 +1,337 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.reservas.models import Reservas
+from .models import ResumenMensualReservas, VersionDatosReporte
+
+METRICAS = ('cantidad', 'noches', 'ingresos', 'descuentos')
+
+
+def _inicio_mes(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+
+def _mes_siguiente(fecha: date) -> date:
+    return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _parse_fecha(valor) -> Optional[date]:
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+class ResumenReservasService:
+    """
+    Mantiene y consulta ResumenMensualReservas. Los reportes de reservas,
+    ingresos y ocupación agregan sobre esta tabla (una fila por propiedad,
+    mes, estado y estado de pago) en lugar de recorrer todas las reservas.
+    """
+
+    # ---------- mantenimiento ----------
+
+    @staticmethod
+    def _aplicar(valores: Dict, signo: int):
+        if not valores or not valores.get('fecha_checkin'):
+            return
+
+        clave = {
+            'propiedad_id': valores['propiedad_id'],
+            'mes': _inicio_mes(_parse_fecha(valores['fecha_checkin'])),
+            'status': valores['status'],
+            'pago_estado': valores['pago_estado'],
+        }
+        delta = {
+            'cantidad': signo,
+            'noches': signo * (valores['cant_noches'] or 0),
+            'ingresos': signo * Decimal(str(valores['monto_total'] or 0)),
+            'descuentos': signo * Decimal(str(valores['descuento'] or 0)),
+        }
+        filas = ResumenMensualReservas.objects.filter(**clave)
+        # update() no aplica auto_now: sin marca la fila no entra en el backup incremental
+        incremento = {m: F(m) + delta[m] for m in METRICAS}
+        actualizadas = filas.update(**incremento, actualizado_en=timezone.now())
+
+        if signo < 0:
+            # Al restar nunca se crean filas (evita revivir propiedades borradas en cascada)
+            filas.filter(cantidad__lte=0).delete()
+            return
+        if actualizadas:
+            return
+        try:
+            with transaction.atomic():
+                ResumenMensualReservas.objects.create(**clave, **delta)
+        except IntegrityError:
+            filas.update(**incremento, actualizado_en=timezone.now())
+
+    @staticmethod
+    def valores(reserva: Reservas) -> Dict:
+        return {
+            'propiedad_id': reserva.propiedad_id, 'fecha_checkin': reserva.fecha_checkin,
+            'status': reserva.status, 'pago_estado': reserva.pago_estado,
+            'cant_noches': reserva.cant_noches, 'monto_total': reserva.monto_total,
+            'descuento': reserva.descuento,
+        }
+
+    @staticmethod
+    def aplicar_cambio(previo: Optional[Dict], reserva: Reservas):
+        """previo: valores anteriores (Reservas._previo) o None si es nueva"""
+        actual = ResumenReservasService.valores(reserva)
+        if previo and all(previo.get(k) == v for k, v in actual.items()):
+            return
+        ResumenReservasService._aplicar(previo, -1)
+        ResumenReservasService._aplicar(actual, 1)
+
+    @staticmethod
+    def quitar(reserva: Reservas):
+        ResumenReservasService._aplicar(ResumenReservasService.valores(reserva), -1)
+
+    @staticmethod
+    def reconstruir(propiedad_ids: Optional[Iterable[int]] = None) -> int:
+        """Recalcula el resumen desde Reservas. Retorna filas escritas."""
+        reservas = Reservas.objects.all()
+        resumenes = ResumenMensualReservas.objects.all()
+        if propiedad_ids is not None:
+            propiedad_ids = list(propiedad_ids)
+            reservas = reservas.filter(propiedad_id__in=propiedad_ids)
+            resumenes = resumenes.filter(propiedad_id__in=propiedad_ids)
+
+        agregados = reservas.annotate(mes=TruncMonth('fecha_checkin')).values(
+            'propiedad_id', 'mes', 'status', 'pago_estado'
+        ).annotate(
+            cantidad=Count('id'), noches=Sum('cant_noches'),
+            ingresos=Sum('monto_total'), descuentos=Sum('descuento'),
+        ).order_by()
+
+        with transaction.atomic():
+            resumenes.delete()
+            filas = ResumenMensualReservas.objects.bulk_create([
+                ResumenMensualReservas(
+                    propiedad_id=a['propiedad_id'], mes=a['mes'], status=a['status'],
+                    pago_estado=a['pago_estado'], cantidad=a['cantidad'], noches=a['noches'] or 0,
+                    ingresos=a['ingresos'] or 0, descuentos=a['descuentos'] or 0,
+                )
+                for a in agregados.iterator(chunk_size=2000)
+            ], batch_size=1000)
+        return len(filas)
+
+    # ---------- consultas ----------
+
+    @staticmethod
+    def agregar(reservas_qs, propiedades, filtros: Dict, por: List[str]) -> List[Dict]:
+        """
+        Agrega cantidad/noches/ingresos/descuentos de las reservas filtradas,
+        agrupando por `por` (mes, status, pago_estado, propiedad_id, propiedad__nombre).
+
+        reservas_qs: reservas ya acotadas al usuario y filtradas (_apply_filters);
+        solo se evalúa para el mes parcial de fecha_inicio o cuando el filtro
+        no se puede responder desde el resumen (fecha_fin compara el check-out).
+        propiedades: queryset de propiedades del usuario, o None para todas.
+        """
+        filtros = filtros or {}
+        if filtros.get('fecha_fin'):
+            return ResumenReservasService._agregar_reservas(reservas_qs, por)
+
+        resumen = ResumenMensualReservas.objects.all()
+        if propiedades is not None:
+            resumen = resumen.filter(propiedad__in=propiedades)
+        for campo in ('status', 'pago_estado', 'propiedad_id'):
+            if filtros.get(campo):
+                resumen = resumen.filter(**{campo: filtros[campo]})
+
+        partes = []
+        desde = _parse_fecha(filtros.get('fecha_inicio'))
+        if desde:
+            if desde.day != 1:
+                # Mes parcial: se lee de Reservas (índice por fecha_checkin)
+                siguiente = _mes_siguiente(desde)
+                partes.append(ResumenReservasService._agregar_reservas(
+                    reservas_qs.filter(fecha_checkin__lt=siguiente), por
+                ))
+                desde = siguiente
+            resumen = resumen.filter(mes__gte=desde)
+
+        if por:
+            partes.append(list(resumen.values(*por).annotate(
+                **{m: Sum(m) for m in METRICAS}
+            ).order_by()))
+        else:
+            partes.append([resumen.aggregate(**{m: Sum(m) for m in METRICAS})])
+
+        return ResumenReservasService._combinar(partes, por)
+
+    @staticmethod
+    def _agregar_reservas(reservas_qs, por: List[str]) -> List[Dict]:
+        metricas = {
+            'cantidad': Count('id'), 'noches': Sum('cant_noches'),
+            'ingresos': Sum('monto_total'), 'descuentos': Sum('descuento'),
+        }
+        if 'mes' in por:
+            reservas_qs = reservas_qs.annotate(mes=TruncMonth('fecha_checkin'))
+        if not por:
+            return [reservas_qs.aggregate(**metricas)]
+        return list(reservas_qs.values(*por).annotate(**metricas).order_by())
+
+    @staticmethod
+    def _combinar(partes: List[List[Dict]], por: List[str]) -> List[Dict]:
+        acumulado = defaultdict(lambda: {'cantidad': 0, 'noches': 0, 'ingresos': Decimal('0'), 'descuentos': Decimal('0')})
+        for parte in partes:
+            for fila in parte:
+                destino = acumulado[tuple(fila[c] for c in por)]
+                for m in METRICAS:
+                    destino[m] += fila[m] or 0
+
+        resultado = []
+        for clave, metricas in acumulado.items():
+            if por and not metricas['cantidad']:
+                continue
+            fila = dict(zip(por, clave))
+            fila.update(metricas)
+            resultado.append(fila)
+        return resultado
+
+
+ALCANCE_GLOBAL = 'global'
+
+
+def alcance_usuario(usuario) -> str:
+    """Mismo criterio que _user_scope: el admin ve todo, el anfitrión lo suyo"""
+    return ALCANCE_GLOBAL if usuario.is_superuser else f'usuario:{usuario.pk}'
+
+
+class VersionesReporte:
+    """Versiones de datos por alcance (ver VersionDatosReporte)"""
+
+    @staticmethod
+    def obtener(alcance: str) -> int:
+        version = VersionDatosReporte.objects.filter(alcance=alcance).values_list('version', flat=True).first()
+        return version or 0
+
+    @staticmethod
+    def incrementar(usuario_ids: Iterable[Optional[int]] = ()):
+        """
+        Invalida 'global' y los anfitriones indicados. Se aplica al confirmar la
+        transacción para no retener la fila 'global' mientras dura el cambio.
+        """
+        alcances = {ALCANCE_GLOBAL} | {f'usuario:{u}' for u in usuario_ids if u}
+        transaction.on_commit(lambda: VersionesReporte._incrementar(sorted(alcances)))
+
+    @staticmethod
+    def _incrementar(alcances: List[str]):
+        ahora = timezone.now()
+        for alcance in alcances:
+            if VersionDatosReporte.objects.filter(alcance=alcance).update(
+                    version=F('version') + 1, actualizado_en=ahora):
+                continue
+            try:
+                with transaction.atomic():
+                    VersionDatosReporte.objects.create(alcance=alcance, version=1)
+            except IntegrityError:
+                # Otro proceso la creó primero
+                VersionDatosReporte.objects.filter(alcance=alcance).update(
+                    version=F('version') + 1, actualizado_en=ahora
+                )
+
+
+class CacheReportes:
+    """
+    Cache LRU en memoria del proceso para reportes dinámicos. La clave combina
+    el payload canónico, el alcance del usuario y la versión de datos de ese
+    alcance, así que un cambio en Reservas/Propiedades/Factura deja las
+    entradas viejas sin uso hasta que el LRU las expulsa. El TTL cubre los
+    cambios masivos que no pasan por signals.
+    """
+
+    _entradas: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+    _lock = threading.Lock()
+    _metricas = {'hits': 0, 'misses': 0, 'expulsiones': 0, 'expiradas': 0}
+
+    # 'usuarios' depende de CustomUser, que cambia en cada login
+    TIPOS_CACHEABLES = ('reservas', 'propiedades', 'facturas', 'ingresos', 'ocupacion')
+
+    @staticmethod
+    def max_entradas() -> int:
+        return getattr(settings, 'REPORTES_CACHE_MAX_ENTRADAS', 256)
+
+    @staticmethod
+    def ttl() -> int:
+        return getattr(settings, 'REPORTES_CACHE_TTL', 600)
+
+    @staticmethod
+    def canonizar(payload: Dict) -> str:
+        """JSON estable: claves ordenadas y sin opcionales vacíos"""
+        limpio = {k: v for k, v in payload.items() if v not in (None, '', [], {})}
+        return json.dumps(limpio, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+    @staticmethod
+    def clave(usuario, payload: Dict) -> str:
+        alcance = alcance_usuario(usuario)
+        base = f"{alcance}|{VersionesReporte.obtener(alcance)}|{CacheReportes.canonizar(payload)}"
+        return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def obtener_o_generar(cls, usuario, payload: Dict, generar: Callable[[], Tuple[Dict, float]]):
+        """
+        Retorna (resultado, segundos, desde_cache). El resultado se comparte
+        entre peticiones: no modificarlo.
+        """
+        if payload.get('tipo_reporte') not in cls.TIPOS_CACHEABLES:
+            resultado, elapsed = generar()
+            return resultado, elapsed, False
+
+        start = time.time()
+        clave = cls.clave(usuario, payload)
+        ahora = time.monotonic()
+
+        with cls._lock:
+            entrada = cls._entradas.get(clave)
+            if entrada is not None:
+                if ahora - entrada[0] < cls.ttl():
+                    cls._entradas.move_to_end(clave)
+                    cls._metricas['hits'] += 1
+                    return entrada[1], time.time() - start, True
+                del cls._entradas[clave]
+                cls._metricas['expiradas'] += 1
+            cls._metricas['misses'] += 1
+
+        resultado, elapsed = generar()
+
+        with cls._lock:
+            cls._entradas[clave] = (ahora, resultado)
+            cls._entradas.move_to_end(clave)
+            while len(cls._entradas) > cls.max_entradas():
+                cls._entradas.popitem(last=False)
+                cls._metricas['expulsiones'] += 1
+        return resultado, elapsed, False
+
+    @classmethod
+    def estadisticas(cls) -> Dict:
+        with cls._lock:
+            consultas = cls._metricas['hits'] + cls._metricas['misses']
+            return {
+                'entradas': len(cls._entradas),
+                'max_entradas': cls.max_entradas(),
+                'ttl': cls.ttl(),
+                **cls._metricas,
+                'tasa_aciertos': round(cls._metricas['hits'] / consultas, 4) if consultas else 0,
+            }
+
+    @classmethod
+    def limpiar(cls):
+        with cls._lock:
+            cls._entradas.clear()
@@ -0,0 +1,54 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.facturas.models import Factura
+from apps.propiedades.models import Propiedades
+from apps.reservas.models import Reservas
+from .services import ResumenReservasService, VersionesReporte
+
+
+def _anfitriones(propiedad_ids):
+    return Propiedades.objects.filter(pk__in=[p for p in propiedad_ids if p]).values_list('user_id', flat=True)
+
+
+@receiver(post_save, sender=Reservas)
+def actualizar_resumen(sender, instance, created, **kwargs):
+    # Reservas.save() deja los valores anteriores en _previo
+    previo = None if created else getattr(instance, '_previo', None)
+    ResumenReservasService.aplicar_cambio(previo, instance)
+
+    propiedades = {instance.propiedad_id, previo['propiedad_id'] if previo else None}
+    VersionesReporte.incrementar(_anfitriones(propiedades))
+
+
+@receiver(post_delete, sender=Reservas)
+def quitar_de_resumen(sender, instance, **kwargs):
+    ResumenReservasService.quitar(instance)
+    VersionesReporte.incrementar(_anfitriones([instance.propiedad_id]))
+
+
+@receiver(pre_save, sender=Propiedades)
+def propiedad_anfitrion_previo(sender, instance, update_fields=None, **kwargs):
+    instance._reportes_anfitrion_previo = None
+    if instance.pk is not None and (update_fields is None or {'user', 'user_id'} & set(update_fields)):
+        instance._reportes_anfitrion_previo = Propiedades.objects.filter(
+            pk=instance.pk
+        ).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=Propiedades)
+def propiedad_cambiada(sender, instance, **kwargs):
+    VersionesReporte.incrementar([instance.user_id, getattr(instance, '_reportes_anfitrion_previo', None)])
+
+
+@receiver(post_delete, sender=Propiedades)
+def propiedad_eliminada(sender, instance, **kwargs):
+    VersionesReporte.incrementar([instance.user_id])
+
+
+@receiver(post_save, sender=Factura)
+@receiver(post_delete, sender=Factura)
+def factura_cambiada(sender, instance, **kwargs):
+    VersionesReporte.incrementar(
+        Reservas.objects.filter(pk=instance.reserva_id).values_list('propiedad__user_id', flat=True)
+    )
@@ -1,3 +1,149 @@
-from django.test import TestCase
+import json
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from apps.reservas.models import Reservas
+from apps.reservas.tests import ReservasTestCase
+from .ia import ProveedorLocal, TraduccionesIA
+from .models import ResumenMensualReservas, TraduccionIA
+from .services import ResumenReservasService
+
+META_HASH = 'meta-de-prueba'
+
+
+class ProveedorLocalTest(TestCase):
+
+    def completar(self, prompt: str) -> dict:
+        return json.loads(ProveedorLocal().completar('', {'prompt_usuario': prompt}))
+
+    def test_elige_tipo_por_palabra_clave(self):
+        self.assertEqual(self.completar('Ingresos por mes')['tipo_reporte'], 'ingresos')
+        self.assertEqual(self.completar('Ocupación de mis casas')['tipo_reporte'], 'ocupacion')
+        self.assertEqual(self.completar('algo sin palabras clave')['tipo_reporte'], 'reservas')
+
+    def test_toma_el_limite_del_prompt(self):
+        self.assertEqual(self.completar('Top 10 reservas')['limite'], 10)
+        self.assertNotIn('limite', self.completar('Todas las reservas'))
+
+
+class TraduccionesIATest(TestCase):
+
+    def guardar(self, prompt: str, config: dict, contexto: str = ''):
+        respuesta = ProveedorLocal().completar('', {'prompt_usuario': prompt})
+        TraduccionesIA.guardar(prompt, contexto, META_HASH, config, respuesta, ProveedorLocal.modelo)
+
+    def test_coincidencia_exacta_ignora_acentos_mayusculas_y_espacios(self):
+        self.guardar('Top 10 reservas de enero', {'tipo_reporte': 'reservas', 'limite': 10})
+
+        traduccion, por_similitud = TraduccionesIA.obtener('  TOP 10 reservas, de énero ', '', META_HASH)
+
+        self.assertIsNotNone(traduccion)
+        self.assertFalse(por_similitud)
+        self.assertEqual(traduccion.config['limite'], 10)
+        self.assertEqual(TraduccionIA.objects.get(pk=traduccion.pk).hits, 1)
+
+    def test_meta_o_contexto_distintos_no_coinciden(self):
+        self.guardar('Top 10 reservas de enero', {'tipo_reporte': 'reservas'})
+
+        self.assertIsNone(TraduccionesIA.obtener('Top 10 reservas de enero', '', 'otro-meta')[0])
+        self.assertIsNone(TraduccionesIA.obtener('Top 10 reservas de enero', 'solo confirmadas', META_HASH)[0])
+
+    def test_sin_umbral_no_busca_por_similitud(self):
+        self.guardar('Top 10 reservas de enero', {'tipo_reporte': 'reservas'})
+
+        with override_settings(REPORTES_IA_SIMILITUD_MINIMA=0):
+            self.assertIsNone(TraduccionesIA.obtener('Top 10 reservas en enero', '', META_HASH)[0])
+
+    @override_settings(REPORTES_IA_SIMILITUD_MINIMA=0.5)
+    def test_coincidencia_por_similitud(self):
+        self.guardar('Top 10 reservas confirmadas de enero', {'tipo_reporte': 'reservas', 'limite': 10})
+
+        traduccion, por_similitud = TraduccionesIA.obtener('Top 10 reservas confirmadas en enero', '', META_HASH)
+
+        self.assertIsNotNone(traduccion)
+        self.assertTrue(por_similitud)
+
+    @override_settings(REPORTES_IA_SIMILITUD_MINIMA=0.5)
+    def test_similitud_respeta_los_numeros(self):
+        # "top 10" y "top 20" son casi iguales como texto pero no como reporte
+        self.guardar('Top 10 reservas confirmadas de enero', {'tipo_reporte': 'reservas', 'limite': 10})
+
+        traduccion, _ = TraduccionesIA.obtener('Top 20 reservas confirmadas de enero', '', META_HASH)
+
+        self.assertIsNone(traduccion)
+
+    def test_guardar_resuelve_la_carrera_con_otra_peticion(self):
+        # Otra petición tradujo y guardó el mismo prompt entre obtener() y guardar()
+        self.guardar('Top 10 reservas de enero', {'tipo_reporte': 'ingresos'})
+
+        self.guardar('top 10 reservas de enero', {'tipo_reporte': 'reservas', 'limite': 10})
+
+        traduccion = TraduccionIA.objects.get()
+        self.assertEqual(traduccion.config, {'tipo_reporte': 'reservas', 'limite': 10})
+        self.assertEqual(traduccion.prompt, 'top 10 reservas de enero')
+
+
+class ResumenMensualReservasTest(ReservasTestCase):
+
+    def resumen(self) -> dict:
+        return {
+            (r.mes, r.status, r.pago_estado): (r.cantidad, r.noches, r.ingresos, r.descuentos)
+            for r in ResumenMensualReservas.objects.filter(propiedad=self.propiedad)
+        }
+
+    def test_deltas_de_alta_cambio_y_baja(self):
+        marzo, abril = date(self.anio, 3, 1), date(self.anio, 4, 1)
+        reserva = self.reservar(date(self.anio, 3, 10), date(self.anio, 3, 13), descuento=Decimal('5'))
+        self.assertEqual(self.resumen(), {(marzo, 'pendiente', 'pendiente'): (1, 3, Decimal('300'), Decimal('5'))})
+
+        reserva.status = 'confirmada'
+        reserva.pago_estado = 'pagado'
+        reserva.save()
+        # La fila que queda en cero se borra
+        self.assertEqual(self.resumen(), {(marzo, 'confirmada', 'pagado'): (1, 3, Decimal('300'), Decimal('5'))})
+
+        reserva.fecha_checkin = date(self.anio, 4, 2)
+        reserva.fecha_checkout = date(self.anio, 4, 4)
+        reserva.cant_noches = 2
+        reserva.monto_total = Decimal('200')
+        reserva.save()
+        self.assertEqual(self.resumen(), {(abril, 'confirmada', 'pagado'): (1, 2, Decimal('200'), Decimal('5'))})
+
+        reserva.delete()
+        self.assertEqual(self.resumen(), {})
+
+    def test_reconstruir_coincide_con_lo_incremental(self):
+        self.reservar(date(self.anio, 1, 5), date(self.anio, 1, 8))
+        self.reservar(date(self.anio, 1, 20), date(self.anio, 1, 22), pago_estado='pagado')
+        movida = self.reservar(date(self.anio, 2, 1), date(self.anio, 2, 3))
+        movida.status = 'cancelada'
+        movida.save()
+        self.reservar(date(self.anio, 2, 1), date(self.anio, 2, 6), descuento=Decimal('12.50'))
+
+        incremental = self.resumen()
+        ResumenReservasService.reconstruir([self.propiedad.pk])
+
+        self.assertEqual(self.resumen(), incremental)
+
+    def test_agregar_con_mes_parcial_coincide_con_las_reservas(self):
+        self.reservar(date(self.anio, 1, 5), date(self.anio, 1, 8))
+        self.reservar(date(self.anio, 1, 20), date(self.anio, 1, 22), status='confirmada')
+        self.reservar(date(self.anio, 2, 10), date(self.anio, 2, 12), descuento=Decimal('3'))
+        self.reservar(date(self.anio, 3, 1), date(self.anio, 3, 4), status='confirmada')
+        propiedades = type(self.propiedad).objects.filter(pk=self.propiedad.pk)
+
+        for filtros in [{}, {'fecha_inicio': f'{self.anio}-01-15'}, {'fecha_inicio': f'{self.anio}-02-01', 'status': 'confirmada'}]:
+            reservas = Reservas.objects.filter(propiedad=self.propiedad)
+            if filtros.get('fecha_inicio'):
+                reservas = reservas.filter(fecha_checkin__gte=filtros['fecha_inicio'])
+            if filtros.get('status'):
+                reservas = reservas.filter(status=filtros['status'])
+            for por in ([], ['mes'], ['mes', 'status']):
+                with self.subTest(filtros=filtros, por=por):
+                    esperado = ResumenReservasService._combinar(
+                        [ResumenReservasService._agregar_reservas(reservas, por)], por
+                    )
+                    obtenido = ResumenReservasService.agregar(reservas, propiedades, filtros, por)
+                    self.assertEqual(sorted(obtenido, key=str), sorted(esperado, key=str))
@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ReporteGenerado
+
+logger = logging.getLogger(__name__)
+
+
+class Latido(threading.Thread):
+    """
+    Renueva actualizado_en del trabajo mientras se genera, para que reclamar()
+    solo retome los que dejaron de latir (worker caído), no los que tardan.
+    """
+
+    def __init__(self, trabajo: ReporteGenerado):
+        super().__init__(daemon=True)
+        self.trabajo = trabajo
+        self.intervalo = getattr(settings, 'REPORTES_LATIDO_TRABAJO', 60)
+        self._fin = threading.Event()
+
+    def run(self):
+        try:
+            while not self._fin.wait(self.intervalo):
+                ColaReportes.propio(self.trabajo).update(actualizado_en=timezone.now())
+        finally:
+            # El hilo tiene su propia conexión
+            connection.close()
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+
+
+class ColaReportes:
+    """
+    Reportes en segundo plano sobre ReporteGenerado. Las vistas con ?async=1
+    solo crean la fila 'pendiente'; el comando procesar_reportes la reclama con
+    SELECT ... FOR UPDATE SKIP LOCKED, genera el reporte y guarda el JSON o el
+    archivo para que el cliente lo consulte o descargue después.
+    """
+
+    @staticmethod
+    def max_intentos() -> int:
+        return getattr(settings, 'REPORTES_MAX_INTENTOS', 3)
+
+    @staticmethod
+    def encolar(usuario, modo: str, datos: dict, formato: str = 'json', completo: bool = False) -> ReporteGenerado:
+        """
+        datos: payload validado (dinamico/exportar) o {'prompt', 'contexto_adicional'} (ia).
+        completo: en exportar, ignora 'limite' y exporta todas las filas.
+        """
+        payload = {'datos': datos}
+        if modo == 'exportar':
+            payload['completo'] = completo
+
+        return ReporteGenerado.objects.create(
+            usuario=usuario,
+            tipo_reporte=datos.get('tipo_reporte') or 'personalizado',
+            parametros_filtro=datos.get('filtros') or {},
+            prompt_ia=datos.get('prompt') or '',
+            formato_exportado=formato,
+            estado='pendiente',
+            modo=modo,
+            payload=payload,
+        )
+
+    @staticmethod
+    def propio(trabajo: ReporteGenerado):
+        """
+        La fila mientras siga reclamada por este worker: iniciado_en cambia si
+        otro la reclama después de REPORTES_TIMEOUT_TRABAJO sin latido.
+        """
+        return ReporteGenerado.objects.filter(pk=trabajo.pk, estado='procesando', iniciado_en=trabajo.iniciado_en)
+
+    @staticmethod
+    def reclamar(lote: int = 1) -> List[ReporteGenerado]:
+        """Toma trabajos pendientes (o abandonados por un worker caído, ver Latido)"""
+        ahora = timezone.now()
+        abandonado = ahora - timedelta(seconds=getattr(settings, 'REPORTES_TIMEOUT_TRABAJO', 1800))
+
+        with transaction.atomic():
+            trabajos = list(
+                ReporteGenerado.objects.select_for_update(skip_locked=True).filter(
+                    Q(estado='pendiente') |
+                    Q(estado='procesando', actualizado_en__lt=abandonado)
+                ).order_by('creado_en')[:lote]
+            )
+            ids = [t.pk for t in trabajos]
+            if not ids:
+                return []
+            # El intento se cuenta al reclamar para detectar trabajos que tumban al worker
+            ReporteGenerado.objects.filter(pk__in=ids).update(
+                estado='procesando', actualizado_en=ahora, iniciado_en=ahora, intentos=F('intentos') + 1
+            )
+        return list(ReporteGenerado.objects.filter(pk__in=ids).order_by('creado_en'))
+
+    @staticmethod
+    def liberar(trabajos: List[ReporteGenerado]):
+        ReporteGenerado.objects.filter(
+            pk__in=[t.pk for t in trabajos], estado='procesando'
+        ).update(estado='pendiente', actualizado_en=timezone.now())
+
+    @staticmethod
+    def procesar(trabajo: ReporteGenerado) -> bool:
+        """Genera un trabajo ya reclamado. True si quedó completado."""
+        # Import diferido: las vistas importan este módulo para encolar
+        from . import views
+
+        if trabajo.intentos > ColaReportes.max_intentos():
+            # Reclamado varias veces sin terminar: probablemente tumba al worker
+            return ColaReportes._fallar(trabajo, 'Se superó el número máximo de intentos')
+
+        usuario = trabajo.usuario
+        datos = (trabajo.payload or {}).get('datos') or {}
+        start = time.time()
+
+        latido = Latido(trabajo)
+        latido.start()
+        try:
+            if trabajo.modo == 'ia':
+                config, datos, content, _ = views._configuracion_desde_ia(
+                    datos.get('prompt') or '', datos.get('contexto_adicional') or ''
+                )
+                trabajo.configuracion_usada = config
+                trabajo.respuesta_ia = content
+
+            if trabajo.modo == 'exportar' and (trabajo.payload or {}).get('completo'):
+                archivo, filas = ColaReportes._exportar_completo(usuario, datos, trabajo.formato_exportado)
+                trabajo.resultado_resumen = {'total_registros': filas}
+                trabajo.configuracion_usada = {'campos': datos.get('campos_seleccionados'), 'completo': True}
+                trabajo.archivo.save(ColaReportes._nombre_archivo(trabajo), archivo, save=False)
+                archivo.close()
+            else:
+                resultado, _ = views._generar_reporte_desde_payload(usuario, datos)
+                trabajo.tipo_reporte = resultado.get('tipo_reporte') or trabajo.tipo_reporte
+                trabajo.parametros_filtro = resultado.get('filtros') or {}
+                trabajo.resultado_resumen = resultado.get('resumen') or {}
+                if trabajo.modo != 'ia':
+                    trabajo.configuracion_usada = views._configuracion_registro(resultado, datos)
+
+                if trabajo.modo == 'exportar':
+                    _, exportador = views.FORMATOS_EXPORTACION[trabajo.formato_exportado]
+                    trabajo.archivo.save(
+                        ColaReportes._nombre_archivo(trabajo), ContentFile(exportador(resultado)), save=False
+                    )
+                else:
+                    trabajo.resultado = resultado
+        except views.ErrorConfiguracionIA as e:
+            trabajo.resultado = e.respuesta
+            return ColaReportes._fallar(trabajo, str(e))
+        except Exception as e:
+            logger.exception(f"❌ Error generando reporte #{trabajo.pk}")
+            return ColaReportes._fallar(trabajo, str(e) or e.__class__.__name__)
+        finally:
+            latido.detener()
+
+        trabajo.estado = 'completado'
+        trabajo.error = ''
+        trabajo.tiempo_generacion = time.time() - start
+        trabajo.finalizado_en = timezone.now()
+        return ColaReportes._guardar(trabajo)
+
+    @staticmethod
+    def _fallar(trabajo: ReporteGenerado, mensaje: str) -> bool:
+        trabajo.estado = 'error'
+        trabajo.error = mensaje
+        trabajo.finalizado_en = timezone.now()
+        ColaReportes._guardar(trabajo)
+        return False
+
+    @staticmethod
+    def _guardar(trabajo: ReporteGenerado) -> bool:
+        """Guarda el resultado solo si el trabajo sigue siendo de este worker"""
+        with transaction.atomic():
+            if not ColaReportes.propio(trabajo).select_for_update().exists():
+                logger.warning(f"⚠️ Reporte #{trabajo.pk} reclamado por otro worker: se descarta este resultado")
+                if trabajo.archivo:
+                    trabajo.archivo.delete(save=False)
+                return False
+            trabajo.save()
+        return True
+
+    @staticmethod
+    def _nombre_archivo(trabajo: ReporteGenerado) -> str:
+        return f"reporte_{trabajo.tipo_reporte}_{trabajo.pk}.{trabajo.formato_exportado}"
+
+    @staticmethod
+    def _exportar_completo(usuario, datos: dict, formato: str):
+        """Exporta todas las filas (sin 'limite') a un archivo temporal. Retorna (File, filas)."""
+        import tempfile
+        from . import views
+
+        campos, filas = views._filas_exportacion(usuario, datos)
+        if formato == 'xlsx':
+            archivo, total = views._xlsx_en_archivo(campos, filas)
+            return File(archivo), total
+        if formato == 'pdf':
+            archivo, total = views._pdf_en_archivo(datos, campos, filas)
+            return File(archivo), total
+
+        total = []
+        archivo = tempfile.TemporaryFile()
+        for trozo in views._stream_csv(campos, filas, al_terminar=total.append):
+            archivo.write(trozo.encode('utf-8'))
+        archivo.seek(0)
+        return File(archivo), total[0]
@@ -7,4 +7,8 @@ urlpatterns = [
     path('dinamico/generar/', views.generar_reporte_dinamico, name='generar_reporte_dinamico'),
     path('dinamico/exportar/', views.exportar_reporte, name='exportar_reporte'),
     path('ia/', views.generar_reporte_por_ia, name='generar_reporte_por_ia'),
+    path('cache/', views.estadisticas_cache_reportes, name='estadisticas_cache_reportes'),
+    path('trabajos/', views.trabajos_reporte, name='trabajos_reporte'),
+    path('trabajos/<int:trabajo_id>/', views.detalle_trabajo_reporte, name='detalle_trabajo_reporte'),
+    path('trabajos/<int:trabajo_id>/descargar/', views.descargar_trabajo_reporte, name='descargar_trabajo_reporte'),
 ]
\ No newline at end of file
@@ -1,23 +1,29 @@
 import io
 import json
 import os
+import tempfile
 import time
 import traceback
 from datetime import datetime, timedelta
+from itertools import islice
+from operator import methodcaller
 
-import requests
 from django.db.models import Count, Sum, Avg
-from django.db.models.functions import TruncMonth
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
 from apps.permisos.permissions import HasPermission
 from apps.reservas.models import Reservas
+from apps.reservas.services import CalendarioService
 from apps.propiedades.models import Propiedades
 from apps.facturas.models import Factura
 from apps.usuarios.models import CustomUser
+from .ia import SYSTEM_PROMPT, ErrorConfiguracionIA, TraduccionesIA, obtener_proveedor
 from .models import ReporteGenerado
+from .pdf import RenderizadorPDF
+from .trabajos import ColaReportes
+from .services import CacheReportes, ResumenReservasService
 from .serializers import GenerarReporteDinamicoSerializer, ReporteIASerializer
 
 @api_view(['GET'])
@@ -33,22 +39,42 @@ def reportes_reservas(request):
             reservas = reservas.filter(fecha_checkin__gte=fecha_inicio)
         if fecha_fin:
             reservas = reservas.filter(fecha_checkout__lte=fecha_fin)
-        total_reservas = reservas.count()
-        total_ganancias = reservas.aggregate(total=Sum('monto_total'))['total'] or 0
-        reservas_por_estado = reservas.values('status').annotate(count=Count('id'), total=Sum('monto_total'))
-        reservas_por_propiedad = reservas.values('propiedad__nombre', 'propiedad__id').annotate(count=Count('id'), total=Sum('monto_total')).order_by('-total')
-        seis_meses_atras = datetime.now() - timedelta(days=180)
-        tendencia_mensual = reservas.filter(fecha_checkin__gte=seis_meses_atras).extra({
-            'month': "EXTRACT(month FROM fecha_checkin)",
-            'year': "EXTRACT(year FROM fecha_checkin)"
-        }).values('year', 'month').annotate(count=Count('id'), total=Sum('monto_total')).order_by('year', 'month')
+        # Agregados desde el resumen mensual (ver ResumenReservasService)
+        filtros = {'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin}
+        totales = ResumenReservasService.agregar(reservas, propiedades_usuario, filtros, [])[0]
+        total_reservas = totales['cantidad']
+        total_ganancias = totales['ingresos']
+        reservas_por_estado = sorted(
+            ({'status': i['status'], 'count': i['cantidad'], 'total': float(i['ingresos'])}
+             for i in ResumenReservasService.agregar(reservas, propiedades_usuario, filtros, ['status'])),
+            key=lambda i: -i['count']
+        )
+        reservas_por_propiedad = sorted(
+            ({'propiedad__nombre': i['propiedad__nombre'], 'propiedad__id': i['propiedad_id'],
+              'count': i['cantidad'], 'total': float(i['ingresos'])}
+             for i in ResumenReservasService.agregar(
+                 reservas, propiedades_usuario, filtros, ['propiedad_id', 'propiedad__nombre'])),
+            key=lambda i: -i['total']
+        )
+        seis_meses_atras = (datetime.now() - timedelta(days=180)).date()
+        inicio_tendencia = max(filter(None, [_parse_fecha_filtro(fecha_inicio), seis_meses_atras]))
+        tendencia_mensual = [
+            {'year': i['mes'].year, 'month': i['mes'].month, 'count': i['cantidad'], 'total': float(i['ingresos'])}
+            for i in sorted(
+                ResumenReservasService.agregar(
+                    reservas.filter(fecha_checkin__gte=seis_meses_atras), propiedades_usuario,
+                    dict(filtros, fecha_inicio=inicio_tendencia), ['mes']
+                ),
+                key=lambda i: i['mes']
+            )
+        ]
         datos_graficos = {
-            'estados': list(reservas_por_estado),
-            'propiedades': list(reservas_por_propiedad),
-            'tendencia_mensual': list(tendencia_mensual)
+            'estados': reservas_por_estado,
+            'propiedades': reservas_por_propiedad,
+            'tendencia_mensual': tendencia_mensual
         }
 
-        top_propiedades = list(reservas_por_propiedad[:5])
+        top_propiedades = reservas_por_propiedad[:5]
 
         reporte = {
             'total_reservas': total_reservas,
@@ -292,25 +318,45 @@ def _apply_filters(qs, tipo_reporte: str, filtros: dict):
     return qs
 
 
-def _rows_from_values(values_qs, campos):
-    rows = []
-    for item in values_qs:
-        row = {}
-        for campo in campos:
-            val = item.get(campo)
-            if hasattr(val, 'isoformat'):
-                row[campo] = val.isoformat()
-            else:
-                try:
-                    from decimal import Decimal
-                    if isinstance(val, Decimal):
-                        row[campo] = float(val)
-                    else:
-                        row[campo] = val
-                except Exception:
-                    row[campo] = val
-        rows.append(row)
-    return rows
+def _parse_fecha_filtro(valor):
+    if not valor:
+        return None
+    if hasattr(valor, 'isoformat'):
+        return valor
+    return datetime.strptime(str(valor)[:10], '%Y-%m-%d').date()
+
+
+# Conversión por columna según el 'tipo' del meta; number/string/bool ya son JSON
+CONVERSORES_POR_TIPO = {
+    'date': methodcaller('isoformat'),
+    'datetime': methodcaller('isoformat'),
+    'money': float,
+    'percent': float,
+}
+
+
+def _conversores(tipo_reporte: str, campos):
+    tipos = _meta_reportes()[tipo_reporte]['campos']
+    return [CONVERSORES_POR_TIPO.get(tipos[c]['tipo']) for c in campos]
+
+
+def _convertir_columna(columna, conversor):
+    if conversor is None:
+        return list(columna)
+    if None in columna:
+        return [None if v is None else conversor(v) for v in columna]
+    return list(map(conversor, columna))
+
+
+def _columnas_desde_tuplas(tuplas, conversores):
+    """Transpone las tuplas de values_list y convierte cada columna de una sola vez."""
+    if not tuplas:
+        return [[] for _ in conversores]
+    return [_convertir_columna(col, conv) for col, conv in zip(zip(*tuplas), conversores)]
+
+
+def _filas_desde_columnas(campos, columnas):
+    return [dict(zip(campos, fila)) for fila in zip(*columnas)]
 
 
 def _insights_basicos(tipo_reporte: str, resumen: dict):
@@ -330,18 +376,13 @@ def _insights_basicos(tipo_reporte: str, resumen: dict):
     return insights
 
 
-def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cache=None):
-    """Genera el reporte a partir del payload validado (sin depender de request)."""
-    start = time.time()
+TIPOS_CON_FILAS = ['reservas', 'propiedades', 'facturas', 'usuarios']
+
 
+def _preparar_consulta(user, payload: dict):
+    """Queryset acotado al usuario y filtrado, más los campos válidos del reporte."""
     tipo_reporte = payload['tipo_reporte']
     campos = payload.get('campos_seleccionados') or []
-    filtros = payload.get('filtros') or {}
-    agrupacion = payload.get('agrupacion')
-    ordenamiento = payload.get('ordenamiento')
-    limite = int(payload.get('limite') or 100)
-    incluir_estadisticas = bool(payload.get('incluir_estadisticas', True))
-    incluir_graficos = bool(payload.get('incluir_graficos', True))
 
     meta = _meta_reportes().get(tipo_reporte)
     if not meta:
@@ -351,15 +392,38 @@ def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cach
     if qs is None:
         raise PermissionError('No autorizado para este reporte')
 
-    if propiedades_usuario_cache is not None:
-        propiedades_usuario = propiedades_usuario_cache
-
-    campos_disponibles = set(meta.get('campos', {}).keys())
+    campos_disponibles = list(meta.get('campos', {}).keys())
     if not campos:
-        campos = list(campos_disponibles)[:10]
+        campos = campos_disponibles[:10]
     campos = [c for c in campos if c in campos_disponibles]
 
-    qs = _apply_filters(qs, tipo_reporte, filtros)
+    qs = _apply_filters(qs, tipo_reporte, payload.get('filtros') or {})
+    return qs, propiedades_usuario, campos
+
+
+def _consulta_filas(qs, campos, ordenamiento=None):
+    values_qs = qs.values_list(*campos)
+    if ordenamiento and ordenamiento in campos:
+        values_qs = values_qs.order_by(ordenamiento)
+    return values_qs
+
+
+def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cache=None):
+    """Genera el reporte a partir del payload validado (sin depender de request)."""
+    start = time.time()
+
+    tipo_reporte = payload['tipo_reporte']
+    filtros = payload.get('filtros') or {}
+    agrupacion = payload.get('agrupacion')
+    ordenamiento = payload.get('ordenamiento')
+    limite = int(payload.get('limite') or 100)
+    incluir_estadisticas = bool(payload.get('incluir_estadisticas', True))
+    incluir_graficos = bool(payload.get('incluir_graficos', True))
+    por_columnas = payload.get('formato_salida') == 'columnas'
+
+    qs, propiedades_usuario, campos = _preparar_consulta(user, payload)
+    if propiedades_usuario_cache is not None:
+        propiedades_usuario = propiedades_usuario_cache
 
     resultado = {
         'tipo_reporte': tipo_reporte,
@@ -369,24 +433,23 @@ def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cach
         'ordenamiento': ordenamiento,
     }
 
-    if tipo_reporte in ['reservas', 'propiedades', 'facturas', 'usuarios']:
-        values_qs = qs.values(*campos)
-        if ordenamiento and ordenamiento in campos:
-            values_qs = values_qs.order_by(ordenamiento)
-        resultado['rows'] = _rows_from_values(values_qs[:limite], campos)
+    if tipo_reporte in TIPOS_CON_FILAS:
+        tuplas = list(_consulta_filas(qs, campos, ordenamiento)[:limite])
+        columnas = _columnas_desde_tuplas(tuplas, _conversores(tipo_reporte, campos))
+        if por_columnas:
+            resultado['columnas'] = dict(zip(campos, columnas))
+        else:
+            resultado['rows'] = _filas_desde_columnas(campos, columnas)
 
     if tipo_reporte == 'ingresos':
-        trend = qs.annotate(mes=TruncMonth('fecha_checkin')).values('mes').annotate(
-            total=Sum('monto_total'),
-            count=Count('id'),
-        ).order_by('mes')
+        trend = ResumenReservasService.agregar(qs, propiedades_usuario, filtros, ['mes'])
         resultado['rows'] = [
             {
-                'mes': (item['mes'].date().isoformat() if item['mes'] else None),
-                'total': float(item['total'] or 0),
-                'count': item['count'],
+                'mes': item['mes'].isoformat(),
+                'total': float(item['ingresos']),
+                'count': item['cantidad'],
             }
-            for item in trend
+            for item in sorted(trend, key=lambda i: i['mes'])
         ]
 
     if tipo_reporte == 'ocupacion':
@@ -394,21 +457,29 @@ def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cach
             props_qs = Propiedades.objects.all()
         else:
             props_qs = propiedades_usuario or Propiedades.objects.filter(user=user)
+        if filtros.get('propiedad_id'):
+            props_qs = props_qs.filter(pk=filtros.get('propiedad_id'))
         total_propiedades = props_qs.count() or 1
 
-        trend = qs.annotate(mes=TruncMonth('fecha_checkin')).values('mes').annotate(
-            noches_reservadas=Sum('cant_noches'),
-        ).order_by('mes')
+        # Noches ocupadas dentro de cada mes, recortadas a fecha_inicio/fecha_fin
+        desde = _parse_fecha_filtro(filtros.get('fecha_inicio'))
+        hasta = _parse_fecha_filtro(filtros.get('fecha_fin'))
+        if filtros.get('status') or filtros.get('pago_estado'):
+            # El calendario solo tiene las reservas activas: se cuentan las que pasan el filtro
+            reservas = Reservas.objects.filter(propiedad__in=props_qs)
+            for campo in ('status', 'pago_estado'):
+                if filtros.get(campo):
+                    reservas = reservas.filter(**{campo: filtros[campo]})
+            noches_por_mes = CalendarioService.noches_por_mes_reservas(reservas, desde, hasta)
+        else:
+            noches_por_mes = CalendarioService.noches_por_mes(props_qs.values('pk'), desde=desde, hasta=hasta)
 
         rows = []
-        for item in trend:
-            mes = item['mes'].date() if item['mes'] else None
-            if not mes:
-                continue
+        for mes in sorted(noches_por_mes):
             next_month = (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
             days_in_month = (next_month - mes.replace(day=1)).days
             noches_posibles = days_in_month * total_propiedades
-            noches_reservadas = int(item['noches_reservadas'] or 0)
+            noches_reservadas = int(noches_por_mes[mes] or 0)
             ocupacion = (noches_reservadas / noches_posibles) if noches_posibles else 0
             rows.append({
                 'mes': mes.isoformat(),
@@ -423,17 +494,12 @@ def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cach
 
     if incluir_estadisticas:
         if tipo_reporte in ['reservas', 'ingresos', 'ocupacion']:
-            agg = qs.aggregate(
-                total_registros=Count('id'),
-                total_ingresos=Sum('monto_total'),
-                ingreso_promedio=Avg('monto_total'),
-                total_descuentos=Sum('descuento'),
-            )
+            agg = ResumenReservasService.agregar(qs, propiedades_usuario, filtros, [])[0]
             resumen.update({
-                'total_registros': int(agg.get('total_registros') or 0),
-                'total_ingresos': float(agg.get('total_ingresos') or 0),
-                'ingreso_promedio': float(agg.get('ingreso_promedio') or 0),
-                'total_descuentos': float(agg.get('total_descuentos') or 0),
+                'total_registros': int(agg['cantidad']),
+                'total_ingresos': float(agg['ingresos']),
+                'ingreso_promedio': float(agg['ingresos'] / agg['cantidad']) if agg['cantidad'] else 0.0,
+                'total_descuentos': float(agg['descuentos']),
             })
             if tipo_reporte == 'ocupacion' and resultado.get('rows'):
                 resumen['ocupacion_promedio'] = sum(r['ocupacion'] for r in resultado['rows']) / max(len(resultado['rows']), 1)
@@ -454,24 +520,29 @@ def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cach
 
     if incluir_graficos:
         if tipo_reporte == 'reservas':
-            por_estado = qs.values('status').annotate(count=Count('id'), total=Sum('monto_total')).order_by('-count')
-            por_propiedad = qs.values('propiedad__nombre').annotate(count=Count('id'), total=Sum('monto_total')).order_by('-total')[:10]
-            tendencia = qs.annotate(mes=TruncMonth('fecha_checkin')).values('mes').annotate(count=Count('id'), total=Sum('monto_total')).order_by('mes')
+            por_estado = ResumenReservasService.agregar(qs, propiedades_usuario, filtros, ['status'])
+            por_propiedad = ResumenReservasService.agregar(qs, propiedades_usuario, filtros, ['propiedad__nombre'])
+            tendencia = ResumenReservasService.agregar(qs, propiedades_usuario, filtros, ['mes'])
             graficos = {
                 'reservas_por_estado': [
-                    {'estado': i['status'], 'count': i['count'], 'total': float(i['total'] or 0)}
-                    for i in por_estado
+                    {'estado': i['status'], 'count': i['cantidad'], 'total': float(i['ingresos'])}
+                    for i in sorted(por_estado, key=lambda i: -i['cantidad'])
                 ],
                 'reservas_por_propiedad': [
-                    {'propiedad': i['propiedad__nombre'], 'count': i['count'], 'total': float(i['total'] or 0)}
-                    for i in por_propiedad
+                    {'propiedad': i['propiedad__nombre'], 'count': i['cantidad'], 'total': float(i['ingresos'])}
+                    for i in sorted(por_propiedad, key=lambda i: -i['ingresos'])[:10]
                 ],
                 'tendencia_mensual': [
-                    {'mes': (i['mes'].date().isoformat() if i['mes'] else None), 'count': i['count'], 'total': float(i['total'] or 0)}
-                    for i in tendencia
+                    {'mes': i['mes'].isoformat(), 'count': i['cantidad'], 'total': float(i['ingresos'])}
+                    for i in sorted(tendencia, key=lambda i: i['mes'])
                 ]
             }
 
+    if por_columnas and 'rows' in resultado:
+        # ingresos / ocupacion: pocas filas ya agregadas
+        rows = resultado.pop('rows')
+        resultado['columnas'] = {c: [r.get(c) for r in rows] for c in campos}
+
     resultado['resumen'] = resumen
     resultado['graficos'] = graficos
     resultado['insights'] = _insights_basicos(tipo_reporte, resumen)
@@ -481,6 +552,53 @@ def _generar_reporte_desde_payload(user, payload: dict, propiedades_usuario_cach
     return resultado, elapsed
 
 
+def _generar_reporte_cacheado(user, payload: dict):
+    """_generar_reporte_desde_payload pasando por CacheReportes. Retorna (resultado, segundos, desde_cache)."""
+    return CacheReportes.obtener_o_generar(
+        user, payload, lambda: _generar_reporte_desde_payload(user, payload)
+    )
+
+
+def _configuracion_registro(resultado: dict, payload: dict) -> dict:
+    """configuracion_usada que se guarda en ReporteGenerado"""
+    return {
+        'campos': resultado.get('campos'),
+        'agrupacion': resultado.get('agrupacion'),
+        'ordenamiento': resultado.get('ordenamiento'),
+        'limite': payload.get('limite') or 100,
+    }
+
+
+def _es_asincrono(request) -> bool:
+    """?async=1: encola el reporte y responde con el id del trabajo"""
+    return (request.query_params.get('async') or '').lower() in ('1', 'true', 'si')
+
+
+def _trabajo_a_dict(trabajo: ReporteGenerado, incluir_resultado: bool = False) -> dict:
+    data = {
+        'id': trabajo.id,
+        'estado': trabajo.estado,
+        'modo': trabajo.modo,
+        'tipo_reporte': trabajo.tipo_reporte,
+        'formato': trabajo.formato_exportado,
+        'error': trabajo.error or None,
+        'tiempo_generacion': trabajo.tiempo_generacion,
+        'creado_en': trabajo.creado_en.isoformat() if trabajo.creado_en else None,
+        'iniciado_en': trabajo.iniciado_en.isoformat() if trabajo.iniciado_en else None,
+        'finalizado_en': trabajo.finalizado_en.isoformat() if trabajo.finalizado_en else None,
+        'descarga': f'/api/reportes/trabajos/{trabajo.id}/descargar/' if trabajo.archivo else None,
+    }
+    if incluir_resultado:
+        data['reporte'] = trabajo.resultado
+        if trabajo.modo == 'ia':
+            data['config'] = trabajo.configuracion_usada
+    return data
+
+
+def _respuesta_encolado(trabajo: ReporteGenerado):
+    return JsonResponse({'status': 'success', 'trabajo': _trabajo_a_dict(trabajo)}, status=202)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, HasPermission])
 def generar_reporte_dinamico(request):
@@ -488,24 +606,23 @@ def generar_reporte_dinamico(request):
         serializer = GenerarReporteDinamicoSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         payload = serializer.validated_data
-        resultado, elapsed = _generar_reporte_desde_payload(request.user, payload)
+
+        if _es_asincrono(request):
+            return _respuesta_encolado(ColaReportes.encolar(request.user, 'dinamico', payload))
+
+        resultado, elapsed, desde_cache = _generar_reporte_cacheado(request.user, payload)
 
         ReporteGenerado.objects.create(
             usuario=request.user,
             tipo_reporte=resultado.get('tipo_reporte') or payload.get('tipo_reporte'),
-            configuracion_usada={
-                'campos': resultado.get('campos'),
-                'agrupacion': resultado.get('agrupacion'),
-                'ordenamiento': resultado.get('ordenamiento'),
-                'limite': payload.get('limite') or 100,
-            },
+            configuracion_usada=_configuracion_registro(resultado, payload),
             parametros_filtro=resultado.get('filtros') or {},
             resultado_resumen=resultado.get('resumen') or {},
             formato_exportado='json',
             tiempo_generacion=float(elapsed),
         )
 
-        return JsonResponse({'status': 'success', 'reporte': resultado})
+        return JsonResponse({'status': 'success', 'reporte': resultado, 'desde_cache': desde_cache})
     except Exception as e:
         traceback.print_exc()
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -514,17 +631,26 @@ def generar_reporte_dinamico(request):
 generar_reporte_dinamico.permission_codename = 'reportes.ver'
 
 
-def _export_csv(reporte: dict):
-    import csv
-    output = io.StringIO()
-    writer = csv.writer(output)
+def _tabla_reporte(reporte: dict):
+    """(campos, filas como listas) tanto de 'rows' como de 'columnas'"""
     campos = reporte.get('campos') or []
+    columnas = reporte.get('columnas')
+    if columnas is not None:
+        campos = campos or list(columnas)
+        return campos, [list(fila) for fila in zip(*(columnas.get(c, []) for c in campos))]
     rows = reporte.get('rows') or []
     if rows and not campos:
         campos = list(rows[0].keys())
+    return campos, [[r.get(c) for c in campos] for r in rows]
+
+
+def _export_csv(reporte: dict):
+    import csv
+    output = io.StringIO()
+    writer = csv.writer(output)
+    campos, filas = _tabla_reporte(reporte)
     writer.writerow(campos)
-    for r in rows:
-        writer.writerow([r.get(c) for c in campos])
+    writer.writerows(filas)
     return output.getvalue().encode('utf-8')
 
 
@@ -539,64 +665,166 @@ def _export_excel(reporte: dict):
     wb = Workbook()
     ws = wb.active
     ws.title = 'Reporte'
-    campos = reporte.get('campos') or []
-    rows = reporte.get('rows') or []
-    if rows and not campos:
-        campos = list(rows[0].keys())
+    campos, filas = _tabla_reporte(reporte)
     ws.append(campos)
-    for r in rows:
-        ws.append([r.get(c) for c in campos])
+    for fila in filas:
+        ws.append(fila)
     buff = io.BytesIO()
     wb.save(buff)
     return buff.getvalue()
 
 
+def _renderizar_pdf(destino, tipo_reporte: str, filtros, campos, filas) -> int:
+    meta_campos = (_meta_reportes().get(tipo_reporte) or {}).get('campos', {})
+    renderizador = RenderizadorPDF(destino, tipo_reporte or 'data', campos, meta_campos, filtros)
+    renderizador.agregar_filas(filas)
+    return renderizador.terminar()
+
+
 def _export_pdf(reporte: dict):
+    campos, filas = _tabla_reporte(reporte)
+    buff = io.BytesIO()
+    _renderizar_pdf(buff, reporte.get('tipo_reporte'), reporte.get('filtros'), campos, filas)
+    return buff.getvalue()
+
+
+# ---------- Exportación en streaming (sin límite de filas) ----------
+
+FILAS_POR_LOTE_EXPORTACION = 2000
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla"""
+    def write(self, valor):
+        return valor
+
+
+def _filas_exportacion(user, payload: dict):
+    """Campos e iterador de filas (listas) del reporte completo, ignorando 'limite'."""
+    if payload['tipo_reporte'] in TIPOS_CON_FILAS:
+        qs, _, campos = _preparar_consulta(user, payload)
+        tuplas = _consulta_filas(qs, campos, payload.get('ordenamiento')).iterator(
+            chunk_size=FILAS_POR_LOTE_EXPORTACION
+        )
+        return campos, _filas_por_lotes(tuplas, _conversores(payload['tipo_reporte'], campos))
+
+    # ingresos / ocupacion: filas ya agregadas por mes
+    reporte, _ = _generar_reporte_desde_payload(
+        user, dict(payload, incluir_estadisticas=False, incluir_graficos=False)
+    )
+    return _tabla_reporte(reporte)
+
+
+def _filas_por_lotes(tuplas, conversores):
+    """Convierte por columnas cada lote del iterador y entrega filas (listas)."""
+    while True:
+        lote = list(islice(tuplas, FILAS_POR_LOTE_EXPORTACION))
+        if not lote:
+            return
+        yield from map(list, zip(*_columnas_desde_tuplas(lote, conversores)))
+
+
+def _stream_csv(campos, filas, al_terminar=None):
+    import csv
+    writer = csv.writer(_Eco())
+    yield writer.writerow(campos)
+
+    total = 0
+    lote = []
+    for fila in filas:
+        lote.append(writer.writerow(fila))
+        if len(lote) >= FILAS_POR_LOTE_EXPORTACION:
+            total += len(lote)
+            yield ''.join(lote)
+            lote = []
+    if lote:
+        total += len(lote)
+        yield ''.join(lote)
+
+    if al_terminar:
+        al_terminar(total)
+
+
+def _xlsx_en_archivo(campos, filas):
+    """XLSX en modo write-only sobre un archivo temporal. Retorna (archivo, filas)."""
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
+        from openpyxl import Workbook
     except ImportError as e:
         raise RuntimeError(
-            "Falta dependencia 'reportlab' para exportar a PDF. "
+            "Falta dependencia 'openpyxl' para exportar a Excel. "
             "Activa el entorno virtual del backend y ejecuta: pip install -r requirements.txt"
         ) from e
 
-    buff = io.BytesIO()
-    c = canvas.Canvas(buff, pagesize=letter)
-    width, height = letter
-    y = height - 50
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Reporte')
+    ws.append(campos)
+    total = 0
+    for fila in filas:
+        ws.append(fila)
+        total += 1
 
-    c.setFont('Helvetica-Bold', 14)
-    c.drawString(50, y, f"Reporte: {reporte.get('tipo_reporte')}")
-    y -= 24
+    archivo = tempfile.TemporaryFile()
+    wb.save(archivo)
+    archivo.seek(0)
+    return archivo, total
 
-    c.setFont('Helvetica', 10)
-    filtros = reporte.get('filtros') or {}
-    c.drawString(50, y, f"Filtros: {json.dumps(filtros, ensure_ascii=False)}")
-    y -= 18
 
-    campos = reporte.get('campos') or []
-    rows = reporte.get('rows') or []
-    if rows and not campos:
-        campos = list(rows[0].keys())
+def _pdf_en_archivo(payload: dict, campos, filas):
+    """PDF paginado sobre un archivo temporal. Retorna (archivo, filas)."""
+    archivo = tempfile.TemporaryFile()
+    total = _renderizar_pdf(archivo, payload.get('tipo_reporte'), payload.get('filtros'), campos, filas)
+    archivo.seek(0)
+    return archivo, total
 
-    c.setFont('Helvetica-Bold', 9)
-    c.drawString(50, y, ' | '.join(campos[:8]))
-    y -= 14
-    c.setFont('Helvetica', 9)
-
-    for r in rows[:200]:
-        line = ' | '.join([str(r.get(col, '')) for col in campos[:8]])
-        c.drawString(50, y, line[:140])
-        y -= 12
-        if y < 60:
-            c.showPage()
-            y = height - 50
-            c.setFont('Helvetica', 9)
-
-    c.showPage()
-    c.save()
-    return buff.getvalue()
+
+def _exportar_en_streaming(request, payload: dict, formato: str, filename: str):
+    start = time.time()
+    campos, filas = _filas_exportacion(request.user, payload)
+
+    def registrar(total_filas):
+        try:
+            ReporteGenerado.objects.create(
+                usuario=request.user,
+                tipo_reporte=payload.get('tipo_reporte'),
+                configuracion_usada={
+                    'campos': campos,
+                    'ordenamiento': payload.get('ordenamiento'),
+                    'streaming': True,
+                },
+                parametros_filtro=payload.get('filtros') or {},
+                resultado_resumen={'total_registros': total_filas},
+                formato_exportado=formato,
+                tiempo_generacion=time.time() - start,
+            )
+        except Exception:
+            traceback.print_exc()
+
+    if formato == 'csv':
+        resp = StreamingHttpResponse(
+            _stream_csv(campos, filas, al_terminar=registrar),
+            content_type='text/csv; charset=utf-8',
+        )
+        resp['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        return resp
+
+    if formato == 'pdf':
+        archivo, total_filas = _pdf_en_archivo(payload, campos, filas)
+    else:
+        archivo, total_filas = _xlsx_en_archivo(campos, filas)
+    registrar(total_filas)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'{filename}.{formato}',
+        content_type=FORMATOS_EXPORTACION[formato][0],
+    )
+
+
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv; charset=utf-8', _export_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', _export_excel),
+    'pdf': ('application/pdf', _export_pdf),
+}
 
 
 @api_view(['POST'])
@@ -612,36 +840,38 @@ def exportar_reporte(request):
         serializer = GenerarReporteDinamicoSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         payload = serializer.validated_data
-        reporte, elapsed = _generar_reporte_desde_payload(request.user, payload)
-
-        filename = f"reporte_{reporte.get('tipo_reporte','data')}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-
-        if formato == 'csv':
-            content = _export_csv(reporte)
-            resp = HttpResponse(content, content_type='text/csv; charset=utf-8')
-            resp['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        elif formato in ['xlsx']:
-            content = _export_excel(reporte)
-            resp = HttpResponse(content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            resp['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-        elif formato == 'pdf':
-            content = _export_pdf(reporte)
-            resp = HttpResponse(content, content_type='application/pdf')
-            resp['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
-        else:
+
+        filename = f"reporte_{payload.get('tipo_reporte','data')}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+
+        # ?stream=1: exporta todas las filas sin 'limite' y con memoria constante
+        stream = (request.query_params.get('stream') or '').lower() in ('1', 'true', 'si')
+
+        if _es_asincrono(request):
+            if formato not in FORMATOS_EXPORTACION:
+                return JsonResponse({'status': 'error', 'message': 'Formato no soportado'}, status=400)
+            trabajo = ColaReportes.encolar(
+                request.user, 'exportar', payload, formato=formato, completo=stream
+            )
+            return _respuesta_encolado(trabajo)
+
+        if stream and formato in FORMATOS_EXPORTACION:
+            return _exportar_en_streaming(request, payload, formato, filename)
+
+        # Reutiliza el reporte si se acaba de ver con el mismo payload
+        reporte, elapsed, _ = _generar_reporte_cacheado(request.user, payload)
+
+        if formato not in FORMATOS_EXPORTACION:
             return JsonResponse({'status': 'error', 'message': 'Formato no soportado'}, status=400)
+        content_type, exportador = FORMATOS_EXPORTACION[formato]
+        resp = HttpResponse(exportador(reporte), content_type=content_type)
+        resp['Content-Disposition'] = f'attachment; filename="{filename}.{formato}"'
 
         # Registrar exportación
         try:
             ReporteGenerado.objects.create(
                 usuario=request.user,
                 tipo_reporte=reporte.get('tipo_reporte') or payload.get('tipo_reporte'),
-                configuracion_usada={
-                    'campos': reporte.get('campos'),
-                    'agrupacion': reporte.get('agrupacion'),
-                    'ordenamiento': reporte.get('ordenamiento'),
-                    'limite': payload.get('limite') or 100,
-                },
+                configuracion_usada=_configuracion_registro(reporte, payload),
                 parametros_filtro=reporte.get('filtros') or {},
                 resultado_resumen=reporte.get('resumen') or {},
                 formato_exportado=formato,
@@ -660,6 +890,70 @@ def exportar_reporte(request):
 exportar_reporte.permission_codename = 'reportes.ver'
 
 
+def _configuracion_desde_ia(prompt: str, contexto: str = ''):
+    """
+    Traduce el prompt a una configuración de generar_reporte_dinamico.
+    Retorna (config, config_validada, respuesta_cruda, desde_cache). Lanza ErrorConfiguracionIA.
+    """
+    meta = _meta_reportes()
+    meta_hash = TraduccionesIA.hash_meta(meta)
+
+    traduccion, por_similitud = TraduccionesIA.obtener(prompt, contexto, meta_hash)
+    if traduccion is not None:
+        dyn = GenerarReporteDinamicoSerializer(data=traduccion.config)
+        if dyn.is_valid():
+            if por_similitud:
+                print(f'🧠 Traducción IA reutilizada por similitud: "{prompt}" ~ "{traduccion.prompt}"')
+            return traduccion.config, dyn.validated_data, traduccion.respuesta_ia, True
+
+    proveedor = obtener_proveedor()
+    user_msg = {
+        'prompt_usuario': prompt,
+        'contexto_adicional': contexto,
+        'meta_permitido': meta,
+    }
+    content = proveedor.completar(SYSTEM_PROMPT, user_msg)
+    model = proveedor.modelo
+
+    try:
+        config = json.loads(content)
+    except Exception:
+        raise ErrorConfiguracionIA('La IA no devolvió JSON válido', raw=content)
+
+    # Sanear valores null/"" que rompen validación
+    if isinstance(config, dict):
+        for k in ['agrupacion', 'ordenamiento']:
+            if config.get(k) is None or config.get(k) == '':
+                config.pop(k, None)
+        if config.get('campos_seleccionados') is None:
+            config.pop('campos_seleccionados', None)
+        if config.get('filtros') is None:
+            config.pop('filtros', None)
+
+    # Validar que la config cumple el serializer
+    dyn = GenerarReporteDinamicoSerializer(data=config)
+    try:
+        dyn.is_valid(raise_exception=True)
+    except Exception as ve:
+        detail = getattr(ve, 'detail', None)
+        print('❌ IA config inválida (validación serializer)')
+        print('Prompt:', prompt)
+        print('Modelo:', model)
+        print('AI raw content:', content)
+        print('AI parsed config:', config)
+        # Errores de validación -> 400 para que el frontend muestre el mensaje
+        raise ErrorConfiguracionIA(
+            'Config generada por IA inválida',
+            validation_errors=detail if detail is not None else str(ve),
+            ai_model=model,
+            ai_raw=content,
+            ai_config=config,
+        )
+
+    TraduccionesIA.guardar(prompt, contexto, meta_hash, config, content, model)
+    return config, dyn.validated_data, content, False
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, HasPermission])
 def generar_reporte_por_ia(request):
@@ -670,91 +964,19 @@ def generar_reporte_por_ia(request):
 
         prompt = serializer.validated_data['prompt']
         contexto = serializer.validated_data.get('contexto_adicional') or ''
-        meta = _meta_reportes()
-
-        api_key = os.getenv('OPENAI_API_KEY') or os.getenv('VITE_OPENAI_API_KEY')
-        api_url = os.getenv('OPENAI_API_URL') or os.getenv('VITE_OPENAI_API_URL') or 'https://api.openai.com/v1/chat/completions'
-        model = os.getenv('OPENAI_MODEL') or os.getenv('VITE_OPENAI_MODEL') or 'gpt-4o-mini'
-
-        if not api_key:
-            return JsonResponse({'status': 'error', 'message': 'Falta OPENAI_API_KEY en el backend (.env).'}, status=500)
 
-        system = (
-            'Eres un analista de datos. Devuelve SOLO JSON válido (sin markdown). '\
-            'Debes mapear el pedido a una configuración para generar_reporte_dinamico con las claves: '\
-            'tipo_reporte, campos_seleccionados, filtros, agrupacion, ordenamiento, limite, incluir_estadisticas, incluir_graficos. '\
-            'Usa únicamente tipos/campos/filtros permitidos por este meta JSON. Si falta info, asume lo mínimo.'
-        )
-
-        user_msg = {
-            'prompt_usuario': prompt,
-            'contexto_adicional': contexto,
-            'meta_permitido': meta,
-        }
-
-        resp = requests.post(
-            api_url,
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-            },
-            json={
-                'model': model,
-                'messages': [
-                    {'role': 'system', 'content': system},
-                    {'role': 'user', 'content': json.dumps(user_msg, ensure_ascii=False)},
-                ],
-                'temperature': 0.2,
-            },
-            timeout=60,
-        )
-
-        if resp.status_code >= 400:
-            return JsonResponse({'status': 'error', 'message': 'Error consultando IA', 'detail': resp.text}, status=502)
+        if _es_asincrono(request):
+            trabajo = ColaReportes.encolar(
+                request.user, 'ia', {'prompt': prompt, 'contexto_adicional': contexto}
+            )
+            return _respuesta_encolado(trabajo)
 
-        data = resp.json()
-        content = data['choices'][0]['message']['content']
-        try:
-            config = json.loads(content)
-        except Exception:
-            return JsonResponse({'status': 'error', 'message': 'La IA no devolvió JSON válido', 'raw': content}, status=400)
-
-        # Sanear valores null/"" que rompen validación
-        if isinstance(config, dict):
-            for k in ['agrupacion', 'ordenamiento']:
-                if config.get(k) is None or config.get(k) == '':
-                    config.pop(k, None)
-            if config.get('campos_seleccionados') is None:
-                config.pop('campos_seleccionados', None)
-            if config.get('filtros') is None:
-                config.pop('filtros', None)
-
-        # Validar que la config cumple el serializer
-        dyn = GenerarReporteDinamicoSerializer(data=config)
         try:
-            dyn.is_valid(raise_exception=True)
-        except Exception as ve:
-            detail = getattr(ve, 'detail', None)
-            print('❌ IA config inválida (validación serializer)')
-            print('Prompt:', prompt)
-            print('Modelo:', model)
-            print('AI raw content:', content)
-            print('AI parsed config:', config)
-            # Errores de validación -> 400 para que el frontend muestre el mensaje
-            return JsonResponse(
-                {
-                    'status': 'error',
-                    'message': 'Config generada por IA inválida',
-                    'validation_errors': detail if detail is not None else str(ve),
-                    'ai_model': model,
-                    'ai_raw': content,
-                    'ai_config': config,
-                },
-                status=400,
-            )
-        valid = dyn.validated_data
+            config, valid, content, traduccion_cacheada = _configuracion_desde_ia(prompt, contexto)
+        except ErrorConfiguracionIA as e:
+            return JsonResponse(e.respuesta, status=e.status)
 
-        resultado, elapsed = _generar_reporte_desde_payload(request.user, valid)
+        resultado, elapsed, desde_cache = _generar_reporte_cacheado(request.user, valid)
 
         ReporteGenerado.objects.create(
             usuario=request.user,
@@ -765,13 +987,95 @@ def generar_reporte_por_ia(request):
             respuesta_ia=content,
             resultado_resumen=resultado.get('resumen') or {},
             formato_exportado='json',
+            modo='ia',
             tiempo_generacion=float(elapsed),
         )
 
-        return JsonResponse({'status': 'success', 'reporte': resultado, 'config': config})
+        return JsonResponse({
+            'status': 'success',
+            'reporte': resultado,
+            'config': config,
+            'desde_cache': desde_cache,
+            'traduccion_cacheada': traduccion_cacheada,
+        })
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+generar_reporte_por_ia.permission_codename = 'reportes.ver'
+
+# ---------- Trabajos en segundo plano ----------
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, HasPermission])
+def trabajos_reporte(request):
+    """Trabajos de reporte del usuario (los más recientes primero). ?estado= filtra."""
+    try:
+        qs = ReporteGenerado.objects.filter(usuario=request.user).exclude(payload={})
+        estado = request.query_params.get('estado')
+        if estado:
+            qs = qs.filter(estado=estado)
+        limite = min(int(request.query_params.get('limite') or 50), 200)
+        return JsonResponse({
+            'status': 'success',
+            'trabajos': [_trabajo_a_dict(t) for t in qs.defer('resultado')[:limite]],
+        })
     except Exception as e:
         traceback.print_exc()
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
-generar_reporte_por_ia.permission_codename = 'reportes.ver'
\ No newline at end of file
+trabajos_reporte.permission_codename = 'reportes.ver'
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, HasPermission])
+def detalle_trabajo_reporte(request, trabajo_id):
+    """Estado del trabajo; incluye el reporte JSON cuando está completado."""
+    trabajo = ReporteGenerado.objects.filter(pk=trabajo_id, usuario=request.user).first()
+    if not trabajo:
+        return JsonResponse({'status': 'error', 'message': 'Trabajo no encontrado'}, status=404)
+    return JsonResponse({
+        'status': 'success',
+        'trabajo': _trabajo_a_dict(trabajo, incluir_resultado=trabajo.estado in ('completado', 'error')),
+    })
+
+
+detalle_trabajo_reporte.permission_codename = 'reportes.ver'
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, HasPermission])
+def descargar_trabajo_reporte(request, trabajo_id):
+    """Archivo generado por un trabajo de exportación."""
+    trabajo = ReporteGenerado.objects.filter(pk=trabajo_id, usuario=request.user).first()
+    if not trabajo:
+        return JsonResponse({'status': 'error', 'message': 'Trabajo no encontrado'}, status=404)
+    if trabajo.estado != 'completado' or not trabajo.archivo:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'El trabajo no tiene archivo disponible',
+            'estado': trabajo.estado,
+        }, status=409)
+
+    content_type = FORMATOS_EXPORTACION.get(trabajo.formato_exportado, ('application/octet-stream',))[0]
+    return FileResponse(
+        trabajo.archivo.open('rb'),
+        as_attachment=True,
+        filename=os.path.basename(trabajo.archivo.name),
+        content_type=content_type,
+    )
+
+
+descargar_trabajo_reporte.permission_codename = 'reportes.ver'
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, HasPermission])
+def estadisticas_cache_reportes(request):
+    """Métricas del cache de reportes de este proceso."""
+    return JsonResponse({'status': 'success', 'cache': CacheReportes.estadisticas()})
+
+
+estadisticas_cache_reportes.permission_codename = 'reportes.ver'
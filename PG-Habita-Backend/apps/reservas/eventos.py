@@ -0,0 +1,109 @@
+import logging
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EventoReserva
+
+logger = logging.getLogger(__name__)
+
+
+class DespachoEventosReserva:
+    """
+    Consumidor del outbox EventoReserva (comando despachar_eventos_reserva).
+    Reclama eventos pendientes con SELECT ... FOR UPDATE SKIP LOCKED, crea sus
+    notificaciones y los marca procesados en la misma transacción: un evento
+    genera sus notificaciones una sola vez aunque corran varios despachadores.
+    Los correos salen después de confirmar.
+    """
+
+    @staticmethod
+    def max_intentos() -> int:
+        return getattr(settings, 'RESERVAS_EVENTOS_MAX_INTENTOS', 5)
+
+    @staticmethod
+    def pendientes():
+        return EventoReserva.objects.filter(
+            procesado_en__isnull=True, intentos__lt=DespachoEventosReserva.max_intentos()
+        )
+
+    @staticmethod
+    def despachar(lote: int = 100) -> Dict[str, int]:
+        """Procesa hasta 'lote' eventos. Retorna {'procesados', 'fallidos', 'notificaciones'}"""
+        from apps.notificaciones.services import DespachoNotificaciones
+
+        resultado = {'procesados': 0, 'fallidos': 0, 'notificaciones': 0}
+        with transaction.atomic():
+            eventos = list(
+                DespachoEventosReserva.pendientes().select_for_update(skip_locked=True, of=('self',)).select_related(
+                    'reserva__user', 'reserva__propiedad__user'
+                ).order_by('id')[:lote]
+            )
+            if not eventos:
+                return resultado
+
+            notificaciones = []
+            procesados = []
+            errores = {}
+            for evento in eventos:
+                try:
+                    notificaciones.extend(DespachoNotificaciones.preparar(evento.reserva, evento.evento))
+                    procesados.append(evento.pk)
+                except Exception as e:
+                    errores[evento.pk] = f'{type(e).__name__}: {e}'
+
+            creadas = []
+            try:
+                with transaction.atomic():
+                    creadas = DespachoNotificaciones.crear(notificaciones)
+                    EventoReserva.objects.filter(pk__in=procesados).update(procesado_en=timezone.now(), error='')
+            except DatabaseError as e:
+                # El lote completo vuelve a intentarse en la próxima vuelta
+                errores.update({pk: f'{type(e).__name__}: {e}' for pk in procesados})
+                procesados = []
+
+            for pk, error in errores.items():
+                logger.warning(f"⚠️ Evento de reserva #{pk} con error: {error}")
+                EventoReserva.objects.filter(pk=pk).update(intentos=F('intentos') + 1, error=error)
+
+            if creadas and getattr(settings, 'NOTIFICACIONES_EMAIL', False):
+                transaction.on_commit(lambda: DespachoEventosReserva.enviar_correos(creadas))
+
+        resultado.update(procesados=len(procesados), fallidos=len(errores), notificaciones=len(creadas))
+        return resultado
+
+    @staticmethod
+    def enviar_correos(notificaciones: List) -> int:
+        """Un correo por notificación con destinatario; marca 'enviada' las que salieron"""
+        from apps.notificaciones.models import Notificacion
+
+        enviadas = []
+        conexion = get_connection()
+        for notificacion in notificaciones:
+            destino = notificacion.usuario.correo or notificacion.usuario.email
+            if not destino:
+                continue
+            try:
+                EmailMessage(
+                    notificacion.titulo, notificacion.mensaje, settings.DEFAULT_FROM_EMAIL, [destino],
+                    connection=conexion,
+                ).send()
+                enviadas.append(notificacion.pk)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo enviar el correo de la notificación #{notificacion.pk}: {e}")
+        Notificacion.objects.filter(pk__in=enviadas).update(enviada=True)
+        return len(enviadas)
+
+    @staticmethod
+    def purgar(dias: int = None) -> int:
+        """Elimina los eventos procesados hace más de 'dias' (RESERVAS_EVENTOS_RETENCION_DIAS)"""
+        if dias is None:
+            dias = getattr(settings, 'RESERVAS_EVENTOS_RETENCION_DIAS', 7)
+        limite = timezone.now() - timedelta(days=dias)
+        eliminados, _ = EventoReserva.objects.filter(procesado_en__lt=limite).delete()
+        return eliminados
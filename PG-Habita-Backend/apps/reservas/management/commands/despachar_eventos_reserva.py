@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.reservas.eventos import DespachoEventosReserva
+
+
+class Command(BaseCommand):
+    help = 'Worker que convierte los eventos de reserva (outbox) en notificaciones y correos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100,
+                            help='Eventos a reclamar por vuelta')
+        parser.add_argument('--espera', type=float, default=1.0,
+                            help='Segundos a dormir cuando no hay eventos pendientes')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa lo pendiente y termina')
+
+    def handle(self, *args, **options):
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        purgados = DespachoEventosReserva.purgar()
+        self.stdout.write(f'📧 Despachador de eventos de reserva iniciado ({purgados} eventos antiguos eliminados)')
+        procesados = fallidos = notificaciones = 0
+
+        while not self.detener:
+            resultado = DespachoEventosReserva.despachar(options['lote'])
+            procesados += resultado['procesados']
+            fallidos += resultado['fallidos']
+            notificaciones += resultado['notificaciones']
+            if resultado['fallidos']:
+                self.stdout.write(self.style.WARNING(f"⚠️ {resultado['fallidos']} eventos con error"))
+
+            if resultado['procesados'] + resultado['fallidos'] < options['lote']:
+                if options['una_vez']:
+                    break
+                time.sleep(options['espera'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Despachador detenido: {procesados} eventos, {notificaciones} notificaciones, {fallidos} con error'
+        ))
+
+    def _detener(self, signum, frame):
+        self.detener = True
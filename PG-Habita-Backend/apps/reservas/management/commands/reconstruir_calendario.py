@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.reservas.services import CalendarioService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los calendarios de ocupación (mapas de bits) desde las reservas activas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--propiedad', type=int, action='append', dest='propiedades',
+                            help='ID de propiedad a reconstruir (se puede repetir)')
+
+    def handle(self, *args, **options):
+        filas = CalendarioService.reconstruir(options.get('propiedades'))
+        self.stdout.write(self.style.SUCCESS(f'✅ Calendarios reconstruidos: {filas} propiedad-año'))
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:34
+
+import logging
+import os
+
+import apps.reservas.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def _resumen(elementos, maximo: int = 50) -> str:
+    texto = ', '.join(elementos[:maximo])
+    return texto + (f' (y {len(elementos) - maximo} más)' if len(elementos) > maximo else '')
+
+
+def resolver_solapamientos(apps, schema_editor):
+    """
+    La restricción no se puede crear si ya hay reservas activas solapadas o
+    con check-out anterior al check-in (daterange falla). Sin
+    RESERVAS_RESOLVER_SOLAPAMIENTOS=1 la migración se detiene listándolas para
+    que se corrijan a mano; con él se rechazan las de fechas invertidas y la
+    más nueva de cada par solapado (la primera reserva conserva las fechas).
+    """
+    Reservas = apps.get_model('reservas', 'Reservas')
+    tabla = schema_editor.quote_name(Reservas._meta.db_table)
+    activas = Reservas.objects.exclude(status__in=['cancelada', 'rechazada'])
+    invertidas = list(
+        activas.filter(fecha_checkout__lt=models.F('fecha_checkin')).order_by('id').values_list('id', flat=True)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        # MATERIALIZED: las fechas invertidas se descartan antes de armar los rangos
+        cursor.execute(f"""
+            WITH activas AS MATERIALIZED (
+                SELECT id, propiedad_id, fecha_checkin, fecha_checkout
+                FROM {tabla}
+                WHERE status NOT IN ('cancelada', 'rechazada') AND fecha_checkout >= fecha_checkin
+            )
+            SELECT a.id, b.id, a.propiedad_id
+            FROM activas a
+            JOIN activas b ON b.propiedad_id = a.propiedad_id AND b.id > a.id
+                AND daterange(a.fecha_checkin, a.fecha_checkout, '[)')
+                    && daterange(b.fecha_checkin, b.fecha_checkout, '[)')
+            ORDER BY a.id, b.id
+        """)
+        pares = cursor.fetchall()
+    if not pares and not invertidas:
+        return
+
+    if os.getenv('RESERVAS_RESOLVER_SOLAPAMIENTOS') != '1':
+        problemas = []
+        if invertidas:
+            problemas.append(
+                f"{len(invertidas)} reservas activas con check-out anterior al check-in: "
+                + _resumen([f'#{pk}' for pk in invertidas])
+            )
+        if pares:
+            problemas.append(
+                f"{len(pares)} pares de reservas activas solapadas: "
+                + _resumen([f'#{a} y #{b} (propiedad #{p})' for a, b, p in pares])
+            )
+        raise RuntimeError(
+            '. '.join(problemas) + '. Corregirlas o migrar con RESERVAS_RESOLVER_SOLAPAMIENTOS=1 '
+            'para rechazar las de fechas invertidas y la más nueva de cada par.'
+        )
+
+    # Una reserva ya rechazada deja de solapar con las siguientes
+    rechazadas = set(invertidas)
+    for primera, segunda, _ in pares:
+        if primera not in rechazadas and segunda not in rechazadas:
+            rechazadas.add(segunda)
+    Reservas.objects.filter(pk__in=rechazadas).update(status='rechazada')
+    logger.warning(f"❌ Reservas rechazadas antes de crear reservas_sin_solapamiento: {sorted(rechazadas)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0009_alter_propiedades_latitud_alter_propiedades_longitud'),
+        ('reservas', '0005_reservas_servicios'),
+        ('servicios', '0002_alter_servicio_descripcion_alter_servicio_nombre'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # btree_gist permite combinar '=' sobre propiedad_id con '&&' sobre el rango
+        BtreeGistExtension(),
+        migrations.RunPython(resolver_solapamientos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservas',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['cancelada', 'rechazada']), _negated=True), expressions=[('propiedad', '='), (apps.reservas.models.RangoFechas('fecha_checkin', 'fecha_checkout', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='reservas_sin_solapamiento'),
+        ),
+    ]
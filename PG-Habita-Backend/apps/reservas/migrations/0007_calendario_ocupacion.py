@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:36
+
+import apps.reservas.models
+import django.db.models.deletion
+from datetime import date
+
+from django.db import migrations, models
+
+
+def construir_calendarios(apps, schema_editor):
+    """Genera los mapas de bits para las reservas activas existentes"""
+    Reservas = apps.get_model('reservas', 'Reservas')
+    CalendarioOcupacion = apps.get_model('reservas', 'CalendarioOcupacion')
+
+    valores = {}
+    reservas = Reservas.objects.exclude(status__in=['cancelada', 'rechazada']).values_list(
+        'propiedad_id', 'fecha_checkin', 'fecha_checkout'
+    )
+    for propiedad_id, inicio, fin in reservas.iterator():
+        actual = inicio
+        while actual and fin and actual < fin:
+            tope = min(fin, date(actual.year + 1, 1, 1))
+            primer_dia = actual.timetuple().tm_yday - 1
+            dia_fin = primer_dia + (tope - actual).days
+            mascara = ((1 << dia_fin) - 1) ^ ((1 << primer_dia) - 1)
+            clave = (propiedad_id, actual.year)
+            valores[clave] = valores.get(clave, 0) | mascara
+            actual = tope
+
+    CalendarioOcupacion.objects.bulk_create([
+        CalendarioOcupacion(
+            propiedad_id=propiedad_id,
+            anio=anio,
+            bits=valor.to_bytes(46, 'little'),
+            noches_ocupadas=bin(valor).count('1'),
+        )
+        for (propiedad_id, anio), valor in valores.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0010_indices_busqueda'),
+        ('reservas', '0006_reservas_sin_solapamiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarioOcupacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('bits', models.BinaryField(default=apps.reservas.models._bits_vacios)),
+                ('noches_ocupadas', models.PositiveSmallIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendarios', to='propiedades.propiedades')),
+            ],
+            options={
+                'verbose_name': 'Calendario de Ocupación',
+                'verbose_name_plural': 'Calendarios de Ocupación',
+                'db_table': 'calendario_ocupacion',
+                'constraints': [models.UniqueConstraint(fields=('propiedad', 'anio'), name='calendario_propiedad_anio_unico')],
+            },
+        ),
+        migrations.RunPython(construir_calendarios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0014_gazetteer'),
+        ('reservas', '0007_calendario_ocupacion'),
+        ('servicios', '0002_alter_servicio_descripcion_alter_servicio_nombre'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservas',
+            index=models.Index(fields=['fecha_checkin'], name='reservas_checkin_idx'),
+        ),
+    ]
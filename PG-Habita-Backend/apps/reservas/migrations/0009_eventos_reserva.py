@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0008_indice_checkin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento', models.CharField(max_length=50)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('procesado_en', models.DateTimeField(blank=True, null=True)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='reservas.reservas')),
+            ],
+            options={
+                'verbose_name': 'Evento de Reserva',
+                'verbose_name_plural': 'Eventos de Reserva',
+                'db_table': 'reservas_eventos',
+                'indexes': [models.Index(condition=models.Q(('procesado_en__isnull', True)), fields=['id'], name='reservas_eventos_pend_idx')],
+            },
+        ),
+    ]
@@ -1,10 +1,31 @@
-from django.db import models
+from typing import Dict, List, Optional
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import Q
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeBoundary, RangeOperators
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from apps.usuarios.models import CustomUser as User
 from apps.propiedades.models import Propiedades
 from apps.servicios.models import Servicio  # 🔥 AGREGADO: Import para servicios
 
+# Estados que liberan las fechas de la propiedad
+ESTADOS_LIBERADOS = ['cancelada', 'rechazada']
+
+# Valores previos que se guardan en save() para mantener datos derivados
+CAMPOS_SEGUIMIENTO = (
+    'propiedad_id', 'user_id', 'fecha_checkin', 'fecha_checkout',
+    'status', 'pago_estado', 'monto_total', 'descuento', 'cant_noches',
+)
+
+
+class RangoFechas(models.Func):
+    """daterange(checkin, checkout, '[)'): noches ocupadas por una reserva"""
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+
 class Reservas(models.Model):
     ESTADOS_RESERVA = [
         ('pendiente', 'Pendiente'),
@@ -42,6 +63,22 @@ class Reservas(models.Model):
         verbose_name = 'Reserva'
         verbose_name_plural = 'Reservas'
         ordering = ['-creado_en']
+        indexes = [
+            # Bordes de rango de fechas en los reportes agregados
+            models.Index(fields=['fecha_checkin'], name='reservas_checkin_idx'),
+        ]
+        constraints = [
+            # Índice GiST por propiedad + rango de fechas: el chequeo de solapamiento
+            # es una sola búsqueda en el índice y la base rechaza reservas duplicadas
+            ExclusionConstraint(
+                name='reservas_sin_solapamiento',
+                expressions=[
+                    ('propiedad', RangeOperators.EQUAL),
+                    (RangoFechas('fecha_checkin', 'fecha_checkout', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=~Q(status__in=ESTADOS_LIBERADOS),
+            ),
+        ]
 
     def __str__(self):
         return f"Reserva #{self.id} - {self.user.username}"
@@ -61,19 +98,15 @@ class Reservas(models.Model):
             if self.fecha_checkin < timezone.now().date():
                 errors['fecha_checkin'] = 'No se pueden crear reservas en fechas pasadas'
 
-        # Validación de solapamiento MEJORADA
-        if self.fecha_checkin and self.fecha_checkout and self.propiedad:
-            reservas_solapadas = Reservas.objects.filter(
-                propiedad=self.propiedad,
-                fecha_checkin__lt=self.fecha_checkout,
-                fecha_checkout__gt=self.fecha_checkin
-            ).exclude(status__in=['cancelada', 'rechazada'])
+        # Validación de solapamiento (búsqueda en el índice GiST)
+        if (self.fecha_checkin and self.fecha_checkout and self.propiedad_id
+                and self.fecha_checkout > self.fecha_checkin
+                and self.status not in ESTADOS_LIBERADOS):
+            from .services import DisponibilidadService
 
-            # Excluir la reserva actual si es una actualización
-            if self.pk:
-                reservas_solapadas = reservas_solapadas.exclude(pk=self.pk)
-
-            if reservas_solapadas.exists():
+            if not DisponibilidadService.esta_disponible(
+                self.propiedad_id, self.fecha_checkin, self.fecha_checkout, excluir_id=self.pk
+            ):
                 errors['__all__'] = 'Ya existe una reserva activa en estas fechas para esta propiedad'
 
         if errors:
@@ -81,36 +114,35 @@ class Reservas(models.Model):
 
     def save(self, *args, **kwargs):
         es_nuevo = self._state.adding
-        estado_anterior = None
-        pago_estado_anterior = None
-
-        if not es_nuevo:
-            try:
-                reserva_anterior = Reservas.objects.get(pk=self.pk)
-                estado_anterior = reserva_anterior.status
-                pago_estado_anterior = reserva_anterior.pago_estado
-            except Reservas.DoesNotExist:
-                pass
 
         self.clean()
-        super().save(*args, **kwargs)
-
         try:
-            from apps.notificaciones.services import NotificacionService
-
-            if es_nuevo:
-                self.notificar_nueva_reserva()
-            else:
-                # Notificar cambios de estado
-                if estado_anterior and estado_anterior != self.status:
-                    self.notificar_cambio_estado(estado_anterior)
-
-                # Notificar cambios en estado de pago
-                if pago_estado_anterior and pago_estado_anterior != self.pago_estado:
-                    self.notificar_cambio_pago(pago_estado_anterior)
-
-        except ImportError as e:
-            print(f"⚠️ Error enviando notificaciones: {e}")
+            with transaction.atomic():
+                previo = None
+                if not es_nuevo:
+                    # Fila bloqueada hasta confirmar: dos cambios simultáneos no
+                    # pueden partir del mismo estado (ni generar eventos repetidos)
+                    previo = Reservas.objects.select_for_update().filter(
+                        pk=self.pk
+                    ).values(*CAMPOS_SEGUIMIENTO).first()
+
+                # Disponible para los receivers de post_save (estadísticas, etc.)
+                self._previo = previo
+
+                super().save(*args, **kwargs)
+
+                # Calendario de ocupación en la misma transacción que la reserva
+                from .services import CalendarioService
+                CalendarioService.aplicar_cambio(previo, self)
+
+                # Notificaciones: solo se anotan los eventos (outbox); las crea
+                # el comando despachar_eventos_reserva después de confirmar
+                EventoReserva.registrar(previo, self)
+        except IntegrityError as e:
+            # Otra reserva ganó la carrera entre clean() y el INSERT
+            if 'reservas_sin_solapamiento' in str(e):
+                raise ValidationError({'__all__': 'Ya existe una reserva activa en estas fechas para esta propiedad'})
+            raise
 
     # 🔥 AGREGADO: Método para calcular total con servicios
     def calcular_total(self):
@@ -119,55 +151,93 @@ class Reservas(models.Model):
             total += servicio.precio
         return total
 
-    def notificar_nueva_reserva(self):
-        """Notificar creación de nueva reserva"""
-        try:
-            from apps.notificaciones.services import NotificacionService
-            NotificacionService.notificar_reserva_creada(self)
-            print(f"✅ Notificaciones enviadas para nueva reserva #{self.id}")
-        except Exception as e:
-            print(f"⚠️ Error enviando notificaciones de nueva reserva: {e}")
-
-    def notificar_cambio_estado(self, estado_anterior):
-        """Notificar cambios de estado importantes"""
-        try:
-            from apps.notificaciones.services import NotificacionService
-
-            if self.status == 'confirmada' and estado_anterior != 'confirmada':
-                NotificacionService.notificar_reserva_confirmada(self)
-
-            elif self.status == 'aceptada' and estado_anterior != 'aceptada':
-                NotificacionService.notificar_reserva_aceptada(self)
-
-            elif self.status == 'cancelada' and estado_anterior != 'cancelada':
-                # Determinar quién canceló (lógica simplificada)
-                cancelado_por_anfitrion = True  # Aquí podrías agregar lógica más compleja
-                NotificacionService.notificar_reserva_cancelada(self, cancelado_por_anfitrion)
-
-            elif self.status == 'rechazada' and estado_anterior != 'rechazada':
-                NotificacionService.notificar_reserva_rechazada(self)
 
-            elif self.status == 'completada' and estado_anterior != 'completada':
-                NotificacionService.notificar_reserva_completada(self)
+def _bits_vacios():
+    return bytes(CalendarioOcupacion.BYTES_POR_ANIO)
 
-            print(f"✅ Notificación de estado enviada para reserva #{self.id}: {estado_anterior} → {self.status}")
 
-        except Exception as e:
-            print(f"⚠️ Error enviando notificaciones de estado: {e}")
+class CalendarioOcupacion(models.Model):
+    """
+    Noches ocupadas de una propiedad en un año como mapa de bits:
+    el bit i (byte i // 8, máscara 1 << (i % 8)) es el día i + 1 del año.
+    Se mantiene desde Reservas.save() y al eliminar reservas.
+    """
+    BYTES_POR_ANIO = 46  # 366 bits
 
-    def notificar_cambio_pago(self, pago_estado_anterior):
-        """Notificar cambios en estado de pago"""
-        try:
-            from apps.notificaciones.services import NotificacionService
+    propiedad = models.ForeignKey(Propiedades, on_delete=models.CASCADE, related_name='calendarios')
+    anio = models.PositiveSmallIntegerField()
+    bits = models.BinaryField(default=_bits_vacios)
+    noches_ocupadas = models.PositiveSmallIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
 
-            if self.pago_estado == 'pagado' and pago_estado_anterior != 'pagado':
-                NotificacionService.notificar_pago_recibido(self)
+    class Meta:
+        db_table = 'calendario_ocupacion'
+        verbose_name = 'Calendario de Ocupación'
+        verbose_name_plural = 'Calendarios de Ocupación'
+        constraints = [
+            models.UniqueConstraint(fields=['propiedad', 'anio'], name='calendario_propiedad_anio_unico'),
+        ]
 
-            elif self.pago_estado == 'fallido' and pago_estado_anterior != 'fallido':
-                NotificacionService.notificar_pago_fallido(self)
+    def __str__(self):
+        return f"Calendario {self.propiedad_id} - {self.anio} ({self.noches_ocupadas} noches)"
+
+
+# Estado nuevo -> evento de notificación (claves de apps.notificaciones.plantillas)
+EVENTOS_ESTADO = {
+    'confirmada': 'reserva_confirmada',
+    'aceptada': 'reserva_confirmada',
+    # Se asume que cancela el anfitrión
+    'cancelada': 'reserva_cancelada_anfitrion',
+    'rechazada': 'reserva_rechazada',
+    'completada': 'reserva_completada',
+}
+EVENTOS_PAGO = {
+    'pagado': 'pago_recibido',
+    'fallido': 'pago_fallido',
+}
+
+
+class EventoReserva(models.Model):
+    """
+    Outbox de notificaciones de reservas. Reservas.save() escribe los eventos
+    en su propia transacción: si la reserva se guarda, el evento existe y si
+    se revierte, desaparece con ella. despachar_eventos_reserva los convierte
+    en Notificacion (y correos) fuera de la petición.
+    """
+    reserva = models.ForeignKey(Reservas, on_delete=models.CASCADE, related_name='eventos')
+    evento = models.CharField(max_length=50)
+    creado_en = models.DateTimeField(default=timezone.now, editable=False)
+    procesado_en = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
 
-            print(
-                f"✅ Notificación de pago enviada para reserva #{self.id}: {pago_estado_anterior} → {self.pago_estado}")
+    class Meta:
+        db_table = 'reservas_eventos'
+        verbose_name = 'Evento de Reserva'
+        verbose_name_plural = 'Eventos de Reserva'
+        indexes = [
+            # El despachador solo recorre los pendientes
+            models.Index(fields=['id'], name='reservas_eventos_pend_idx',
+                         condition=Q(procesado_en__isnull=True)),
+        ]
 
-        except Exception as e:
-            print(f"⚠️ Error enviando notificaciones de pago: {e}")
\ No newline at end of file
+    def __str__(self):
+        return f"{self.evento} - Reserva #{self.reserva_id}"
+
+    @staticmethod
+    def eventos(previo: Optional[Dict], reserva: Reservas) -> List[str]:
+        """Eventos que produce pasar de 'previo' (valores anteriores o None) a 'reserva'"""
+        if previo is None:
+            return ['reserva_creada']
+        eventos = []
+        if previo['status'] != reserva.status and reserva.status in EVENTOS_ESTADO:
+            eventos.append(EVENTOS_ESTADO[reserva.status])
+        if previo['pago_estado'] != reserva.pago_estado and reserva.pago_estado in EVENTOS_PAGO:
+            eventos.append(EVENTOS_PAGO[reserva.pago_estado])
+        return eventos
+
+    @staticmethod
+    def registrar(previo: Optional[Dict], reserva: Reservas):
+        EventoReserva.objects.bulk_create([
+            EventoReserva(reserva=reserva, evento=evento) for evento in EventoReserva.eventos(previo, reserva)
+        ])
@@ -4,6 +4,7 @@ from apps.propiedades.serializers import PropiedadesSerializer
 from apps.usuarios.serializers import CustomUserSerializer
 from apps.servicios.serializers import ServiciosSerializer
 from .models import Reservas
+from .services import DisponibilidadService
 from apps.servicios.models import Servicio
 
 class ReservaDetalleSerializer(serializers.ModelSerializer):
@@ -85,14 +86,11 @@ class ReservasSerializer(serializers.ModelSerializer):
             if fecha_checkin < timezone.now().date():
                 raise serializers.ValidationError({"fecha_checkin": "No se pueden crear reservas en fechas pasadas"})
             if propiedad:
-                reservas_solapadas = Reservas.objects.filter(
-                    propiedad=propiedad,
-                    fecha_checkin__lt=fecha_checkout,
-                    fecha_checkout__gt=fecha_checkin
-                ).exclude(status__in=['cancelada', 'rechazada'])
-                if instance:
-                    reservas_solapadas = reservas_solapadas.exclude(pk=instance.pk)
-                if reservas_solapadas.exists():
+                disponible = DisponibilidadService.esta_disponible(
+                    propiedad.pk, fecha_checkin, fecha_checkout,
+                    excluir_id=instance.pk if instance else None
+                )
+                if not disponible:
                     raise serializers.ValidationError({"fechas": "Ya existe una reserva activa en estas fechas para esta propiedad"})
         return data
 
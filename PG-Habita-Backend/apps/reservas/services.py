@@ -0,0 +1,281 @@
+import calendar
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.contrib.postgres.fields import RangeBoundary
+from django.db import transaction
+
+from .models import Reservas, RangoFechas, CalendarioOcupacion, ESTADOS_LIBERADOS
+
+
+class DisponibilidadService:
+    """
+    Consultas de disponibilidad sobre el índice GiST (propiedad, daterange)
+    definido por la restricción 'reservas_sin_solapamiento'.
+    """
+
+    @staticmethod
+    def periodo():
+        """Misma expresión que la restricción, para que Postgres use su índice"""
+        return RangoFechas('fecha_checkin', 'fecha_checkout', RangeBoundary())
+
+    @staticmethod
+    def reservas_activas(propiedad_id):
+        return Reservas.objects.filter(
+            propiedad_id=propiedad_id
+        ).exclude(
+            status__in=ESTADOS_LIBERADOS
+        )
+
+    @staticmethod
+    def reservas_solapadas(propiedad_id, checkin: Optional[date], checkout: Optional[date],
+                           excluir_id: Optional[int] = None):
+        """Reservas activas cuyas noches se cruzan con [checkin, checkout)"""
+        qs = DisponibilidadService.reservas_activas(propiedad_id).alias(
+            periodo=DisponibilidadService.periodo()
+        ).filter(
+            periodo__overlap=(checkin, checkout)
+        )
+        if excluir_id:
+            qs = qs.exclude(pk=excluir_id)
+        return qs
+
+    @staticmethod
+    def esta_disponible(propiedad_id, checkin: date, checkout: date, excluir_id: Optional[int] = None) -> bool:
+        return not DisponibilidadService.reservas_solapadas(
+            propiedad_id, checkin, checkout, excluir_id
+        ).exists()
+
+    @staticmethod
+    def intervalos_ocupados(propiedad_id, desde: Optional[date] = None,
+                            hasta: Optional[date] = None) -> List[Tuple[date, date]]:
+        """
+        Intervalos [checkin, checkout) de las reservas activas, ordenados.
+        Si se indica una ventana solo se leen las reservas que la cruzan.
+        """
+        if desde or hasta:
+            # Un extremo None deja el rango abierto por ese lado
+            qs = DisponibilidadService.reservas_solapadas(propiedad_id, desde, hasta)
+        else:
+            qs = DisponibilidadService.reservas_activas(propiedad_id)
+
+        intervalos = qs.order_by('fecha_checkin').values_list('fecha_checkin', 'fecha_checkout')
+
+        if desde or hasta:
+            return [
+                (max(inicio, desde) if desde else inicio, min(fin, hasta) if hasta else fin)
+                for inicio, fin in intervalos
+            ]
+        return list(intervalos)
+
+    @staticmethod
+    def fusionar_intervalos(intervalos: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+        """Une intervalos contiguos (checkout de uno == checkin del siguiente)"""
+        fusionados = []
+        for inicio, fin in sorted(intervalos):
+            if fusionados and inicio <= fusionados[-1][1]:
+                if fin > fusionados[-1][1]:
+                    fusionados[-1] = (fusionados[-1][0], fin)
+            else:
+                fusionados.append((inicio, fin))
+        return fusionados
+
+    @staticmethod
+    def expandir_fechas(intervalos: List[Tuple[date, date]]) -> List[str]:
+        """Lista de noches ocupadas en formato ISO"""
+        fechas = []
+        for inicio, fin in intervalos:
+            fechas.extend(
+                (inicio + timedelta(days=i)).isoformat()
+                for i in range((fin - inicio).days)
+            )
+        return fechas
+
+
+class CalendarioService:
+    """
+    Mantiene CalendarioOcupacion de forma incremental. Como la restricción
+    de exclusión impide reservas activas solapadas, marcar o liberar las
+    noches de una reserva es exacto sin volver a leer las demás.
+    """
+
+    @staticmethod
+    def _tramos_por_anio(inicio: date, fin: date):
+        """Divide [inicio, fin) en (anio, primer_dia, dia_fin) con días 0-based"""
+        actual = inicio
+        while actual < fin:
+            fin_anio = date(actual.year + 1, 1, 1)
+            tope = min(fin, fin_anio)
+            primer_dia = actual.timetuple().tm_yday - 1
+            yield actual.year, primer_dia, primer_dia + (tope - actual).days
+            actual = tope
+
+    @staticmethod
+    def _mascara(primer_dia: int, dia_fin: int) -> int:
+        return ((1 << dia_fin) - 1) ^ ((1 << primer_dia) - 1)
+
+    @staticmethod
+    def marcar(propiedad_id, inicio: date, fin: date, ocupado: bool = True):
+        """Marca (o libera) las noches [inicio, fin) de una propiedad"""
+        if not inicio or not fin or fin <= inicio:
+            return
+
+        with transaction.atomic():
+            for anio, primer_dia, dia_fin in CalendarioService._tramos_por_anio(inicio, fin):
+                qs = CalendarioOcupacion.objects.select_for_update().filter(
+                    propiedad_id=propiedad_id, anio=anio
+                )
+                if ocupado:
+                    CalendarioOcupacion.objects.get_or_create(propiedad_id=propiedad_id, anio=anio)
+                cal = qs.first()
+                if cal is None:
+                    # Liberar en un año sin calendario: no hay nada que hacer
+                    continue
+
+                valor = int.from_bytes(bytes(cal.bits), 'little')
+                mascara = CalendarioService._mascara(primer_dia, dia_fin)
+                valor = valor | mascara if ocupado else valor & ~mascara
+
+                cal.bits = valor.to_bytes(CalendarioOcupacion.BYTES_POR_ANIO, 'little')
+                cal.noches_ocupadas = valor.bit_count()
+                cal.save(update_fields=['bits', 'noches_ocupadas', 'actualizado_en'])
+
+    @staticmethod
+    def aplicar_cambio(previo: Optional[Dict], reserva: Reservas):
+        """Actualiza el calendario tras guardar una reserva (previo = valores anteriores)"""
+        antes = None
+        if previo and previo['status'] not in ESTADOS_LIBERADOS:
+            antes = (previo['propiedad_id'], previo['fecha_checkin'], previo['fecha_checkout'])
+
+        despues = None
+        if reserva.status not in ESTADOS_LIBERADOS:
+            despues = (reserva.propiedad_id, reserva.fecha_checkin, reserva.fecha_checkout)
+
+        if antes == despues:
+            return
+        if antes:
+            CalendarioService.marcar(*antes, ocupado=False)
+        if despues:
+            CalendarioService.marcar(*despues, ocupado=True)
+
+    @staticmethod
+    def liberar(reserva: Reservas):
+        if reserva.status not in ESTADOS_LIBERADOS:
+            CalendarioService.marcar(
+                reserva.propiedad_id, reserva.fecha_checkin, reserva.fecha_checkout, ocupado=False
+            )
+
+    @staticmethod
+    def reconstruir(propiedad_ids: Optional[Iterable[int]] = None) -> int:
+        """Recalcula los calendarios desde las reservas activas. Retorna filas escritas."""
+        reservas = Reservas.objects.exclude(status__in=ESTADOS_LIBERADOS)
+        calendarios = CalendarioOcupacion.objects.all()
+        if propiedad_ids is not None:
+            propiedad_ids = list(propiedad_ids)
+            reservas = reservas.filter(propiedad_id__in=propiedad_ids)
+            calendarios = calendarios.filter(propiedad_id__in=propiedad_ids)
+
+        valores = {}
+        for propiedad_id, inicio, fin in reservas.values_list(
+                'propiedad_id', 'fecha_checkin', 'fecha_checkout').iterator(chunk_size=2000):
+            if not inicio or not fin or fin <= inicio:
+                continue
+            for anio, primer_dia, dia_fin in CalendarioService._tramos_por_anio(inicio, fin):
+                clave = (propiedad_id, anio)
+                valores[clave] = valores.get(clave, 0) | CalendarioService._mascara(primer_dia, dia_fin)
+
+        with transaction.atomic():
+            calendarios.delete()
+            CalendarioOcupacion.objects.bulk_create([
+                CalendarioOcupacion(
+                    propiedad_id=propiedad_id,
+                    anio=anio,
+                    bits=valor.to_bytes(CalendarioOcupacion.BYTES_POR_ANIO, 'little'),
+                    noches_ocupadas=valor.bit_count(),
+                )
+                for (propiedad_id, anio), valor in valores.items()
+            ], batch_size=1000)
+        return len(valores)
+
+    @staticmethod
+    def obtener_bits(propiedad_id, anio: int) -> bytes:
+        bits = CalendarioOcupacion.objects.filter(
+            propiedad_id=propiedad_id, anio=anio
+        ).values_list('bits', flat=True).first()
+        return bytes(bits) if bits is not None else bytes(CalendarioOcupacion.BYTES_POR_ANIO)
+
+    @staticmethod
+    def a_rle(bits: bytes, dias: int = 366) -> List[List[int]]:
+        """Tramos ocupados como [dia_inicio, cantidad] (días 0-based desde el 1 de enero)"""
+        valor = int.from_bytes(bits, 'little')
+        tramos = []
+        dia = 0
+        while valor and dia < dias:
+            # Saltar ceros hasta el siguiente bit encendido
+            ceros = (valor & -valor).bit_length() - 1
+            valor >>= ceros
+            dia += ceros
+            if dia >= dias:
+                break
+            # Contar unos consecutivos
+            unos = (~valor & (valor + 1)).bit_length() - 1
+            tramos.append([dia, min(unos, dias - dia)])
+            valor >>= unos
+            dia += unos
+        return tramos
+
+    @staticmethod
+    def noches_por_mes(propiedad_ids, desde: Optional[date] = None,
+                       hasta: Optional[date] = None) -> Dict[date, int]:
+        """
+        Noches ocupadas por mes sumando todas las propiedades indicadas.
+        desde/hasta recortan por día (hasta es exclusivo).
+        """
+        calendarios = CalendarioOcupacion.objects.filter(propiedad_id__in=propiedad_ids)
+        if desde:
+            calendarios = calendarios.filter(anio__gte=desde.year)
+        if hasta:
+            calendarios = calendarios.filter(anio__lte=hasta.year)
+
+        totales: Dict[date, int] = {}
+        for anio, bits in calendarios.values_list('anio', 'bits').iterator(chunk_size=500):
+            valor = int.from_bytes(bytes(bits), 'little')
+            if not valor:
+                continue
+            for mes in range(1, 13):
+                inicio = date(anio, mes, 1)
+                fin = date(anio, mes, calendar.monthrange(anio, mes)[1]) + timedelta(days=1)
+                if desde and fin <= desde or hasta and inicio >= hasta:
+                    continue
+                inicio_rec = max(inicio, desde) if desde else inicio
+                fin_rec = min(fin, hasta) if hasta else fin
+                primer_dia = inicio_rec.timetuple().tm_yday - 1
+                dia_fin = primer_dia + (fin_rec - inicio_rec).days
+                noches = (valor & CalendarioService._mascara(primer_dia, dia_fin)).bit_count()
+                if noches:
+                    totales[inicio] = totales.get(inicio, 0) + noches
+        return totales
+
+    @staticmethod
+    def noches_por_mes_reservas(reservas, desde: Optional[date] = None,
+                                hasta: Optional[date] = None) -> Dict[date, int]:
+        """
+        Lo mismo que noches_por_mes, pero contando solo las reservas indicadas
+        (p. ej. filtradas por estado o pago): cada estadía se reparte entre los
+        meses en que cae, recortada a desde/hasta (hasta es exclusivo).
+        """
+        if desde:
+            reservas = reservas.filter(fecha_checkout__gt=desde)
+        if hasta:
+            reservas = reservas.filter(fecha_checkin__lt=hasta)
+
+        totales: Dict[date, int] = {}
+        for inicio, fin in reservas.values_list('fecha_checkin', 'fecha_checkout').iterator(chunk_size=2000):
+            inicio = max(inicio, desde) if desde else inicio
+            fin = min(fin, hasta) if hasta else fin
+            while inicio < fin:
+                mes = inicio.replace(day=1)
+                tope = min(fin, (mes + timedelta(days=32)).replace(day=1))
+                totales[mes] = totales.get(mes, 0) + (tope - inicio).days
+                inicio = tope
+        return totales
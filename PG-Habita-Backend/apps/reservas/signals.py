@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Reservas
+
+
+@receiver(post_delete, sender=Reservas)
+def liberar_calendario(sender, instance, **kwargs):
+    """Libera las noches también en borrados en cascada (usuario/propiedad)"""
+    from .services import CalendarioService
+    CalendarioService.liberar(instance)
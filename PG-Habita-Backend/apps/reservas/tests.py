@@ -1,3 +1,153 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from itertools import count
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.propiedades.models import Propiedades
+from apps.roles.models import Rol
+from apps.usuarios.models import CustomUser
+from .models import CalendarioOcupacion, ESTADOS_LIBERADOS, Reservas
+from .services import CalendarioService
+
+
+_celulares = count(70000000)
+
+
+def crear_usuario(nombre: str) -> CustomUser:
+    rol, _ = Rol.objects.get_or_create(nombre='PRUEBAS')
+    return CustomUser.objects.create_user(
+        username=nombre, correo=f'{nombre}@example.com', N_Cel=str(next(_celulares)),
+        password='clave-de-prueba', rol=rol,
+    )
+
+
+class ReservasTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anfitrion = crear_usuario('anfitrion_calendario')
+        cls.huesped = crear_usuario('huesped_calendario')
+        cls.propiedad = Propiedades.objects.create(
+            user=cls.anfitrion, nombre='Casa Calendario', descripcion='Casa de prueba', tipo='casa',
+            precio_noche=100, direccion_completa='Calle 1',
+        )
+        cls.anio = timezone.localdate().year + 1
+
+    def reservar(self, inicio: date, fin: date, **campos) -> Reservas:
+        noches = (fin - inicio).days
+        return Reservas.objects.create(
+            user=self.huesped, propiedad=self.propiedad, fecha_checkin=inicio, fecha_checkout=fin,
+            cant_huesp=1, cant_noches=noches, monto_total=Decimal(100 * noches), **campos
+        )
+
+    def tramos(self, anio: int):
+        return CalendarioService.a_rle(CalendarioService.obtener_bits(self.propiedad.pk, anio))
+
+
+class CalendarioRLETest(SimpleTestCase):
+
+    def test_a_rle(self):
+        valor = 0b1110011 | (1 << 365)
+        bits = valor.to_bytes(CalendarioOcupacion.BYTES_POR_ANIO, 'little')
+
+        self.assertEqual(CalendarioService.a_rle(bits), [[0, 2], [4, 3], [365, 1]])
+        self.assertEqual(CalendarioService.a_rle(bits, dias=365), [[0, 2], [4, 3]])
+        self.assertEqual(CalendarioService.a_rle(bytes(CalendarioOcupacion.BYTES_POR_ANIO)), [])
+
+
+class CalendarioOcupacionTest(ReservasTestCase):
+
+    def test_reserva_marca_sus_noches(self):
+        self.reservar(date(self.anio, 3, 10), date(self.anio, 3, 14))
+
+        dia = date(self.anio, 3, 10).timetuple().tm_yday - 1
+        self.assertEqual(self.tramos(self.anio), [[dia, 4]])
+        self.assertEqual(CalendarioOcupacion.objects.get(propiedad=self.propiedad, anio=self.anio).noches_ocupadas, 4)
+
+    def test_reserva_que_cruza_el_anio(self):
+        self.reservar(date(self.anio, 12, 30), date(self.anio + 1, 1, 3))
+
+        self.assertEqual(self.tramos(self.anio), [[date(self.anio, 12, 30).timetuple().tm_yday - 1, 2]])
+        self.assertEqual(self.tramos(self.anio + 1), [[0, 2]])
+
+    def test_cambio_de_fechas_mueve_las_noches(self):
+        reserva = self.reservar(date(self.anio, 5, 1), date(self.anio, 5, 4))
+        reserva.fecha_checkin = date(self.anio, 5, 10)
+        reserva.fecha_checkout = date(self.anio, 5, 12)
+        reserva.save()
+
+        self.assertEqual(self.tramos(self.anio), [[date(self.anio, 5, 10).timetuple().tm_yday - 1, 2]])
+
+    def test_cancelar_y_borrar_liberan(self):
+        cancelada = self.reservar(date(self.anio, 6, 1), date(self.anio, 6, 3))
+        borrada = self.reservar(date(self.anio, 6, 10), date(self.anio, 6, 12))
+
+        cancelada.status = 'cancelada'
+        cancelada.save()
+        borrada.delete()
+
+        self.assertEqual(self.tramos(self.anio), [])
+
+    def test_noches_liberadas_se_pueden_volver_a_reservar(self):
+        reserva = self.reservar(date(self.anio, 7, 1), date(self.anio, 7, 5))
+        with self.assertRaises(ValidationError):
+            self.reservar(date(self.anio, 7, 4), date(self.anio, 7, 6))
+
+        reserva.status = 'rechazada'
+        reserva.save()
+        self.reservar(date(self.anio, 7, 4), date(self.anio, 7, 6))
+
+        self.assertEqual(self.tramos(self.anio), [[date(self.anio, 7, 4).timetuple().tm_yday - 1, 2]])
+
+    def test_reconstruir_coincide_con_lo_incremental(self):
+        self.reservar(date(self.anio, 1, 5), date(self.anio, 1, 8))
+        self.reservar(date(self.anio, 12, 28), date(self.anio + 1, 1, 2))
+        movida = self.reservar(date(self.anio, 2, 1), date(self.anio, 2, 3))
+        movida.fecha_checkout = date(self.anio, 2, 6)
+        movida.save()
+        self.reservar(date(self.anio, 3, 1), date(self.anio, 3, 3), status='cancelada')
+
+        incremental = {
+            (c.anio, bytes(c.bits), c.noches_ocupadas)
+            for c in CalendarioOcupacion.objects.filter(propiedad=self.propiedad, noches_ocupadas__gt=0)
+        }
+        CalendarioService.reconstruir([self.propiedad.pk])
+        reconstruido = {
+            (c.anio, bytes(c.bits), c.noches_ocupadas)
+            for c in CalendarioOcupacion.objects.filter(propiedad=self.propiedad)
+        }
+        self.assertEqual(incremental, reconstruido)
+
+    def test_noches_por_mes(self):
+        self.reservar(date(self.anio, 1, 30), date(self.anio, 2, 3))
+        self.reservar(date(self.anio, 2, 10), date(self.anio, 2, 12), status='cancelada')
+        propiedades = [self.propiedad.pk]
+
+        self.assertEqual(
+            CalendarioService.noches_por_mes(propiedades),
+            {date(self.anio, 1, 1): 2, date(self.anio, 2, 1): 2},
+        )
+        # desde/hasta recortan por día (hasta exclusivo)
+        self.assertEqual(
+            CalendarioService.noches_por_mes(propiedades, desde=date(self.anio, 1, 31), hasta=date(self.anio, 2, 2)),
+            {date(self.anio, 1, 1): 1, date(self.anio, 2, 1): 1},
+        )
+
+    def test_noches_por_mes_reservas_usa_la_misma_definicion(self):
+        self.reservar(date(self.anio, 1, 30), date(self.anio, 2, 3), status='confirmada')
+        self.reservar(date(self.anio, 3, 29), date(self.anio, 4, 2))
+        activas = Reservas.objects.filter(propiedad=self.propiedad).exclude(status__in=ESTADOS_LIBERADOS)
+
+        for desde, hasta in [(None, None), (date(self.anio, 2, 1), None), (date(self.anio, 1, 31), date(self.anio, 4, 1))]:
+            with self.subTest(desde=desde, hasta=hasta):
+                self.assertEqual(
+                    CalendarioService.noches_por_mes_reservas(activas, desde, hasta),
+                    CalendarioService.noches_por_mes([self.propiedad.pk], desde, hasta),
+                )
+        self.assertEqual(
+            CalendarioService.noches_por_mes_reservas(activas.filter(status='confirmada')),
+            {date(self.anio, 1, 1): 2, date(self.anio, 2, 1): 2},
+        )
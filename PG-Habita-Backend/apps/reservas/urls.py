@@ -2,7 +2,9 @@ from django.urls import path
 from .views import (
     ReservaListCreate,
     ReservaRetrieveUpdateDestroy,
-    FechasOcupadasView
+    FechasOcupadasView,
+    DisponibilidadView,
+    CalendarioOcupacionView
 )
 
 urlpatterns = [
@@ -14,4 +16,10 @@ urlpatterns = [
 
     # Obtener fechas ocupadas de una propiedad
     path('fechas-ocupadas/<int:propiedad_id>/', FechasOcupadasView.as_view(), name='fechas_ocupadas'),
+
+    # Consultar si un rango de fechas está libre
+    path('disponibilidad/<int:propiedad_id>/', DisponibilidadView.as_view(), name='disponibilidad'),
+
+    # Calendario de ocupación precalculado (RLE / bits)
+    path('calendario/<int:propiedad_id>/', CalendarioOcupacionView.as_view(), name='calendario_ocupacion'),
 ]
\ No newline at end of file
@@ -1,10 +1,16 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+import base64
+import calendar
+from datetime import datetime
+
+from django.http import HttpResponse
 from django.utils import timezone
 
 from .models import Reservas
 from .serializers import ReservasSerializer, ReservaDetalleSerializer
+from .services import DisponibilidadService, CalendarioService
 
 
 class ReservaListCreate(generics.ListCreateAPIView):
@@ -86,25 +92,22 @@ class FechasOcupadasView(APIView):
 
     def get(self, request, propiedad_id):
         try:
-            # Obtener fechas ocupadas (excluyendo reservas canceladas/rechazadas)
-            reservas_activas = Reservas.objects.filter(
-                propiedad_id=propiedad_id
-            ).exclude(
-                status__in=['cancelada', 'rechazada']
-            )
+            # Ventana opcional (?desde=YYYY-MM-DD&hasta=YYYY-MM-DD)
+            desde = _parse_fecha(request.query_params.get('desde'))
+            hasta = _parse_fecha(request.query_params.get('hasta'))
 
-            fechas_ocupadas = []
-            for reserva in reservas_activas:
-                # Generar rango de fechas entre checkin y checkout
-                current_date = reserva.fecha_checkin
-                while current_date < reserva.fecha_checkout:
-                    fechas_ocupadas.append(current_date.isoformat())
-                    current_date += timezone.timedelta(days=1)
+            # Una sola consulta sobre el índice (excluye canceladas/rechazadas)
+            intervalos = DisponibilidadService.intervalos_ocupados(propiedad_id, desde, hasta)
+            fusionados = DisponibilidadService.fusionar_intervalos(intervalos)
 
             return Response({
-                'fechas_ocupadas': fechas_ocupadas,
+                'fechas_ocupadas': DisponibilidadService.expandir_fechas(fusionados),
+                'intervalos': [
+                    {'inicio': inicio.isoformat(), 'fin': fin.isoformat()}
+                    for inicio, fin in fusionados
+                ],
                 'propiedad_id': propiedad_id,
-                'total_reservas': reservas_activas.count()
+                'total_reservas': len(intervalos)
             })
 
         except Exception as e:
@@ -112,4 +115,79 @@ class FechasOcupadasView(APIView):
             return Response({
                 'fechas_ocupadas': [],
                 'error': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DisponibilidadView(APIView):
+    """¿Está libre la propiedad entre checkin y checkout?"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, propiedad_id):
+        try:
+            checkin = _parse_fecha(request.query_params.get('checkin'))
+            checkout = _parse_fecha(request.query_params.get('checkout'))
+        except ValueError:
+            return Response(
+                {'error': 'Formato de fecha inválido, use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not checkin or not checkout or checkout <= checkin:
+            return Response(
+                {'error': 'checkin y checkout son requeridos y checkout debe ser posterior'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'propiedad_id': propiedad_id,
+            'checkin': checkin.isoformat(),
+            'checkout': checkout.isoformat(),
+            'disponible': DisponibilidadService.esta_disponible(propiedad_id, checkin, checkout)
+        })
+
+
+class CalendarioOcupacionView(APIView):
+    """
+    Calendario precalculado de una propiedad para un año (?anio=YYYY).
+    formato=rle (default): tramos [dia_inicio, cantidad] con día 0 = 1 de enero
+    formato=bits: mapa de bits en base64 (bit i = día i + 1 del año)
+    formato=binario: los 46 bytes del mapa como application/octet-stream
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, propiedad_id):
+        anio = request.query_params.get('anio') or str(timezone.now().year)
+        if not anio.isdigit() or not 1 <= int(anio) <= 9999:
+            return Response({'error': 'Año inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        anio = int(anio)
+
+        formato = request.query_params.get('formato', 'rle')
+        bits = CalendarioService.obtener_bits(propiedad_id, anio)
+        dias = 366 if calendar.isleap(anio) else 365
+
+        if formato == 'binario':
+            resp = HttpResponse(bits, content_type='application/octet-stream')
+            resp['X-Calendario-Anio'] = str(anio)
+            resp['X-Calendario-Dias'] = str(dias)
+            return resp
+
+        data = {
+            'propiedad_id': propiedad_id,
+            'anio': anio,
+            'dias': dias,
+            'noches_ocupadas': int.from_bytes(bits, 'little').bit_count(),
+        }
+        if formato == 'bits':
+            data['bits'] = base64.b64encode(bits).decode('ascii')
+        elif formato == 'rle':
+            data['rle'] = CalendarioService.a_rle(bits, dias)
+        else:
+            return Response({'error': 'Formato no soportado (rle, bits, binario)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(data)
+
+
+def _parse_fecha(valor):
+    if not valor:
+        return None
+    return datetime.strptime(valor, '%Y-%m-%d').date()
@@ -0,0 +1,19 @@
+"""Utilidades de texto compartidas entre apps"""
+import hashlib
+import re
+import unicodedata
+
+
+def normalizar(texto: str) -> str:
+    """
+    Forma canónica para comparar o usar como clave: sin acentos, en
+    minúsculas y solo letras/dígitos separados por un espacio
+    ("Reservas  de Enero!" -> "reservas de enero").
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r'[^a-z0-9]+', ' ', texto).strip()
+    if len(texto) > 255:
+        # Textos muy largos: prefijo legible + hash
+        texto = f"{texto[:200]}#{hashlib.sha1(texto.encode()).hexdigest()}"
+    return texto